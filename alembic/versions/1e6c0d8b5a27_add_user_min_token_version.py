@@ -0,0 +1,29 @@
+"""add user.min_token_version
+
+Revision ID: 1e6c0d8b5a27
+Revises: f4a9c2e6d871
+Create Date: 2026-10-17 21:34:08.517920
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1e6c0d8b5a27"
+down_revision = "f4a9c2e6d871"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "user",
+        sa.Column(
+            "min_token_version", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("user", "min_token_version")
@@ -0,0 +1,31 @@
+"""add user lower(username) index
+
+Revision ID: 3f1d7a2c9e84
+Revises: c98bb9cabf23
+Create Date: 2026-10-16 11:02:17.530914
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f1d7a2c9e84"
+down_revision = "c98bb9cabf23"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the LOWER(username) lookups, including the prefix LIKE used to
+    # allocate default usernames. Not unique, as existing usernames may differ
+    # only by case. ix_user_username still rejects two signups allocating the
+    # same default username, since those are lowercase.
+    op.execute(
+        """
+CREATE INDEX user_lower_username_idx
+ON "user" (LOWER(username) text_pattern_ops);
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("user_lower_username_idx")
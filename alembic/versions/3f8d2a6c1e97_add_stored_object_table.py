@@ -0,0 +1,42 @@
+"""add stored_object table
+
+Revision ID: 3f8d2a6c1e97
+Revises: 7c3e9a0b4d15
+Create Date: 2026-10-17 19:12:45.204311
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f8d2a6c1e97"
+down_revision = "7c3e9a0b4d15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Uploaded objects by content hash, shared by every row that refers to them.
+    # Objects uploaded before this table existed have no row and one reference.
+    op.create_table(
+        "stored_object",
+        sa.Column("bucket", sa.Text(), primary_key=True, nullable=False),
+        sa.Column("key", sa.Text(), primary_key=True, nullable=False),
+        sa.Column("sha256", sa.Text(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "reference_count", sa.Integer(), server_default="1", nullable=False
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.UniqueConstraint("bucket", "sha256"),
+    )
+
+
+def downgrade():
+    op.drop_table("stored_object")
@@ -0,0 +1,99 @@
+"""add favicon table
+
+Revision ID: 5b2e8d41c7a3
+Revises: 3f1d7a2c9e84
+Create Date: 2026-10-17 10:21:53.204117
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "5b2e8d41c7a3"
+down_revision = "3f1d7a2c9e84"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Moves the favicons of up to :batch_size posts into the favicon table. Posts store
+# favicons base64 encoded while the favicon table keeps the raw bytes.
+backfill_favicons_query = """
+WITH batch AS (
+    SELECT id, decode(convert_from(b64_favicon, 'UTF8'), 'base64') AS image
+    FROM post
+    WHERE b64_favicon IS NOT NULL AND favicon_hash IS NULL
+    {limit_statement}
+),
+hashed_batch AS (
+    SELECT id, image, encode(sha256(image), 'hex') AS hash
+    FROM batch
+),
+new_favicon AS (
+    INSERT INTO favicon (hash, image)
+    SELECT DISTINCT ON (hash) hash, image
+    FROM hashed_batch
+    ON CONFLICT (hash) DO NOTHING
+)
+UPDATE post
+SET favicon_hash = hashed_batch.hash
+FROM hashed_batch
+WHERE post.id = hashed_batch.id
+"""
+
+
+def upgrade():
+    op.create_table(
+        "favicon",
+        # Hex SHA-256 digest of the image
+        sa.Column("hash", sa.Text(), primary_key=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("image", postgresql.BYTEA(), nullable=False),
+    )
+    op.add_column(
+        "post",
+        sa.Column(
+            "favicon_hash",
+            sa.Text(),
+            sa.ForeignKey("favicon.hash"),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_post_favicon_hash", "post", ["favicon_hash"])
+
+    if context.is_offline_mode():
+        op.execute(backfill_favicons_query.format(limit_statement=""))
+    else:
+        # Batched so that a single statement never decodes every favicon at once
+        connection = op.get_bind()
+        query = sa.text(
+            backfill_favicons_query.format(limit_statement="LIMIT :batch_size")
+        )
+
+        while connection.execute(
+            query, {"batch_size": BACKFILL_BATCH_SIZE}
+        ).rowcount:
+            pass
+
+    op.drop_column("post", "b64_favicon")
+
+
+def downgrade():
+    op.add_column("post", sa.Column("b64_favicon", postgresql.BYTEA()))
+    op.execute(
+        """
+UPDATE post
+SET b64_favicon = convert_to(translate(encode(favicon.image, 'base64'), E'\\n', ''), 'UTF8')
+FROM favicon
+WHERE post.favicon_hash = favicon.hash
+        """
+    )
+    op.drop_column("post", "favicon_hash")
+    op.drop_table("favicon")
@@ -0,0 +1,27 @@
+"""add board.version
+
+Revision ID: 6d1f3b8a2e70
+Revises: 9a4b6e2f0c58
+Create Date: 2026-10-17 09:41:26.503117
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6d1f3b8a2e70"
+down_revision = "9a4b6e2f0c58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "board",
+        sa.Column("version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("board", "version")
@@ -0,0 +1,58 @@
+"""add storage_gc table
+
+Revision ID: 7c3e9a0b4d15
+Revises: e2b7c5d19f03
+Create Date: 2026-10-17 18:03:27.915264
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7c3e9a0b4d15"
+down_revision = "e2b7c5d19f03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Objects waiting to be deleted from storage. Rows are removed once deleted.
+    op.create_table(
+        "storage_gc",
+        sa.Column(
+            "id",
+            postgresql.UUID(),
+            server_default=sa.text("uuid_generate_v4()"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("bucket", sa.Text(), nullable=False),
+        sa.Column("key", sa.Text(), nullable=False),
+        sa.Column("attempt_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("failed_at", sa.DateTime(timezone=True)),
+    )
+    op.execute(
+        """
+CREATE INDEX storage_gc_pending_idx ON storage_gc (next_attempt_at)
+WHERE failed_at IS NULL;
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("storage_gc")
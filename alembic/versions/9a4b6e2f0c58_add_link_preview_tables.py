@@ -0,0 +1,49 @@
+"""add link_preview and site_favicon tables
+
+Revision ID: 9a4b6e2f0c58
+Revises: 3f8d2a6c1e97
+Create Date: 2026-10-17 20:31:08.519724
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4b6e2f0c58"
+down_revision = "3f8d2a6c1e97"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unfurled link metadata by canonical URL. Links that could not be unfurled are
+    # kept with no metadata until they expire, so that they are not fetched again
+    # on every request.
+    op.create_table(
+        "link_preview",
+        sa.Column("url", sa.Text(), primary_key=True, nullable=False),
+        sa.Column("title", sa.Text()),
+        sa.Column("description", sa.Text()),
+        sa.Column("thumbnail_image_uri", sa.Text()),
+        sa.Column("favicon_hash", sa.Text()),
+        sa.Column(
+            "fetched_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    # Favicon of every site by host, shared by all of its links
+    op.create_table(
+        "site_favicon",
+        sa.Column("host", sa.Text(), primary_key=True, nullable=False),
+        sa.Column("favicon_hash", sa.Text()),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("site_favicon")
+    op.drop_table("link_preview")
@@ -0,0 +1,85 @@
+"""drop the columns of post copied to post_layout
+
+Revision ID: 9c7d2e4b1f63
+Revises: 1e6c0d8b5a27
+Create Date: 2026-10-17 23:08:42.160374
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c7d2e4b1f63"
+down_revision = "1e6c0d8b5a27"
+branch_labels = None
+depends_on = None
+
+# Catches up with what was only written to post since f4a9c2e6d871 copied it,
+# e.g. by workers that were not yet writing both tables
+sync_post_layouts_query = """
+INSERT INTO post_layout (post_id, user_id, x, y, width, height, scale, updated_at)
+SELECT id, user_id, x, y, width, height, scale, layout_updated_at
+FROM post
+ON CONFLICT (post_id) DO UPDATE
+SET
+    x = EXCLUDED.x,
+    y = EXCLUDED.y,
+    width = EXCLUDED.width,
+    height = EXCLUDED.height,
+    scale = EXCLUDED.scale,
+    updated_at = EXCLUDED.updated_at
+WHERE post_layout.updated_at < EXCLUDED.updated_at
+"""
+
+
+def upgrade():
+    # Run once no worker reads the geometry from post any more, and with
+    # POST_LAYOUT_DUAL_WRITE turned off right after
+    op.execute(sync_post_layouts_query)
+    op.execute("DROP INDEX IF EXISTS ix_post_user_id_geometry")
+
+    for column in ("x", "y", "width", "height", "scale", "layout_updated_at"):
+        op.drop_column("post", column)
+
+
+def downgrade():
+    op.add_column("post", sa.Column("x", sa.Integer()))
+    op.add_column("post", sa.Column("y", sa.Integer()))
+    op.add_column("post", sa.Column("width", sa.Integer()))
+    op.add_column("post", sa.Column("height", sa.Integer()))
+    op.add_column("post", sa.Column("scale", sa.Float()))
+    op.add_column(
+        "post",
+        sa.Column(
+            "layout_updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.execute(
+        """
+UPDATE post
+SET
+    x = post_layout.x,
+    y = post_layout.y,
+    width = post_layout.width,
+    height = post_layout.height,
+    scale = post_layout.scale,
+    layout_updated_at = post_layout.updated_at
+FROM post_layout
+WHERE post.id = post_layout.post_id
+        """
+    )
+
+    for column in ("x", "y", "width", "height", "scale", "layout_updated_at"):
+        op.alter_column("post", column, nullable=False)
+
+    op.execute(
+        """
+CREATE INDEX ix_post_user_id_geometry ON post USING gist (
+    user_id,
+    box(point(x, y), point(x + width, y + height))
+);
+        """
+    )
@@ -0,0 +1,60 @@
+"""add email_outbox table
+
+Revision ID: a4c1f9e27d60
+Revises: 5b2e8d41c7a3
+Create Date: 2026-10-17 14:06:38.771402
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a4c1f9e27d60"
+down_revision = "5b2e8d41c7a3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column(
+            "id",
+            postgresql.UUID(),
+            server_default=sa.text("uuid_generate_v4()"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("to_email", sa.Text(), nullable=False),
+        sa.Column("template_id", sa.Text(), nullable=False),
+        sa.Column("template_data", postgresql.JSONB()),
+        sa.Column("attempt_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("sent_at", sa.DateTime(timezone=True)),
+        sa.Column("failed_at", sa.DateTime(timezone=True)),
+    )
+    # Only the emails still to be sent are ever looked up
+    op.execute(
+        """
+CREATE INDEX email_outbox_pending_idx ON email_outbox (next_attempt_at)
+WHERE sent_at IS NULL AND failed_at IS NULL;
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("email_outbox")
@@ -0,0 +1,37 @@
+"""add post geometry index
+
+Revision ID: b5e0c7d24a19
+Revises: 6d1f3b8a2e70
+Create Date: 2026-10-17 11:08:52.774310
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b5e0c7d24a19"
+down_revision = "6d1f3b8a2e70"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lets the user_id equality share the GiST index with the tile rectangle. The
+    # expression must match POST_BOX_STATEMENT for the index to be used.
+    op.execute(
+        """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+CREATE INDEX ix_post_user_id_geometry ON post USING gist (
+    user_id,
+    box(point(x, y), point(x + width, y + height))
+);
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+DROP INDEX IF EXISTS ix_post_user_id_geometry;
+DROP EXTENSION IF EXISTS btree_gist;
+        """
+    )
@@ -0,0 +1,27 @@
+"""add user.token_version
+
+Revision ID: c98bb9cabf23
+Revises: 8c0289fb05c1
+Create Date: 2026-10-16 09:12:41.118302
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c98bb9cabf23"
+down_revision = "8c0289fb05c1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "user",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("user", "token_version")
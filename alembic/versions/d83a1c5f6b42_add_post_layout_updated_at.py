@@ -0,0 +1,32 @@
+"""add post.layout_updated_at
+
+Revision ID: d83a1c5f6b42
+Revises: b5e0c7d24a19
+Create Date: 2026-10-17 13:22:07.391846
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d83a1c5f6b42"
+down_revision = "b5e0c7d24a19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "post",
+        sa.Column(
+            "layout_updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("post", "layout_updated_at")
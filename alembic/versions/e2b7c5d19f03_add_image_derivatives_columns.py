@@ -0,0 +1,32 @@
+"""add image derivatives columns
+
+Revision ID: e2b7c5d19f03
+Revises: a4c1f9e27d60
+Create Date: 2026-10-17 16:42:11.508326
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e2b7c5d19f03"
+down_revision = "a4c1f9e27d60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Each points at the resized copies of the image next to it, see
+    # whoami_back/utils/image_derivatives.py. NULL until they are generated.
+    op.add_column("user", sa.Column("profile_image_derivatives_uri", sa.Text()))
+    op.add_column("user", sa.Column("profile_background_derivatives_uri", sa.Text()))
+    op.add_column("post", sa.Column("thumbnail_image_derivatives_uri", sa.Text()))
+    op.add_column("board", sa.Column("background_image_derivatives_uri", sa.Text()))
+
+
+def downgrade():
+    op.drop_column("board", "background_image_derivatives_uri")
+    op.drop_column("post", "thumbnail_image_derivatives_uri")
+    op.drop_column("user", "profile_background_derivatives_uri")
+    op.drop_column("user", "profile_image_derivatives_uri")
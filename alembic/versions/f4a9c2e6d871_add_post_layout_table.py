@@ -0,0 +1,125 @@
+"""add post_layout table
+
+Revision ID: f4a9c2e6d871
+Revises: d83a1c5f6b42
+Create Date: 2026-10-17 15:47:31.602953
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "f4a9c2e6d871"
+down_revision = "d83a1c5f6b42"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Copies the geometry of up to :batch_size posts after :after_id into post_layout
+# and returns the id of the last one, or nothing once every post is copied. A
+# layout already written by the app, see POST_LAYOUT_DUAL_WRITE, is kept unless
+# it is older.
+backfill_post_layouts_query = """
+WITH batch AS (
+    SELECT id, user_id, x, y, width, height, scale, layout_updated_at
+    FROM post
+    WHERE id > :after_id
+    ORDER BY id
+    {limit_statement}
+),
+new_post_layout AS (
+    INSERT INTO post_layout (
+        post_id, user_id, x, y, width, height, scale, updated_at
+    )
+    SELECT * FROM batch
+    ON CONFLICT (post_id) DO UPDATE
+    SET
+        x = EXCLUDED.x,
+        y = EXCLUDED.y,
+        width = EXCLUDED.width,
+        height = EXCLUDED.height,
+        scale = EXCLUDED.scale,
+        updated_at = EXCLUDED.updated_at
+    WHERE post_layout.updated_at < EXCLUDED.updated_at
+)
+SELECT id FROM batch ORDER BY id DESC LIMIT 1
+"""
+
+
+def upgrade():
+    # Geometry changes many times a second while tiles are dragged. Kept apart from
+    # the wide post row, with free space on every page for the new row versions.
+    op.create_table(
+        "post_layout",
+        sa.Column(
+            "post_id",
+            postgresql.UUID(),
+            sa.ForeignKey("post.id", ondelete="CASCADE"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(),
+            sa.ForeignKey("user.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("x", sa.Integer(), nullable=False),
+        sa.Column("y", sa.Integer(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("scale", sa.Float(), nullable=False),
+        # When the geometry was received, see write_post_layouts
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.execute("ALTER TABLE post_layout SET (fillfactor = 70)")
+
+    # Replaces ix_post_user_id_geometry, which is dropped along with the columns
+    # of post by 9c7d2e4b1f63. The expression must match POST_BOX_STATEMENT for
+    # the index to be used.
+    op.execute(
+        """
+CREATE INDEX ix_post_layout_user_id_geometry ON post_layout USING gist (
+    user_id,
+    box(point(x, y), point(x + width, y + height))
+);
+        """
+    )
+
+    values = {"after_id": "00000000-0000-0000-0000-000000000000"}
+
+    if context.is_offline_mode():
+        op.execute(
+            sa.text(
+                backfill_post_layouts_query.format(limit_statement="")
+            ).bindparams(**values)
+        )
+
+        return
+
+    # Every batch commits on its own, so that posts are only locked while their
+    # batch is copied. The app writes both tables meanwhile, see
+    # POST_LAYOUT_DUAL_WRITE.
+    query = sa.text(
+        backfill_post_layouts_query.format(limit_statement="LIMIT :batch_size")
+    )
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+
+        while values["after_id"]:
+            values["after_id"] = connection.execute(
+                query, {**values, "batch_size": BACKFILL_BATCH_SIZE}
+            ).scalar()
+
+
+def downgrade():
+    op.drop_table("post_layout")
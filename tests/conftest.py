@@ -12,6 +12,32 @@ from whoami_back.api.v1.users import commands as user_commands
 from whoami_back.utils.db import get_async_engine
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run the tests marked as benchmark",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: slow benchmark, only run with --run-benchmarks"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless they were asked for"""
+    if config.getoption("--run-benchmarks"):
+        return
+
+    skip_benchmark = pytest.mark.skip(reason="Needs --run-benchmarks to run")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip_benchmark)
+
+
 @pytest.fixture(autouse=True)
 async def db_conn():
     mock_engine = get_async_engine()
@@ -91,7 +117,7 @@ async def add_user(db_conn, add_user_profile):
         _add_user_profile: bool = True,
     ) -> str:
         id_ = uuid4()
-        hashed_password = user_commands.hash_password(password)
+        hashed_password = await user_commands.hash_password(password)
         await db_conn.execute(
             text(
                 """
@@ -142,8 +168,12 @@ async def add_post(db_conn):
         await db_conn.execute(
             text(
                 """
-INSERT INTO post (id, created_at, updated_at, user_id, source, content_uri, title, meta_title, meta_description, width, height, x, y, scale)
-VALUES (:id, :created_at, :updated_at, :user_id, :source, :content_uri, :title, :meta_title, :meta_description, :width, :height, :x, :y, :scale)
+WITH new_post AS (
+    INSERT INTO post (id, created_at, updated_at, user_id, source, content_uri, title, meta_title, meta_description)
+    VALUES (:id, :created_at, :updated_at, :user_id, :source, :content_uri, :title, :meta_title, :meta_description)
+)
+INSERT INTO post_layout (post_id, user_id, width, height, x, y, scale)
+VALUES (:id, :user_id, :width, :height, :x, :y, :scale)
                 """
             ).bindparams(
                 id=id_,
@@ -1,13 +1,13 @@
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
-from sendgrid.sendgrid import SendGridAPIClient
 from sqlalchemy import text
 
 from whoami_back.api.v1.account import base_url
 from whoami_back.api.v1.board import base_url as board_base_url
 from whoami_back.api.v1.posts import base_url as posts_base_url
 from whoami_back.api.v1.users import base_url as users_base_url
+from whoami_back.api.v1.users import commands as user_commands
 
 
 @pytest.mark.asyncio
@@ -95,7 +95,7 @@ async def test_delete_account(db_conn, add_user, api_client, event_loop):
     headers = {"authorization": f"Bearer {access_token}"}
 
     # Check if it checks the password correctly
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         body["password"] = "bye"
         result = await api_client.request(
             "DELETE",
@@ -108,7 +108,7 @@ async def test_delete_account(db_conn, add_user, api_client, event_loop):
         assert result.json()["detail"] == "Wrong password"
 
     # Actually delete the account
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         body["password"] = "hi"
         result = await api_client.request(
             "DELETE", base_url, headers=headers, json=body
@@ -138,7 +138,7 @@ async def test_deactivate_account(db_conn, add_user, api_client, event_loop):
     headers = {"authorization": f"Bearer {access_token}"}
 
     # Check if it checks the password correctly
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         body["password"] = "bye"
         result = await api_client.patch(
             f"{base_url}/deactivate", headers=headers, json=body
@@ -148,7 +148,7 @@ async def test_deactivate_account(db_conn, add_user, api_client, event_loop):
         assert result.json()["detail"] == "Wrong password"
 
     # Actually deactivate the account
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         body["password"] = "hi"
         result = await api_client.patch(
             f"{base_url}/deactivate", headers=headers, json=body
@@ -0,0 +1,41 @@
+from unittest.mock import patch
+
+import pytest
+
+from whoami_back.api.assets import base_url
+from whoami_back.api.assets.commands import get_favicon_hash, save_favicon
+
+PNG_FAVICON = b"\x89PNG\r\n\x1a\nsome favicon"
+
+
+@pytest.mark.asyncio
+async def test_get_favicon(db_conn, api_client, event_loop):
+    favicon_hash = await save_favicon(PNG_FAVICON)
+    assert favicon_hash == get_favicon_hash(PNG_FAVICON)
+
+    result = await api_client.get(f"{base_url}/favicons/{favicon_hash}")
+    assert result.status_code == 200
+    assert result.content == PNG_FAVICON
+    assert result.headers["content-type"] == "image/png"
+    assert result.headers["etag"] == f'"{favicon_hash}"'
+    assert "immutable" in result.headers["cache-control"]
+
+    # Revalidation never touches the DB
+    with patch("whoami_back.api.assets.commands.get_favicon") as mock_get_favicon:
+        result = await api_client.get(
+            f"{base_url}/favicons/{favicon_hash}",
+            headers={"If-None-Match": f'"{favicon_hash}"'},
+        )
+        mock_get_favicon.assert_not_called()
+
+    assert result.status_code == 304
+    assert result.content == b""
+
+
+@pytest.mark.asyncio
+async def test_get_unknown_favicon(db_conn, api_client, event_loop):
+    result = await api_client.get(f"{base_url}/favicons/{'0' * 64}")
+    assert result.status_code == 404
+
+    result = await api_client.get(f"{base_url}/favicons/not_a_hash")
+    assert result.status_code == 404
@@ -1,12 +1,45 @@
 import time
 from datetime import datetime, timezone
+from typing import List, Tuple
+from unittest.mock import patch
 
 import arrow
 import pytest
 from sqlalchemy import text
 
 from whoami_back.api.v1.board import base_url
+from whoami_back.api.v1.board.models import BoardViewType
 from whoami_back.api.v1.users import base_url as users_base_url
+from whoami_back.api.v2.board import base_url as v2_base_url
+from whoami_back.api.v2.board.commands import get_board
+from whoami_back.api.v2.posts.commands import update_post, update_post_layouts
+from whoami_back.utils.db import database
+from whoami_back.utils.post_layouts import PostLayoutBuffer, write_post_layouts
+
+
+async def _add_posts(user_id: str, count: int, *, x: str, y: str) -> List[str]:
+    """
+    Add count 300 x 200 posts to the user at the x and y expressions of i, their
+    index.
+    """
+    query = f"""
+WITH new_post_layout AS (
+    SELECT uuid_generate_v4() AS id, {x} AS x, {y} AS y
+    FROM generate_series(0, :count - 1) AS i
+),
+new_post AS (
+    INSERT INTO post (id, user_id, title)
+    SELECT id, :user_id, 'title' FROM new_post_layout
+)
+INSERT INTO post_layout (post_id, user_id, x, y, width, height, scale)
+SELECT id, :user_id, x, y, 300, 200, 1 FROM new_post_layout
+RETURNING CAST(post_id AS TEXT) AS id
+    """
+    rows = await database.fetch_all(
+        query=query, values={"user_id": user_id, "count": count}
+    )
+
+    return [row["id"] for row in rows]
 
 
 @pytest.mark.asyncio
@@ -228,3 +261,475 @@ UPDATE following SET approved = :approved
 
     board_json = result.json()["posts"]
     assert len(board_json) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_board_v2_single_statement(
+    db_conn, add_following, add_post, add_user, api_client, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    current_user_id = await add_user(**body)
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    target_user_id = await add_user(
+        username="choon.sik", email="choon.sik@gmail.com", public=False
+    )
+    post_id = await add_post(target_user_id)
+    await db_conn.execute(
+        text(
+            """
+INSERT INTO board (user_id, background_hex_color)
+VALUES (:user_id, '#ffffff')
+            """
+        ).bindparams(user_id=target_user_id)
+    )
+
+    result = await api_client.get(f"{v2_base_url}/choon.sik", headers=headers)
+    assert result.status_code == 403
+    result = await api_client.get(f"{v2_base_url}/choon.sik")
+    assert result.status_code == 401
+    result = await api_client.get(f"{v2_base_url}/nobody", headers=headers)
+    assert result.status_code == 400
+
+    await add_following(current_user_id, target_user_id)
+
+    # The target user, the following and the board are read in one statement
+    with patch.object(database, "fetch_one", wraps=database.fetch_one) as fetch_one:
+        board = await get_board("choon.sik", current_user_id, BoardViewType.BOARD)
+    assert fetch_one.call_count == 1
+    assert [post["id"] for post in board["posts"]] == [str(post_id)]
+    assert board["background"]["background_hex_color"] == "#ffffff"
+
+    result = await api_client.get(f"{v2_base_url}/choon.sik", headers=headers)
+    assert result.status_code == 200
+    assert result.json() == {
+        "posts": board["posts"],
+        "background": board["background"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_board_v2_not_modified(db_conn, add_user, api_client, event_loop):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    await db_conn.execute(
+        text("INSERT INTO board (user_id) VALUES (:user_id)").bindparams(
+            user_id=user_id
+        )
+    )
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    result = await api_client.get(f"{v2_base_url}/jocho", headers=headers)
+    assert result.status_code == 200
+    etag = result.headers["ETag"]
+
+    result = await api_client.get(
+        f"{v2_base_url}/jocho", headers={**headers, "If-None-Match": etag}
+    )
+    assert result.status_code == 304
+    assert result.content == b""
+
+    # The other view type is a different representation
+    result = await api_client.get(
+        f"{v2_base_url}/jocho?board_view_type=stack",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert result.status_code == 200
+
+    # Any change to the posts or the background changes the ETag
+    result = await api_client.patch(
+        f"{base_url}/background",
+        headers=headers,
+        data={"background_hex_color": "#000000"},
+    )
+    assert result.status_code == 200
+
+    result = await api_client.get(
+        f"{v2_base_url}/jocho", headers={**headers, "If-None-Match": etag}
+    )
+    assert result.status_code == 200
+    assert result.headers["ETag"] != etag
+    assert result.json()["background"]["background_hex_color"] == "#000000"
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_board_viewport_benchmark(event_loop):
+    """
+    Benchmark: reading a board of 10k posts whole versus one screen of it.
+    """
+    user_id = await database.execute(
+        query="""
+INSERT INTO "user" (email, username, first_name, last_name)
+VALUES ('power@gmail.com', 'power.user', 'Power', 'User')
+RETURNING id
+        """
+    )
+    await database.execute(
+        query="INSERT INTO board (user_id) VALUES (:user_id)",
+        values={"user_id": user_id},
+    )
+    # A 100 x 100 grid of 300 x 200 tiles
+    await _add_posts(user_id, 10000, x="(i % 100) * 320", y="(i / 100) * 220")
+    await database.execute(query="ANALYZE post, post_layout")
+    viewport = (16000, 11000, 1920, 1080)
+
+    try:
+        timings = {}
+
+        for name, kwargs in (("whole", {}), ("viewport", {"viewport": viewport})):
+            started_at = time.perf_counter()
+
+            for _ in range(5):
+                board = await get_board(
+                    "power.user", None, BoardViewType.BOARD, **kwargs
+                )
+
+            timings[name] = (time.perf_counter() - started_at) / 5
+            print(
+                f"{name}: {len(board['posts'])} posts in "
+                f"{timings[name] * 1000:.1f}ms"
+            )
+
+        x, y, width, height = viewport
+        assert 0 < len(board["posts"]) < 100
+        assert all(
+            post["x"] <= x + width
+            and post["x"] + post["width"] >= x
+            and post["y"] <= y + height
+            and post["y"] + post["height"] >= y
+            for post in board["posts"]
+        )
+    finally:
+        await database.execute(
+            query='DELETE FROM "user" WHERE id = :id', values={"id": user_id}
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_update_post_layouts_benchmark(event_loop):
+    """
+    Benchmark: moving 200 posts one statement each versus in a single statement.
+    """
+    user_id = await database.execute(
+        query="""
+INSERT INTO "user" (email, username, first_name, last_name)
+VALUES ('mover@gmail.com', 'mover', 'Mo', 'Ver')
+RETURNING id
+        """
+    )
+    post_ids = await _add_posts(user_id, 200, x="i", y="i")
+    layouts = [
+        {"id": post_id, "x": i, "y": -i, "width": 300, "height": 200, "scale": 1.0}
+        for i, post_id in enumerate(post_ids)
+    ]
+
+    try:
+        started_at = time.perf_counter()
+
+        for layout in layouts:
+            await update_post(
+                user_id,
+                layout["id"],
+                {key: layout[key] for key in ("x", "y", "width", "height", "scale")},
+            )
+
+        one_by_one = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        result = await update_post_layouts(user_id, layouts)
+        bulk = time.perf_counter() - started_at
+
+        print(f"200 posts one by one: {one_by_one * 1000:.1f}ms")
+        print(f"200 posts in one statement: {bulk * 1000:.1f}ms")
+        assert len(result["posts"]) == 200
+        assert not result["not_found"]
+    finally:
+        await database.execute(
+            query='DELETE FROM "user" WHERE id = :id', values={"id": user_id}
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_post_layout_buffer_benchmark(event_loop):
+    """
+    Benchmark: a 60-step drag of 20 posts written on every step versus buffered and
+    flushed once.
+    """
+    user_id = await database.execute(
+        query="""
+INSERT INTO "user" (email, username, first_name, last_name)
+VALUES ('dragger@gmail.com', 'dragger', 'Drag', 'Ger')
+RETURNING id
+        """
+    )
+    post_ids = await _add_posts(user_id, 20, x="i", y="i")
+    steps = [
+        [
+            {
+                "id": post_id,
+                "x": step,
+                "y": i,
+                "width": 300,
+                "height": 200,
+                "scale": 1,
+            }
+            for i, post_id in enumerate(post_ids)
+        ]
+        for step in range(60)
+    ]
+    buffer = PostLayoutBuffer(flush_interval=60, max_pending=1000)
+
+    try:
+        started_at = time.perf_counter()
+
+        for layouts in steps:
+            await update_post_layouts(user_id, layouts)
+
+        write_through = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+
+        for layouts in steps:
+            await buffer.put(user_id, layouts)
+
+        # Only the last step is written
+        assert await buffer.flush() == 20
+        buffered = time.perf_counter() - started_at
+
+        print(f"60 steps of 20 posts written through: {write_through * 1000:.1f}ms")
+        print(f"60 steps of 20 posts buffered: {buffered * 1000:.1f}ms")
+        print(buffer.stats())
+        assert buffer.stats()["written"] == 20
+    finally:
+        await database.execute(
+            query='DELETE FROM "user" WHERE id = :id', values={"id": user_id}
+        )
+
+
+@pytest.mark.asyncio
+async def test_post_layout_buffer_read_your_writes(event_loop):
+    user_id = await database.execute(
+        query="""
+INSERT INTO "user" (email, username, first_name, last_name)
+VALUES ('dragger@gmail.com', 'dragger', 'Drag', 'Ger')
+RETURNING id
+        """
+    )
+    (post_id,) = await _add_posts(user_id, 1, x="0", y="0")
+    layout = {
+        "id": post_id,
+        "x": 10,
+        "y": 20,
+        "width": 300,
+        "height": 200,
+        "scale": 1,
+    }
+    buffer = PostLayoutBuffer(flush_interval=60, max_pending=1000)
+
+    try:
+        await buffer.put(user_id, [layout])
+        assert buffer.has_pending(user_id)
+
+        # Not written yet, but the author sees the move
+        posts = [
+            dict(post)
+            for post in await database.fetch_all(
+                query="""
+SELECT CAST(post_id AS TEXT) AS id, x, y FROM post_layout WHERE post_id = :id
+                """,
+                values={"id": post_id},
+            )
+        ]
+        assert (posts[0]["x"], posts[0]["y"]) == (0, 0)
+        buffer.apply(user_id, posts)
+        assert (posts[0]["x"], posts[0]["y"]) == (10, 20)
+
+        # A newer move written meanwhile, e.g. by another worker, is kept
+        await write_post_layouts(
+            [
+                {
+                    **layout,
+                    "x": 30,
+                    "user_id": str(user_id),
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            ]
+        )
+        await buffer.flush()
+        assert not buffer.has_pending(user_id)
+
+        post = await database.fetch_one(
+            query="SELECT x, y FROM post_layout WHERE post_id = :id",
+            values={"id": post_id},
+        )
+        assert (post["x"], post["y"]) == (30, 20)
+    finally:
+        await database.execute(
+            query='DELETE FROM "user" WHERE id = :id', values={"id": user_id}
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_post_layout_write_benchmark(event_loop):
+    """
+    Benchmark: moving 200 posts 20 times, one post per statement, in post_layout
+    versus in a copy of post with the geometry columns, as it was before they were
+    split off. Compares the latency, the WAL written and how much the tables and
+    their indexes grow.
+
+    Neither is a HOT update, since the geometry index covers the columns moved. A
+    copy of post_layout without that index shows what HOT updates would save.
+    """
+    user_id = await database.execute(
+        query="""
+INSERT INTO "user" (email, username, first_name, last_name)
+VALUES ('mover@gmail.com', 'mover', 'Mo', 'Ver')
+RETURNING id
+        """
+    )
+    post_ids = await _add_posts(user_id, 200, x="i", y="i")
+    # Posts carry a description and URIs, which every move used to rewrite
+    await database.execute(
+        query="""
+UPDATE post
+SET
+    description = repeat('description ', 100),
+    content_uri = 'https://www.youtube.com/watch?v=' || id,
+    thumbnail_image_uri = 'https://whoami-post-images.s3.amazonaws.com/' || id
+WHERE user_id = :user_id
+        """,
+        values={"user_id": user_id},
+    )
+    # Same indexes as post had, including the geometry index
+    geometry_index_statement = await database.fetch_val(
+        query="""
+SELECT replace(
+    pg_get_indexdef(CAST('ix_post_layout_user_id_geometry' AS regclass)),
+    'post_layout',
+    'unsplit_post'
+)
+        """
+    )
+    await database.execute(
+        query="""
+CREATE TABLE unsplit_post (
+    LIKE post INCLUDING ALL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    scale DOUBLE PRECISION NOT NULL,
+    layout_updated_at TIMESTAMPTZ NOT NULL
+)
+        """
+    )
+
+    async def move_posts(table: str, query: str) -> Tuple[float, int, int, int]:
+        """
+        Return the elapsed seconds, the WAL bytes written and how many bytes the
+        table and its indexes grew.
+        """
+        stats = await database.fetch_one(
+            query="""
+SELECT
+    pg_relation_size(CAST(:table AS regclass)) AS table_size,
+    pg_indexes_size(CAST(:table AS regclass)) AS indexes_size,
+    pg_current_wal_lsn() AS wal_lsn
+            """,
+            values={"table": table},
+        )
+        started_at = time.perf_counter()
+
+        for i in range(20):
+            for post_id in post_ids:
+                await database.execute(
+                    query=query, values={"post_id": post_id, "x": i}
+                )
+
+        elapsed = time.perf_counter() - started_at
+        result = await database.fetch_one(
+            query="""
+SELECT
+    pg_wal_lsn_diff(pg_current_wal_lsn(), CAST(:wal_lsn AS pg_lsn)) AS wal,
+    pg_relation_size(CAST(:table AS regclass)) - :table_size AS table_growth,
+    pg_indexes_size(CAST(:table AS regclass)) - :indexes_size AS indexes_growth
+            """,
+            values={"table": table, **stats},
+        )
+
+        return (
+            elapsed,
+            int(result["wal"]),
+            result["table_growth"],
+            result["indexes_growth"],
+        )
+
+    try:
+        await database.execute(query=geometry_index_statement)
+        await database.execute(
+            query="""
+INSERT INTO unsplit_post
+SELECT p.*, l.x, l.y, l.width, l.height, l.scale, l.updated_at
+FROM post p
+JOIN post_layout l ON l.post_id = p.id
+WHERE p.user_id = :user_id
+            """,
+            values={"user_id": user_id},
+        )
+        await database.execute(
+            query="""
+CREATE TABLE unindexed_post_layout (LIKE post_layout, PRIMARY KEY (post_id))
+WITH (fillfactor = 70)
+            """
+        )
+        await database.execute(
+            query="""
+INSERT INTO unindexed_post_layout
+SELECT * FROM post_layout WHERE user_id = :user_id
+            """,
+            values={"user_id": user_id},
+        )
+        # Starts them all without the free space left behind by other tests
+        await database.execute(query="VACUUM FULL post_layout")
+        await database.execute(query="VACUUM FULL unsplit_post")
+        await database.execute(query="VACUUM FULL unindexed_post_layout")
+
+        results = {
+            "post_layout": await move_posts(
+                "post_layout",
+                "UPDATE post_layout SET x = :x, updated_at = NOW() "
+                "WHERE post_id = :post_id",
+            ),
+            "unsplit post": await move_posts(
+                "unsplit_post",
+                "UPDATE unsplit_post "
+                "SET x = :x, layout_updated_at = NOW(), updated_at = NOW() "
+                "WHERE id = :post_id",
+            ),
+            "post_layout without the geometry index": await move_posts(
+                "unindexed_post_layout",
+                "UPDATE unindexed_post_layout SET x = :x, updated_at = NOW() "
+                "WHERE post_id = :post_id",
+            ),
+        }
+
+        for name, (elapsed, wal, table_growth, indexes_growth) in results.items():
+            print(
+                f"4000 moves in {name}: {elapsed * 1000:.1f}ms, "
+                f"{wal / 1024:.0f}KB of WAL, "
+                f"table grew {table_growth / 1024:.0f}KB, "
+                f"indexes grew {indexes_growth / 1024:.0f}KB"
+            )
+    finally:
+        await database.execute(
+            query="DROP TABLE IF EXISTS unsplit_post, unindexed_post_layout"
+        )
+        await database.execute(
+            query='DELETE FROM "user" WHERE id = :id', values={"id": user_id}
+        )
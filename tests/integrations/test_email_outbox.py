@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from whoami_back.utils.db import database
+from whoami_back.utils.email_outbox import EmailDispatcher, enqueue_email
+
+SENDGRID_API_HOST = "http://sendgrid.test"
+
+
+class FakeSendGrid:
+    """
+    Stands in for the SendGrid v3 mail send endpoint. The first failure_count
+    requests are answered with failure_status_code.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0,
+        failure_count: int = 0,
+        failure_status_code: int = 503,
+    ):
+        self.latency = latency
+        self.failure_count = failure_count
+        self.failure_status_code = failure_status_code
+        self.requests = 0
+        self.messages = []
+
+    async def __call__(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+        if self.requests <= self.failure_count:
+            return httpx.Response(self.failure_status_code, text="Try again later")
+
+        self.messages.append(json.loads(request.content))
+
+        return httpx.Response(202)
+
+
+def _create_dispatcher(fake_sendgrid: FakeSendGrid, **kwargs) -> EmailDispatcher:
+    return EmailDispatcher(
+        api_key="fake_api_key",
+        api_host=SENDGRID_API_HOST,
+        from_email="whoami@test.com",
+        transport=httpx.MockTransport(fake_sendgrid),
+        **kwargs,
+    )
+
+
+async def _get_outbox(to_email: str):
+    query = "SELECT * FROM email_outbox WHERE to_email = :to_email"
+
+    return await database.fetch_one(query=query, values={"to_email": to_email})
+
+
+@pytest.fixture(autouse=True)
+async def clear_email_outbox():
+    await database.execute(query="DELETE FROM email_outbox")
+    yield
+    await database.execute(query="DELETE FROM email_outbox")
+
+
+@pytest.mark.asyncio
+async def test_queued_email_sent(event_loop):
+    fake_sendgrid = FakeSendGrid()
+    dispatcher = _create_dispatcher(fake_sendgrid)
+    await enqueue_email("jocho@gmail.com", "some_template_id", {"link": "some_url"})
+
+    assert await dispatcher.dispatch_batch() == 1
+    assert await dispatcher.dispatch_batch() == 0
+    await dispatcher.stop()
+
+    message = fake_sendgrid.messages[0]
+    assert message["template_id"] == "some_template_id"
+    assert message["personalizations"][0]["to"][0]["email"] == "jocho@gmail.com"
+    assert message["personalizations"][0]["dynamic_template_data"] == {
+        "link": "some_url"
+    }
+
+    email = await _get_outbox("jocho@gmail.com")
+    assert email["sent_at"]
+    assert email["attempt_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_email_not_queued_when_transaction_rolled_back(event_loop):
+    with pytest.raises(ValueError):
+        async with database.transaction():
+            await enqueue_email("jocho@gmail.com", "some_template_id")
+            raise ValueError("The change that triggered the email failed")
+
+    assert await _get_outbox("jocho@gmail.com") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_email_retried_with_backoff(event_loop):
+    fake_sendgrid = FakeSendGrid(failure_count=1)
+    dispatcher = _create_dispatcher(fake_sendgrid)
+    await enqueue_email("jocho@gmail.com", "some_template_id")
+
+    assert await dispatcher.dispatch_batch() == 1
+    email = await _get_outbox("jocho@gmail.com")
+    assert email["sent_at"] is None
+    assert email["failed_at"] is None
+    assert email["last_error"].startswith("503")
+
+    # Not due until the backoff has passed
+    assert await dispatcher.dispatch_batch() == 0
+
+    await database.execute(
+        query="UPDATE email_outbox SET next_attempt_at = NOW() - INTERVAL '1 second'"
+    )
+    assert await dispatcher.dispatch_batch() == 1
+    await dispatcher.stop()
+
+    email = await _get_outbox("jocho@gmail.com")
+    assert email["sent_at"]
+    assert email["attempt_count"] == 2
+    assert len(fake_sendgrid.messages) == 1
+    assert dispatcher.stats()["retried"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_email_not_retried(event_loop):
+    fake_sendgrid = FakeSendGrid(failure_count=1, failure_status_code=400)
+    dispatcher = _create_dispatcher(fake_sendgrid)
+    await enqueue_email("jocho@gmail.com", "some_template_id")
+
+    assert await dispatcher.dispatch_batch() == 1
+    await dispatcher.stop()
+
+    email = await _get_outbox("jocho@gmail.com")
+    assert email["failed_at"]
+    assert email["sent_at"] is None
+    assert dispatcher.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_email_failed_after_max_attempts(event_loop):
+    fake_sendgrid = FakeSendGrid(failure_count=3)
+    dispatcher = _create_dispatcher(fake_sendgrid, max_attempts=3)
+    await enqueue_email("jocho@gmail.com", "some_template_id")
+
+    for _ in range(3):
+        query = """
+UPDATE email_outbox SET next_attempt_at = NOW() - INTERVAL '1 second'
+        """
+        await database.execute(query=query)
+        assert await dispatcher.dispatch_batch() == 1
+
+    await dispatcher.stop()
+
+    email = await _get_outbox("jocho@gmail.com")
+    assert email["failed_at"]
+    assert email["attempt_count"] == 3
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_email_dispatcher_benchmark(event_loop):
+    """
+    Benchmark: time to drain a backlog of emails from the outbox when every
+    SendGrid request takes 50ms.
+    """
+    email_count = 500
+    fake_sendgrid = FakeSendGrid(latency=0.05)
+    dispatcher = _create_dispatcher(
+        fake_sendgrid, batch_size=100, poll_interval=0.01
+    )
+
+    for i in range(email_count):
+        await enqueue_email(f"user_{i}@gmail.com", "some_template_id")
+
+    started_at = time.perf_counter()
+    dispatcher.start()
+
+    while dispatcher.stats()["sent"] < email_count:
+        await asyncio.sleep(0.01)
+
+    elapsed = time.perf_counter() - started_at
+    await dispatcher.stop()
+
+    print(f"Dispatched {email_count} emails in {elapsed:.2f}s")
+    assert len(fake_sendgrid.messages) == email_count
@@ -0,0 +1,170 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from whoami_back.api.assets.commands import get_favicon_hash
+from whoami_back.api.v2.links import commands
+from whoami_back.utils.db import database
+from whoami_back.utils.fetch_pool import FetchPool
+from whoami_back.utils.link_metadata import canonicalize_url, parse_link_metadata
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"0" * 16
+
+PAGE = """
+<html>
+<head>
+  <title>Fallback title</title>
+  <meta property="og:title" content="Some title">
+  <meta name="description" content="Some description">
+  <meta property="og:image" content="/thumbnail.jpg">
+  <link rel="icon" href="/static/icon.png">
+</head>
+<body>Hi</body>
+</html>
+"""
+
+VIDEO_PAGE = """
+<html>
+<head>
+  <link rel="alternate" type="application/json+oembed"
+    href="https://video.example.com/oembed?id=1">
+</head>
+</html>
+"""
+
+
+class FakeSite:
+    """
+    Stands in for the sites links point to. Counts the requests made to each path.
+    """
+
+    def __init__(self, *, latency: float = 0):
+        self.latency = latency
+        self.requests = []
+
+    async def __call__(self, request):
+        self.requests.append(request.url.path)
+        await asyncio.sleep(self.latency)
+        path = request.url.path
+
+        if path == "/static/icon.png":
+            return httpx.Response(
+                200, headers={"Content-Type": "image/png"}, content=PNG
+            )
+        elif path == "/oembed":
+            return httpx.Response(
+                200,
+                json={"title": "Some video", "thumbnail_url": "https://i.example/1"},
+            )
+        elif path == "/video":
+            return httpx.Response(
+                200, headers={"Content-Type": "text/html"}, text=VIDEO_PAGE
+            )
+        elif path == "/gone":
+            return httpx.Response(404, text="Not found")
+
+        return httpx.Response(
+            200, headers={"Content-Type": "text/html; charset=utf-8"}, text=PAGE
+        )
+
+
+@pytest.fixture
+async def fake_site():
+    fake_site = FakeSite()
+    fetch_pool = FetchPool(
+        timeout=1,
+        max_connections=100,
+        max_connections_per_host=4,
+        # The stand-in sites do not resolve
+        block_private_networks=False,
+        transport=httpx.MockTransport(fake_site),
+    )
+
+    with patch.object(commands, "fetch_pool", fetch_pool):
+        yield fake_site
+
+    await fetch_pool.close()
+
+
+@pytest.fixture(autouse=True)
+async def clear_link_previews():
+    await database.execute(query="DELETE FROM link_preview")
+    await database.execute(query="DELETE FROM site_favicon")
+    yield
+    await database.execute(query="DELETE FROM link_preview")
+    await database.execute(query="DELETE FROM site_favicon")
+
+
+def test_canonicalize_url():
+    assert (
+        canonicalize_url("HTTPS://Example.com:443/a?utm_source=x&b=2&a=1#top")
+        == "https://example.com/a?a=1&b=2"
+    )
+    assert canonicalize_url("ftp://example.com/a") is None
+    assert canonicalize_url("not a url") is None
+
+
+def test_parse_link_metadata():
+    metadata = parse_link_metadata(PAGE, "https://example.com/posts/1")
+
+    assert metadata["title"] == "Some title"
+    assert metadata["description"] == "Some description"
+    assert metadata["thumbnail_image_uri"] == "https://example.com/thumbnail.jpg"
+    assert metadata["favicon_uri"] == "https://example.com/static/icon.png"
+
+
+@pytest.mark.asyncio
+async def test_link_preview_cached(event_loop, fake_site):
+    first = await commands.get_link_preview("https://example.com/posts/1")
+    # The same link with tracking parameters
+    second = await commands.get_link_preview(
+        "https://example.com/posts/1?utm_source=twitter"
+    )
+
+    assert first == second
+    assert first["title"] == "Some title"
+    assert first["favicon_url"].endswith(get_favicon_hash(PNG))
+    assert fake_site.requests == ["/posts/1", "/static/icon.png"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_link_previews_share_fetch(event_loop, fake_site):
+    fake_site.latency = 0.05
+
+    previews = await asyncio.gather(
+        *[
+            commands.get_link_preview("https://example.com/posts/1")
+            for _ in range(10)
+        ]
+    )
+
+    assert all(preview == previews[0] for preview in previews)
+    assert fake_site.requests.count("/posts/1") == 1
+
+
+@pytest.mark.asyncio
+async def test_site_favicon_fetched_once(event_loop, fake_site):
+    for i in range(3):
+        preview = await commands.get_link_preview(f"https://example.com/posts/{i}")
+        assert preview["favicon_url"] is not None
+
+    assert fake_site.requests.count("/static/icon.png") == 1
+
+
+@pytest.mark.asyncio
+async def test_oembed_link_preview(event_loop, fake_site):
+    preview = await commands.get_link_preview("https://video.example.com/video")
+
+    assert preview["title"] == "Some video"
+    assert preview["thumbnail_image_uri"] == "https://i.example/1"
+
+
+@pytest.mark.asyncio
+async def test_failed_link_preview_cached(event_loop, fake_site):
+    for _ in range(2):
+        preview = await commands.get_link_preview("https://example.com/gone")
+        assert preview["title"] is None
+
+    assert fake_site.requests == ["/gone"]
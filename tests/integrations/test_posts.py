@@ -8,6 +8,9 @@ from tests.utils import create_temp_image_file
 from whoami_back.api.v1.board import base_url as board_base_url
 from whoami_back.api.v1.posts import base_url
 from whoami_back.api.v1.users import base_url as users_base_url
+from whoami_back.api.v2.board import base_url as v2_board_base_url
+from whoami_back.api.v2.posts import base_url as v2_base_url
+from whoami_back.api.v2.posts.commands import post_layout_buffer
 
 
 @pytest.mark.asyncio
@@ -76,7 +79,7 @@ async def test_update_whoami_image_post(
         text(
             """
 SELECT
-    id,
+    post.id,
     source,
     content_uri,
     thumbnail_image_uri,
@@ -88,7 +91,8 @@ SELECT
     width,
     scale
 FROM post
-WHERE user_id = :user_id
+JOIN post_layout ON post_layout.post_id = post.id
+WHERE post.user_id = :user_id
             """
         ).bindparams(user_id=user_id)
     )
@@ -150,7 +154,7 @@ async def test_create_whoami_image_post(
         text(
             """
 SELECT
-    id,
+    post.id,
     source,
     content_uri,
     thumbnail_image_uri,
@@ -162,7 +166,8 @@ SELECT
     width,
     scale
 FROM post
-WHERE user_id = :user_id
+JOIN post_layout ON post_layout.post_id = post.id
+WHERE post.user_id = :user_id
             """
         ).bindparams(user_id=user_id)
     )
@@ -295,7 +300,14 @@ async def test_update_post(db_conn, add_post, add_user, api_client, event_loop):
 
     # Check if the post data has been REALLY updated correctly in DB
     query = await db_conn.execute(
-        text("SELECT * FROM post WHERE id = :post_id").bindparams(post_id=post_id)
+        text(
+            """
+SELECT post.*, x, y, width, height, scale
+FROM post
+JOIN post_layout ON post_layout.post_id = post.id
+WHERE post.id = :post_id
+            """
+        ).bindparams(post_id=post_id)
     )
     target_post = query.fetchone()
     for key in update_post_body:
@@ -305,9 +317,14 @@ async def test_update_post(db_conn, add_post, add_user, api_client, event_loop):
 
     # Check if the other post have stayed the SAME
     query = await db_conn.execute(
-        text("SELECT * FROM post WHERE id = :post_id").bindparams(
-            post_id=create_post_bodies[1]["id"]
-        )
+        text(
+            """
+SELECT post.*, x, y, width, height, scale
+FROM post
+JOIN post_layout ON post_layout.post_id = post.id
+WHERE post.id = :post_id
+            """
+        ).bindparams(post_id=create_post_bodies[1]["id"])
     )
     target_post = query.fetchone()
     for key in create_post_bodies[1]:
@@ -364,3 +381,227 @@ async def test_delete_post(db_conn, add_post, add_user, api_client, event_loop):
     )
     for post in result:
         assert str(post.id) in left_over_post_ids
+
+
+@pytest.mark.asyncio
+async def test_create_posts_with_the_same_favicon(
+    db_conn, add_user, api_client, event_loop
+):
+    # Add a user and prepare the header to use
+    username = "jocho"
+    body = {"username": username, "email": f"{username}@gmail.com", "password": "hi"}
+    await add_user(**body)
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    access_token = result.json()["access_token"]
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    favicon_hashes = set()
+    for i in range(2):
+        data = {"x": i, "y": i, "width": 1, "height": 1, "scale": 1.0}
+        files = {"favicon_image": ("favicon.png", b"some favicon bytes")}
+        result = await api_client.post(
+            f"{v2_base_url}", headers=headers, data=data, files=files
+        )
+        assert result.status_code == 200
+        favicon_hashes.add(result.json()["post"]["favicon_hash"])
+
+    # Both posts refer to the same favicon row
+    assert len(favicon_hashes) == 1
+    query = await db_conn.execute(text("select count(*) from favicon"))
+    assert query.scalar() == 1
+
+    # The board carries the favicon URL only
+    (favicon_hash,) = favicon_hashes
+    result = await api_client.get(f"{board_base_url}/{username}", headers=headers)
+    for post in result.json()["posts"]:
+        assert post["favicon_url"] == f"/assets/favicons/{favicon_hash}"
+
+    result = await api_client.get(f"/assets/favicons/{favicon_hash}")
+    assert result.content == b"some favicon bytes"
+
+
+@pytest.mark.asyncio
+async def test_get_posts_fields(db_conn, add_post, add_user, api_client, event_loop):
+    username = "jocho"
+    body = {"username": username, "email": f"{username}@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+    post_id = await add_post(user_id)
+
+    result = await api_client.get(f"{base_url}?fields=layout", headers=headers)
+    assert result.status_code == 200
+    assert result.json()["posts"] == [
+        {"id": post_id, "x": 1, "y": 1, "width": 1, "height": 1, "scale": 1.0}
+    ]
+
+    # The id is always returned, and the favicon URL along with its hash
+    result = await api_client.get(
+        f"{v2_board_base_url}/{username}?fields=title,favicon_hash", headers=headers
+    )
+    assert result.status_code == 200
+    assert set(result.json()["posts"][0]) == {
+        "id",
+        "title",
+        "favicon_hash",
+        "favicon_url",
+    }
+
+    for url in (base_url, f"{board_base_url}/{username}"):
+        result = await api_client.get(
+            f"{url}?fields=title,password", headers=headers
+        )
+        assert result.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_update_post_layouts(
+    db_conn, add_post, add_user, api_client, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+    post_ids = [await add_post(user_id) for _ in range(3)]
+    other_user_id = await add_user(email="someone@gmail.com", username="someone")
+    other_post_id = await add_post(other_user_id)
+
+    layouts = [
+        {
+            "id": post_id,
+            "x": i * 10,
+            "y": i * 20,
+            "width": 5,
+            "height": 6,
+            "scale": 2,
+        }
+        for i, post_id in enumerate([*post_ids, other_post_id])
+    ]
+    result = await api_client.patch(
+        f"{v2_base_url}/layout", headers=headers, json={"posts": layouts}
+    )
+    assert result.status_code == 200
+    assert sorted(result.json()["posts"], key=lambda post: post["x"]) == [
+        {**layout, "scale": 2.0} for layout in layouts[:3]
+    ]
+    # Someone else's post is left alone
+    assert result.json()["not_found"] == [other_post_id]
+
+    query = await db_conn.execute(
+        text("select x, y from post_layout where post_id = :id").bindparams(
+            id=post_ids[2]
+        )
+    )
+    assert tuple(query.fetchone()) == (20, 40)
+
+    result = await api_client.patch(
+        f"{v2_base_url}/layout",
+        headers=headers,
+        json={"posts": [layouts[0], layouts[0]]},
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_update_post_layouts_buffered(
+    db_conn, add_post, add_user, api_client, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    await db_conn.execute(
+        text("INSERT INTO board (user_id) VALUES (:user_id)").bindparams(
+            user_id=user_id
+        )
+    )
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+    post_id = await add_post(user_id)
+    layout = {"id": post_id, "x": 10, "y": 20, "width": 5, "height": 6, "scale": 1}
+
+    with patch("whoami_back.api.v2.posts.commands.POST_LAYOUT_WRITE_BEHIND", True):
+        result = await api_client.patch(
+            f"{v2_base_url}/layout?buffered=true",
+            headers=headers,
+            json={"posts": [layout]},
+        )
+    assert result.status_code == 200
+
+    query = await db_conn.execute(
+        text("select x, y from post_layout where post_id = :id").bindparams(
+            id=post_id
+        )
+    )
+    assert tuple(query.fetchone()) != (10, 20)
+
+    # The author reads the move back before it is written, without an ETag to
+    # revalidate against
+    result = await api_client.get(f"{v2_board_base_url}/jocho", headers=headers)
+    assert (result.json()["posts"][0]["x"], result.json()["posts"][0]["y"]) == (
+        10,
+        20,
+    )
+    assert "ETag" not in result.headers
+
+    await post_layout_buffer.flush()
+    query = await db_conn.execute(
+        text("select x, y from post_layout where post_id = :id").bindparams(
+            id=post_id
+        )
+    )
+    assert tuple(query.fetchone()) == (10, 20)
+    result = await api_client.get(f"{v2_board_base_url}/jocho", headers=headers)
+    assert "ETag" in result.headers
+
+
+@pytest.mark.asyncio
+async def test_post_layout_buffer_drops_failing_layouts(
+    db_conn, add_post, add_user, api_client, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    other_user_id = await add_user(email="someone@gmail.com", username="someone")
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+    post_id = await add_post(user_id)
+    other_post_id = await add_post(other_user_id)
+
+    # Out of the INTEGER range
+    layout = {
+        "id": post_id,
+        "x": 2**31,
+        "y": 20,
+        "width": 5,
+        "height": 6,
+        "scale": 1,
+    }
+    result = await api_client.patch(
+        f"{v2_base_url}/layout?buffered=true",
+        headers=headers,
+        json={"posts": [layout]},
+    )
+    assert result.status_code == 422
+
+    # Buffered past the validation, a bad layout only costs its author theirs
+    await post_layout_buffer.put(user_id, [layout])
+    await post_layout_buffer.put(
+        other_user_id,
+        [
+            {
+                "id": other_post_id,
+                "x": 10,
+                "y": 20,
+                "width": 5,
+                "height": 6,
+                "scale": 1,
+            }
+        ],
+    )
+    await post_layout_buffer.flush()
+    assert post_layout_buffer.stats()["pending"] == 0
+
+    query = await db_conn.execute(
+        text("select x, y from post_layout where post_id = :id").bindparams(
+            id=other_post_id
+        )
+    )
+    assert tuple(query.fetchone()) == (10, 20)
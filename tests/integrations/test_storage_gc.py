@@ -0,0 +1,176 @@
+import time
+from typing import Dict, List
+
+import pytest
+
+from whoami_back.utils.config import POST_IMAGES_S3_BUCKET, PROFILE_IMAGES_S3_BUCKET
+from whoami_back.utils.db import database
+from whoami_back.utils.image_derivatives import get_derivatives_key
+from whoami_back.utils.storage import LocalBackend, ObjectStorage, get_s3_object_uri
+from whoami_back.utils.storage_gc import (
+    StorageGarbageCollector,
+    enqueue_object_deletion,
+    parse_object_uri,
+)
+
+
+class FlakyBackend(LocalBackend):
+    """
+    Fails to delete the keys in failing_keys and counts DeleteObjects requests.
+    """
+
+    def __init__(self, *, failing_keys=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failing_keys = set(failing_keys)
+        self.request_sizes = []
+
+    def delete_many(self, bucket: str, keys: List[str]) -> Dict[str, str]:
+        self.request_sizes.append(len(keys))
+        errors = super().delete_many(
+            bucket, [key for key in keys if key not in self.failing_keys]
+        )
+        errors.update(
+            {key: "AccessDenied: Access Denied" for key in self.failing_keys}
+        )
+
+        return errors
+
+
+def _create_collector(backend, **kwargs) -> StorageGarbageCollector:
+    storage = ObjectStorage(backend=backend, max_concurrency=4)
+
+    return StorageGarbageCollector(storage=storage, **kwargs)
+
+
+async def _get_queued(key: str):
+    query = "SELECT * FROM storage_gc WHERE key = :key"
+
+    return await database.fetch_one(query=query, values={"key": key})
+
+
+@pytest.fixture(autouse=True)
+async def clear_storage_gc():
+    await database.execute(query="DELETE FROM storage_gc")
+    yield
+    await database.execute(query="DELETE FROM storage_gc")
+
+
+def test_only_uploaded_objects_collected():
+    key = "user_id/post_id/image_id"
+
+    assert parse_object_uri(get_s3_object_uri(POST_IMAGES_S3_BUCKET, key)) == (
+        POST_IMAGES_S3_BUCKET,
+        key,
+    )
+    assert parse_object_uri(None) is None
+    assert parse_object_uri("https://example.com/thumbnail.png") is None
+    assert parse_object_uri("https://other-bucket.s3.amazonaws.com/key") is None
+    # Shared by the default posts of every user
+    assert (
+        parse_object_uri(
+            get_s3_object_uri(POST_IMAGES_S3_BUCKET, "default-post-images/1.png")
+        )
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_queued_object_and_derivatives_deleted(event_loop, tmp_path):
+    backend = FlakyBackend(root=tmp_path)
+    key = "profile_image/user_id/image_id"
+    derivative_key = f"{get_derivatives_key(key)}/avatar_64.webp"
+    backend.put(PROFILE_IMAGES_S3_BUCKET, key, b"image")
+    backend.put(PROFILE_IMAGES_S3_BUCKET, derivative_key, b"derivative")
+
+    await enqueue_object_deletion([(PROFILE_IMAGES_S3_BUCKET, key)])
+    collector = _create_collector(backend)
+
+    assert await collector.collect_batch() == 1
+    assert await collector.collect_batch() == 0
+
+    assert not (tmp_path / PROFILE_IMAGES_S3_BUCKET / key).exists()
+    assert not (tmp_path / PROFILE_IMAGES_S3_BUCKET / derivative_key).exists()
+    assert await _get_queued(key) is None
+    # The object and all of its derivatives in one request
+    assert len(backend.request_sizes) == 1
+
+
+@pytest.mark.asyncio
+async def test_object_not_queued_when_transaction_rolled_back(event_loop):
+    with pytest.raises(ValueError):
+        async with database.transaction():
+            await enqueue_object_deletion([(POST_IMAGES_S3_BUCKET, "some_key")])
+            raise ValueError("The change that orphaned the object failed")
+
+    assert await _get_queued("some_key") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_delete_retried_until_max_attempts(event_loop, tmp_path):
+    backend = FlakyBackend(root=tmp_path, failing_keys={"failing_key"})
+    await enqueue_object_deletion(
+        [
+            (POST_IMAGES_S3_BUCKET, "failing_key"),
+            (POST_IMAGES_S3_BUCKET, "other_key"),
+        ]
+    )
+    collector = _create_collector(backend, max_attempts=2)
+
+    assert await collector.collect_batch() == 2
+    queued = await _get_queued("failing_key")
+    assert queued["last_error"].startswith("AccessDenied")
+    assert queued["failed_at"] is None
+    assert await _get_queued("other_key") is None
+
+    # Not due until the backoff has passed
+    assert await collector.collect_batch() == 0
+
+    await database.execute(
+        query="UPDATE storage_gc SET next_attempt_at = NOW() - INTERVAL '1 second'"
+    )
+    assert await collector.collect_batch() == 1
+
+    queued = await _get_queued("failing_key")
+    assert queued["failed_at"]
+    assert queued["attempt_count"] == 2
+    assert collector.stats() == {
+        "batch_size": 100,
+        "deleted": 1,
+        "retried": 1,
+        "failed": 1,
+        "requests": 2,
+    }
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_storage_gc_benchmark(event_loop, tmp_path):
+    """
+    Benchmark: time and requests to delete a backlog of objects and their
+    derivatives when every storage request takes 50ms.
+    """
+    object_count = 1000
+    latency = 0.05
+    backend = FlakyBackend(root=tmp_path, latency=latency)
+    await enqueue_object_deletion(
+        [
+            (POST_IMAGES_S3_BUCKET, f"user_id/post_id/{i}")
+            for i in range(object_count)
+        ]
+    )
+    collector = _create_collector(backend, batch_size=100)
+
+    started_at = time.perf_counter()
+
+    while await collector.collect_batch():
+        pass
+
+    elapsed = time.perf_counter() - started_at
+
+    print(f"Deleted {object_count} objects in {elapsed:.2f}s")
+    print(f"DeleteObjects requests: {len(backend.request_sizes)}")
+    assert collector.stats()["deleted"] == object_count
+    assert max(backend.request_sizes) <= 1000
+    # Deleting the objects and their 8 derivatives one at a time would take 9000
+    # requests and 450s
+    assert len(backend.request_sizes) == object_count // 100
@@ -0,0 +1,108 @@
+import io
+from unittest.mock import patch
+
+import pytest
+
+from whoami_back.utils.config import PROFILE_IMAGES_S3_BUCKET
+from whoami_back.utils.db import database
+from whoami_back.utils.s3 import storage
+from whoami_back.utils.storage import LocalBackend, get_s3_object_uri
+from whoami_back.utils.stored_objects import (
+    register_object,
+    release_object_uris,
+    upload_deduplicated,
+)
+
+
+@pytest.fixture(autouse=True)
+async def clear_stored_objects():
+    await database.execute(query="DELETE FROM stored_object")
+    await database.execute(query="DELETE FROM storage_gc")
+    yield
+    await database.execute(query="DELETE FROM stored_object")
+    await database.execute(query="DELETE FROM storage_gc")
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    with patch.object(storage, "backend", LocalBackend(root=tmp_path)):
+        yield tmp_path
+
+
+async def _get_reference_count(key: str):
+    query = "SELECT reference_count FROM stored_object WHERE key = :key"
+
+    return await database.execute(query=query, values={"key": key})
+
+
+async def _get_queued_keys():
+    rows = await database.fetch_all(query="SELECT key FROM storage_gc")
+
+    return sorted(row["key"] for row in rows)
+
+
+def _uri(key: str) -> str:
+    return get_s3_object_uri(PROFILE_IMAGES_S3_BUCKET, key)
+
+
+@pytest.mark.asyncio
+async def test_same_image_stored_once(event_loop, local_storage):
+    first_key = await upload_deduplicated(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/1", io.BytesIO(b"image")
+    )
+    uploads = storage.stats()["upload"]["completed"]
+    second_key = await upload_deduplicated(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/2", io.BytesIO(b"image")
+    )
+
+    assert first_key == second_key == "profile_image/1"
+    # No round trip to storage for the second upload
+    assert storage.stats()["upload"]["completed"] == uploads
+    assert not (
+        local_storage / PROFILE_IMAGES_S3_BUCKET / "profile_image/2"
+    ).exists()
+    assert await _get_reference_count(first_key) == 2
+
+    other_key = await upload_deduplicated(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/3", io.BytesIO(b"other image")
+    )
+    assert other_key == "profile_image/3"
+
+
+@pytest.mark.asyncio
+async def test_object_deleted_with_last_reference(event_loop, local_storage):
+    for key in ("profile_image/1", "profile_image/2"):
+        await upload_deduplicated(
+            PROFILE_IMAGES_S3_BUCKET, key, io.BytesIO(b"image")
+        )
+
+    await release_object_uris([_uri("profile_image/1")])
+    assert await _get_reference_count("profile_image/1") == 1
+    assert await _get_queued_keys() == []
+
+    # Objects uploaded before deduplication have a single reference
+    await release_object_uris([_uri("profile_image/1"), _uri("legacy_image")])
+    assert await _get_reference_count("profile_image/1") is None
+    assert await _get_queued_keys() == ["legacy_image", "profile_image/1"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_registered_after_upload_dropped(event_loop, local_storage):
+    await upload_deduplicated(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/1", io.BytesIO(b"image")
+    )
+
+    # Streamed uploads are only hashed once stored
+    key = await register_object(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/2", "some other hash", 5
+    )
+    assert key == "profile_image/2"
+
+    query = "SELECT sha256 FROM stored_object WHERE key = 'profile_image/1'"
+    sha256 = await database.execute(query=query)
+    key = await register_object(
+        PROFILE_IMAGES_S3_BUCKET, "profile_image/3", sha256, 5
+    )
+    assert key == "profile_image/1"
+    assert await _get_reference_count("profile_image/1") == 2
+    assert await _get_queued_keys() == ["profile_image/3"]
@@ -0,0 +1,329 @@
+import asyncio
+import socket
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from whoami_back.utils.cache import TTLCache
+from whoami_back.utils.config import POST_THUMBNAIL_IMAGES_S3_BUCKET
+from whoami_back.utils.db import database
+from whoami_back.utils.fetch_pool import FetchError, FetchPool, PublicHostBackend
+from whoami_back.utils.s3 import storage
+from whoami_back.utils.storage import LocalBackend
+from whoami_back.utils.thumbnail_fetcher import ThumbnailFetcher
+
+MAX_SIZE = 1024
+
+
+class FakeImageHost:
+    """
+    Stands in for the hosts link thumbnails are served from. Every path serves a
+    small JPEG unless given a response in responses.
+    """
+
+    def __init__(self, *, latency: float = 0, responses=None):
+        self.latency = latency
+        self.responses = responses or {}
+        self.requests = []
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    async def __call__(self, request):
+        host = request.url.host
+        self.requests.append(str(request.url))
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.max_in_flight[host] = max(
+            self.max_in_flight.get(host, 0), self.in_flight[host]
+        )
+
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight[host] -= 1
+
+        response = self.responses.get(request.url.path)
+
+        if response is not None:
+            return response()
+
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "image/jpeg"},
+            content=b"\xff\xd8\xff" + request.url.path.encode(),
+        )
+
+
+def _create_fetcher(fake_host: FakeImageHost, **kwargs) -> ThumbnailFetcher:
+    options = {
+        "timeout": 1,
+        "max_connections": 100,
+        "max_connections_per_host": 4,
+        **kwargs,
+    }
+    fetch_pool = FetchPool(
+        # The stand-in hosts do not resolve
+        block_private_networks=False,
+        transport=httpx.MockTransport(fake_host),
+        **options,
+    )
+
+    return ThumbnailFetcher(
+        fetch_pool=fetch_pool, max_size=MAX_SIZE, cache=TTLCache(maxsize=100, ttl=60)
+    )
+
+
+async def _get_reference_count(key: str):
+    query = "SELECT reference_count FROM stored_object WHERE key = :key"
+
+    return await database.execute(query=query, values={"key": key})
+
+
+@pytest.fixture(autouse=True)
+async def clear_stored_objects(tmp_path):
+    await database.execute(query="DELETE FROM stored_object")
+
+    with patch.object(storage, "backend", LocalBackend(root=tmp_path)):
+        yield tmp_path
+
+    await database.execute(query="DELETE FROM stored_object")
+    await database.execute(query="DELETE FROM storage_gc")
+
+
+@pytest.mark.asyncio
+async def test_same_thumbnail_fetched_and_stored_once(event_loop, tmp_path):
+    fake_host = FakeImageHost()
+    fetcher = _create_fetcher(fake_host)
+    url = "https://i.ytimg.com/vi/some_video/hqdefault.jpg"
+
+    first_key = await fetcher.fetch_and_store(
+        url, POST_THUMBNAIL_IMAGES_S3_BUCKET, "user_1/post_1"
+    )
+    second_key = await fetcher.fetch_and_store(
+        url, POST_THUMBNAIL_IMAGES_S3_BUCKET, "user_2/post_2"
+    )
+    await fetcher.fetch_pool.close()
+
+    assert first_key == second_key == "user_1/post_1"
+    assert fake_host.requests == [url]
+    assert (tmp_path / POST_THUMBNAIL_IMAGES_S3_BUCKET / first_key).exists()
+    assert await _get_reference_count(first_key) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_download(event_loop):
+    fake_host = FakeImageHost(latency=0.05)
+    fetcher = _create_fetcher(fake_host)
+    url = "https://i.ytimg.com/vi/some_video/hqdefault.jpg"
+
+    keys = await asyncio.gather(
+        *[
+            fetcher.fetch_and_store(
+                url, POST_THUMBNAIL_IMAGES_S3_BUCKET, f"user_{i}/post_{i}"
+            )
+            for i in range(10)
+        ]
+    )
+    await fetcher.fetch_pool.close()
+
+    assert len(fake_host.requests) == 1
+    # Each post holds one reference to the same object
+    assert len(set(keys)) == 1
+    assert await _get_reference_count(keys[0]) == 10
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        lambda: httpx.Response(404, text="Not found"),
+        lambda: httpx.Response(
+            200, headers={"Content-Type": "text/html"}, text="hi"
+        ),
+        lambda: httpx.Response(
+            200, headers={"Content-Type": "image/png"}, content=b"0" * (MAX_SIZE + 1)
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_bad_thumbnail_rejected(event_loop, tmp_path, response):
+    fetcher = _create_fetcher(FakeImageHost(responses={"/thumbnail.png": response}))
+
+    with pytest.raises(FetchError):
+        await fetcher.fetch_and_store(
+            "https://example.com/thumbnail.png",
+            POST_THUMBNAIL_IMAGES_S3_BUCKET,
+            "user_1/post_1",
+        )
+
+    await fetcher.fetch_pool.close()
+    assert not (tmp_path / POST_THUMBNAIL_IMAGES_S3_BUCKET).exists()
+    assert fetcher.fetch_pool.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_thumbnail_timed_out(event_loop):
+    fetcher = _create_fetcher(FakeImageHost(latency=10), timeout=0.05)
+
+    with pytest.raises(FetchError):
+        await fetcher.fetch_and_store(
+            "https://example.com/thumbnail.png",
+            POST_THUMBNAIL_IMAGES_S3_BUCKET,
+            "user_1/post_1",
+        )
+
+    await fetcher.fetch_pool.close()
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_thumbnail_fetcher_benchmark(event_loop):
+    """
+    Benchmark: 40 distinct thumbnails from two hosts that take 50ms each, with at
+    most 4 downloads per host at once.
+    """
+    fake_host = FakeImageHost(latency=0.05)
+    fetcher = _create_fetcher(fake_host, max_connections_per_host=4)
+    urls = [
+        f"https://{host}/thumbnail_{i}.jpg"
+        for host in ("i.ytimg.com", "example.com")
+        for i in range(20)
+    ]
+
+    started_at = asyncio.get_running_loop().time()
+    await asyncio.gather(
+        *[
+            fetcher.fetch_and_store(url, POST_THUMBNAIL_IMAGES_S3_BUCKET, f"key_{i}")
+            for i, url in enumerate(urls)
+        ]
+    )
+    elapsed = asyncio.get_running_loop().time() - started_at
+    await fetcher.fetch_pool.close()
+
+    print(f"Fetched {len(urls)} thumbnails in {elapsed:.2f}s")
+    print(fetcher.fetch_pool.stats())
+    assert fake_host.max_in_flight == {"i.ytimg.com": 4, "example.com": 4}
+
+
+@pytest.mark.asyncio
+async def test_private_hosts_refused(event_loop):
+    fake_host = FakeImageHost()
+    fetch_pool = FetchPool(
+        timeout=1,
+        max_connections=10,
+        max_connections_per_host=4,
+        transport=httpx.MockTransport(fake_host),
+    )
+
+    for url in (
+        "http://127.0.0.1/thumbnail.png",
+        "http://169.254.169.254/latest/meta-data",
+        "file:///etc/passwd",
+    ):
+        with pytest.raises(FetchError):
+            await fetch_pool.get(url, max_size=MAX_SIZE)
+
+    await fetch_pool.close()
+    assert fake_host.requests == []
+
+
+@pytest.mark.asyncio
+async def test_redirect_to_private_host_refused(event_loop):
+    fake_host = FakeImageHost(
+        responses={
+            "/thumbnail.png": lambda: httpx.Response(
+                302, headers={"Location": "http://10.0.0.1/admin"}
+            )
+        }
+    )
+    fetch_pool = FetchPool(
+        timeout=1,
+        max_connections=10,
+        max_connections_per_host=4,
+        transport=httpx.MockTransport(fake_host),
+    )
+
+    with pytest.raises(FetchError):
+        await fetch_pool.get("http://93.184.216.34/thumbnail.png", max_size=MAX_SIZE)
+
+    await fetch_pool.close()
+    assert fake_host.requests == ["http://93.184.216.34/thumbnail.png"]
+
+
+@pytest.mark.asyncio
+async def test_host_rebound_to_private_address_refused(event_loop):
+    connections = []
+    server = await asyncio.start_server(
+        lambda reader, writer: connections.append(writer), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    resolved_ips = ["93.184.216.34", "127.0.0.1"]
+
+    async def getaddrinfo(host, port, **kwargs):
+        # Public for the first lookup, internal for every one after
+        ip = resolved_ips.pop(0) if len(resolved_ips) > 1 else resolved_ips[0]
+
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, port))]
+
+    fetch_pool = FetchPool(timeout=1, max_connections=10, max_connections_per_host=4)
+
+    with patch.object(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo):
+        with pytest.raises(FetchError):
+            await fetch_pool.get(f"http://rebind.test:{port}/", max_size=MAX_SIZE)
+
+    await fetch_pool.close()
+    server.close()
+    await server.wait_closed()
+    assert connections == []
+
+
+@pytest.mark.asyncio
+async def test_public_host_backend_installed(event_loop):
+    # Set on a private attribute of httpx's transport, so an upgrade of httpx or
+    # httpcore that moves it must fail here rather than connect anywhere
+    fetch_pool = FetchPool(timeout=1, max_connections=10, max_connections_per_host=4)
+    transport = fetch_pool._get_client()._transport
+
+    assert isinstance(transport._pool._backend, PublicHostBackend)
+    await fetch_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_private_hosts_checked_on_default_port(event_loop):
+    ports = []
+
+    async def getaddrinfo(host, port, **kwargs):
+        ports.append(port)
+
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    fetch_pool = FetchPool(timeout=1, max_connections=10, max_connections_per_host=4)
+
+    with patch.object(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo):
+        for url in ("http://internal.test/", "https://internal.test/"):
+            with pytest.raises(FetchError):
+                await fetch_pool.get(url, max_size=MAX_SIZE)
+
+    await fetch_pool.close()
+    assert ports == [80, 443]
+
+
+@pytest.mark.asyncio
+async def test_malformed_responses_refused(event_loop):
+    fake_host = FakeImageHost(
+        responses={
+            "/no_location.png": lambda: httpx.Response(302),
+            "/bad_length.png": lambda: httpx.Response(
+                200, headers={"Content-Type": "image/png", "Content-Length": "abc"}
+            ),
+        }
+    )
+    fetcher = _create_fetcher(fake_host)
+
+    for path in ("/no_location.png", "/bad_length.png"):
+        with pytest.raises(FetchError):
+            await fetcher.fetch_pool.get(
+                f"https://example.com{path}", max_size=MAX_SIZE
+            )
+
+    await fetcher.fetch_pool.close()
+    assert fetcher.fetch_pool.stats()["failed"] == 2
@@ -0,0 +1,370 @@
+import hashlib
+import io
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from PIL import Image
+from sqlalchemy import text
+
+from whoami_back.api.v1.users import base_url as users_base_url
+from whoami_back.api.v2.uploads import base_url
+from whoami_back.utils.config import (
+    BOARD_IMAGES_S3_BUCKET,
+    POST_IMAGES_S3_BUCKET,
+    UPLOAD_MAX_SIZE_IN_BYTES,
+)
+from whoami_back.utils.s3 import image_derivatives, storage
+from whoami_back.utils.storage import LocalBackend
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    with patch.object(storage, "backend", LocalBackend(root=tmp_path)):
+        yield tmp_path
+
+
+async def _login(api_client, add_user):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    result = await api_client.post(f"{users_base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    return user_id, headers
+
+
+def _upload(local_storage, upload_intent: dict) -> None:
+    # Stands in for the client POSTing the file to S3
+    path = os.path.join(
+        upload_intent["url"][len("file://") :], upload_intent["fields"]["key"]
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "wb") as f:
+        Image.new("RGB", (800, 600)).save(f, "JPEG")
+
+
+@pytest.mark.asyncio
+async def test_upload_post_image(
+    db_conn, local_storage, add_user, add_post, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    post_id = await add_post(user_id)
+
+    body = {"target": "post_image", "post_id": post_id}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    assert result.status_code == 200
+    upload_intent = result.json()
+    assert upload_intent["key"].startswith(f"{user_id}/{post_id}/")
+
+    # Not uploaded yet
+    body = {"target": "post_image", "post_id": post_id, "key": upload_intent["key"]}
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 400
+
+    _upload(local_storage, upload_intent)
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 200
+    assert result.json()["uri"].endswith(upload_intent["key"])
+
+    # Resized copies are generated in the background
+    await image_derivatives.join()
+
+    query = await db_conn.execute(
+        text(
+            """
+select thumbnail_image_uri, thumbnail_image_derivatives_uri
+from post
+where id = :id
+            """
+        ).bindparams(id=post_id)
+    )
+    post = query.fetchone()
+    assert post[0] == result.json()["uri"]
+    assert post[1].endswith(f"derivatives/{upload_intent['key']}")
+    derivatives_path = (
+        local_storage / POST_IMAGES_S3_BUCKET / f"derivatives/{upload_intent['key']}"
+    )
+    assert os.path.exists(derivatives_path / "tile_480.webp")
+
+
+@pytest.mark.asyncio
+async def test_finalize_upload_twice_rejected(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    await db_conn.execute(
+        text("INSERT INTO board (user_id) VALUES (:user_id)").bindparams(
+            user_id=user_id
+        )
+    )
+
+    body = {"target": "board_background"}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    upload_intent = result.json()
+    _upload(local_storage, upload_intent)
+
+    body = {
+        "target": "board_background",
+        "key": upload_intent["key"],
+        "background_image_fitting_mode": "fill",
+    }
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 200
+    uri = result.json()["uri"]
+
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 409
+
+    # Still attached, with the one reference the board holds
+    query = await db_conn.execute(
+        text(
+            """
+select reference_count from stored_object where key = :key
+union all
+select count(*) from storage_gc where key = :key
+            """
+        ).bindparams(key=upload_intent["key"])
+    )
+    assert [row[0] for row in query.fetchall()] == [1, 0]
+    query = await db_conn.execute(
+        text(
+            """
+select background_image_s3_uri
+from board
+where background_image_s3_uri = :uri
+            """
+        ).bindparams(uri=uri)
+    )
+    assert query.fetchone()
+    assert os.path.exists(
+        local_storage / BOARD_IMAGES_S3_BUCKET / upload_intent["key"]
+    )
+    await image_derivatives.join()
+
+
+@pytest.mark.asyncio
+async def test_upload_not_attached_keeps_no_reference(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    await db_conn.execute(
+        text("INSERT INTO board (user_id) VALUES (:user_id)").bindparams(
+            user_id=user_id
+        )
+    )
+
+    # A background needs a fitting mode, which the board does not have yet
+    body = {"target": "board_background"}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    upload_intent = result.json()
+    _upload(local_storage, upload_intent)
+
+    body = {"target": "board_background", "key": upload_intent["key"]}
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 400
+
+    image = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(image, "JPEG")
+    result = await api_client.put(
+        f"{base_url}/board_background",
+        headers={**headers, "Content-Type": "image/jpeg"},
+        content=image.getvalue(),
+    )
+    assert result.status_code == 400
+
+    query = await db_conn.execute(text("select count(*) from stored_object"))
+    assert query.scalar() == 0
+    # The streamed object is deleted, while the presigned one can be finalized
+    # again
+    query = await db_conn.execute(
+        text("select key from storage_gc where key like :prefix").bindparams(
+            prefix=f"background_image/{user_id}/%"
+        )
+    )
+    (key,) = [row[0] for row in query.fetchall()]
+    assert key != upload_intent["key"]
+
+    body["background_image_fitting_mode"] = "fill"
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 200
+    await image_derivatives.join()
+
+
+@pytest.mark.asyncio
+async def test_upload_without_checksum_rejected(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    _, headers = await _login(api_client, add_user)
+
+    body = {"target": "profile_image"}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    upload_intent = result.json()
+    _upload(local_storage, upload_intent)
+
+    # S3 keeps no checksum for an upload that did not send one
+    body = {"target": "profile_image", "key": upload_intent["key"]}
+    with patch.object(storage, "get_sha256", AsyncMock(return_value=None)):
+        result = await api_client.post(
+            f"{base_url}/finalize", headers=headers, json=body
+        )
+    assert result.status_code == 400
+
+    query = await db_conn.execute(text("select count(*) from stored_object"))
+    assert query.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_profile_image(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+
+    body = {"target": "profile_image"}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    upload_intent = result.json()
+    assert upload_intent["key"].startswith(f"profile_image/{user_id}/")
+    _upload(local_storage, upload_intent)
+
+    body = {"target": "profile_image", "key": upload_intent["key"]}
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 200
+
+    query = await db_conn.execute(
+        text('select profile_image_s3_uri from "user" where id = :id').bindparams(
+            id=user_id
+        )
+    )
+    assert query.fetchone()[0] == result.json()["uri"]
+
+
+@pytest.mark.asyncio
+async def test_upload_to_someone_elses_target_rejected(
+    db_conn, local_storage, add_user, add_post, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    other_user_id = await add_user(email="someone@gmail.com", username="someone")
+    other_post_id = await add_post(other_user_id)
+
+    body = {"target": "post_image", "post_id": other_post_id}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    assert result.status_code == 404
+
+    # A key issued for another target
+    body = {"target": "board_background"}
+    result = await api_client.post(base_url, headers=headers, json=body)
+    upload_intent = result.json()
+    _upload(local_storage, upload_intent)
+
+    body = {"target": "profile_image", "key": upload_intent["key"]}
+    result = await api_client.post(
+        f"{base_url}/finalize", headers=headers, json=body
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_profile_background(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    image = io.BytesIO()
+    Image.new("RGB", (800, 600)).save(image, "JPEG")
+
+    result = await api_client.put(
+        f"{base_url}/profile_background",
+        headers={**headers, "Content-Type": "image/jpeg"},
+        content=image.getvalue(),
+    )
+    assert result.status_code == 200
+    uploaded = result.json()
+    assert uploaded["size"] == len(image.getvalue())
+    assert uploaded["sha256"] == hashlib.sha256(image.getvalue()).hexdigest()
+
+    query = await db_conn.execute(
+        text(
+            'select profile_background_s3_uri from "user" where id = :id'
+        ).bindparams(id=user_id)
+    )
+    assert query.fetchone()[0] == uploaded["uri"]
+    # Otherwise the derivatives land in the storage of the next test
+    await image_derivatives.join()
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_same_image_again(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    user_id, headers = await _login(api_client, add_user)
+    image = io.BytesIO()
+    Image.new("RGB", (800, 600)).save(image, "JPEG")
+
+    for _ in range(2):
+        result = await api_client.put(
+            f"{base_url}/profile_image",
+            headers={**headers, "Content-Type": "image/jpeg"},
+            content=image.getvalue(),
+        )
+        assert result.status_code == 200
+
+    # The second upload refers to the first one, which the profile holds once
+    query = await db_conn.execute(
+        text(
+            """
+select s.key, s.reference_count
+from stored_object s
+join "user" u on u.profile_image_s3_uri like '%/' || s.key
+where u.id = :id
+            """
+        ).bindparams(id=user_id)
+    )
+    key, reference_count = query.fetchone()
+    assert result.json()["uri"].endswith(f"/{key}")
+    assert reference_count == 1
+    query = await db_conn.execute(
+        text("select count(*) from storage_gc where key = :key").bindparams(key=key)
+    )
+    assert query.scalar() == 0
+    await image_derivatives.join()
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_too_large_rejected(
+    db_conn, local_storage, add_user, api_client, event_loop
+):
+    _, headers = await _login(api_client, add_user)
+
+    async def body():
+        # No Content-Length, so the size is only known while the body arrives
+        for _ in range(UPLOAD_MAX_SIZE_IN_BYTES // (1024 * 1024) + 1):
+            yield b"0" * 1024 * 1024
+
+    result = await api_client.put(
+        f"{base_url}/profile_image",
+        headers={**headers, "Content-Type": "image/jpeg"},
+        content=body(),
+    )
+    assert result.status_code == 413
+    # Nothing is left behind
+    assert not any(files for _, _, files in os.walk(local_storage))
+
+    result = await api_client.put(
+        f"{base_url}/profile_image",
+        headers={**headers, "Content-Type": "text/plain"},
+        content=b"not an image",
+    )
+    assert result.status_code == 415
@@ -1,14 +1,20 @@
+import asyncio
 import base64
 import json
-from unittest.mock import patch
+import time
+from unittest.mock import AsyncMock, patch
 
 import pytest
-from google.oauth2 import id_token
-from sendgrid.sendgrid import SendGridAPIClient
 from sqlalchemy import text
 
 from whoami_back.api.v1.account import base_url as account_base_url
+from whoami_back.api.v1.posts import base_url as posts_base_url
 from whoami_back.api.v1.users import base_url
+from whoami_back.api.v1.users import commands as user_commands
+from whoami_back.api.v1.users.commands import google_id_token_verifier
+from whoami_back.api.v1.utils import base_url as utils_base_url
+from whoami_back.api.v1.utils import commands as utils_commands
+from whoami_back.api.v2.users import base_url as v2_base_url
 
 
 @pytest.mark.asyncio
@@ -22,7 +28,7 @@ async def test_password_signup_confirm_and_login_flow(
         "first_name": "test_first_name",
         "last_name": "test_last_name",
     }
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(f"{base_url}/signup", json=body)
         mock_method.assert_called_once()
         assert result.status_code == 200
@@ -49,7 +55,7 @@ async def test_password_signup_confirm_and_login_flow(
     access_token = result.json()["detail"]["access_token"]
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.get(
             f"{base_url}/resend-confirmation", headers=headers
         )
@@ -66,9 +72,7 @@ async def test_password_signup_confirm_and_login_flow(
     assert not user["confirmed"]
 
     # Confirm the user
-    confirmation_url = (
-        mock_method.call_args[0][0].personalizations[0].dynamic_template_data["link"]
-    )
+    confirmation_url = mock_method.call_args[0][2]["link"]
     access_token = confirmation_url.split("token=")[1]
     headers = {"Authorization": f"Bearer {access_token}"}
 
@@ -205,6 +209,151 @@ async def test_me_endpoint(api_client, add_user, event_loop):
             assert body[key] == user_data[key]
 
 
+@pytest.mark.asyncio
+async def test_access_token_claims_used_while_version_matches(
+    api_client, add_user, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    await add_user(**body)
+    result = await api_client.post(f"{base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    # Served from the claims, without looking the user up
+    with patch.object(
+        user_commands, "get_user", AsyncMock(wraps=user_commands.get_user)
+    ) as mock_method:
+        result = await api_client.get(posts_base_url, headers=headers)
+        assert result.status_code == 200
+        mock_method.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_access_token_minted_before_deactivation_rejected(
+    api_client, add_user, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    await add_user(**body)
+    result = await api_client.post(f"{base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    with patch.object(user_commands, "enqueue_email", AsyncMock()):
+        result = await api_client.patch(
+            f"{account_base_url}/deactivate", headers=headers, json=body
+        )
+        assert result.status_code == 200
+
+    # Its claims still say active, so the user is looked up instead
+    with patch.object(
+        user_commands, "get_user", AsyncMock(wraps=user_commands.get_user)
+    ) as mock_method:
+        result = await api_client.get(posts_base_url, headers=headers)
+        assert result.status_code == 401
+        assert result.json()["detail"] == "Inactive user"
+        mock_method.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_access_token_minted_before_password_change_rejected(
+    api_client, add_user, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    await add_user(**body)
+    result = await api_client.post(f"{base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    result = await api_client.patch(
+        f"{account_base_url}/update-password",
+        headers=headers,
+        json={"old_password": "hi", "new_password": "goodbye1"},
+    )
+    assert result.status_code == 200
+    new_headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    with patch.object(
+        user_commands, "get_user", AsyncMock(wraps=user_commands.get_user)
+    ) as mock_method:
+        result = await api_client.get(posts_base_url, headers=headers)
+        assert result.status_code == 401
+        mock_method.assert_called_once()
+
+    # The token returned replaces it, and is served from its claims
+    with patch.object(
+        user_commands, "get_user", AsyncMock(wraps=user_commands.get_user)
+    ) as mock_method:
+        result = await api_client.get(posts_base_url, headers=new_headers)
+        assert result.status_code == 200
+        mock_method.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_access_token_without_version_rejected_after_password_change(
+    api_client, add_user, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    user_id = await add_user(**body)
+    # As minted before tokens carried a version
+    unversioned_token = await user_commands.create_access_token(str(user_id), 1)
+    unversioned_headers = {"Authorization": f"Bearer {unversioned_token}"}
+    result = await api_client.get(posts_base_url, headers=unversioned_headers)
+    assert result.status_code == 200
+
+    result = await api_client.post(f"{base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+    result = await api_client.patch(
+        f"{account_base_url}/update-password",
+        headers=headers,
+        json={"old_password": "hi", "new_password": "goodbye1"},
+    )
+    assert result.status_code == 200
+
+    result = await api_client.get(posts_base_url, headers=unversioned_headers)
+    assert result.status_code == 401
+
+    # Links emailed since carry the new version
+    link_token = await user_commands.create_link_token(str(user_id), 1)
+    result = await api_client.get(
+        posts_base_url, headers={"Authorization": f"Bearer {link_token}"}
+    )
+    assert result.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_full_user_routes_get_email_and_username(
+    api_client, add_user, event_loop
+):
+    body = {"username": "jocho", "email": "jocho@gmail.com", "password": "hi"}
+    await add_user(**body)
+    result = await api_client.post(f"{base_url}/login", json=body)
+    headers = {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+    # The claims carry neither
+    with patch.object(
+        utils_commands, "validate_username", AsyncMock(return_value=(True, None))
+    ) as mock_method:
+        result = await api_client.post(
+            f"{utils_base_url}/validate/username",
+            headers=headers,
+            json={"username": "someone"},
+        )
+        assert result.status_code == 200
+        mock_method.assert_called_once_with(
+            "someone", current_user_username=body["username"]
+        )
+
+    with patch.object(
+        utils_commands, "validate_email", AsyncMock(return_value=(True, None))
+    ) as mock_method:
+        result = await api_client.post(
+            f"{utils_base_url}/validate/email",
+            headers=headers,
+            json={"email": "someone@gmail.com"},
+        )
+        assert result.status_code == 200
+        mock_method.assert_called_once_with(
+            "someone@gmail.com", current_user_email=body["email"]
+        )
+
+
 @pytest.mark.asyncio
 async def test_password_reset_flow(api_client, event_loop):
     body = {
@@ -213,7 +362,7 @@ async def test_password_reset_flow(api_client, event_loop):
         "first_name": "test_first_name",
         "last_name": "test_last_name",
     }
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(f"{base_url}/signup", json=body)
 
     body = {"email": body["email"], "password": body["password"]}
@@ -231,7 +380,7 @@ async def test_password_reset_flow(api_client, event_loop):
 
     # Test not sending an email for an unknown user
     bad_body = {"email": "random@gmail.com"}
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(
             f"{base_url}/send-password-reset", json=bad_body
         )
@@ -239,7 +388,7 @@ async def test_password_reset_flow(api_client, event_loop):
 
     # Test sending an email for an known user
     good_body = {"email": "test@gmail.com"}
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(
             f"{base_url}/send-password-reset", json=good_body
         )
@@ -270,7 +419,9 @@ async def test_google_signup_and_login_flow(db_conn, api_client, event_loop):
         "auth_service": "google",
     }
     with patch.object(
-        id_token, "verify_oauth2_token", return_value=mock_google_user_info
+        google_id_token_verifier,
+        "verify",
+        AsyncMock(return_value=mock_google_user_info),
     ):
         result = await api_client.post(f"{base_url}/signup", json=body)
         assert result.status_code == 200
@@ -294,7 +445,9 @@ async def test_google_signup_and_login_flow(db_conn, api_client, event_loop):
         "service_user_id": body["service_user_id"],
     }
     with patch.object(
-        id_token, "verify_oauth2_token", return_value=mock_google_user_info
+        google_id_token_verifier,
+        "verify",
+        AsyncMock(return_value=mock_google_user_info),
     ):
         result = await api_client.post(f"{base_url}/login", json=body)
     assert result.status_code == 200
@@ -329,7 +482,9 @@ async def test_facebook_signup_and_login_flow(db_conn, api_client, event_loop):
         "service_user_id": "facebook_user_id",
     }
     with patch.object(
-        id_token, "verify_oauth2_token", return_value=mock_facebook_user_info
+        google_id_token_verifier,
+        "verify",
+        AsyncMock(return_value=mock_facebook_user_info),
     ):
         result = await api_client.post(f"{base_url}/signup", json=body)
         assert result.status_code == 200
@@ -353,7 +508,9 @@ async def test_facebook_signup_and_login_flow(db_conn, api_client, event_loop):
         "service_user_id": body["service_user_id"],
     }
     with patch.object(
-        id_token, "verify_oauth2_token", return_value=mock_facebook_user_info
+        google_id_token_verifier,
+        "verify",
+        AsyncMock(return_value=mock_facebook_user_info),
     ):
         result = await api_client.post(f"{base_url}/login", json=body)
     assert result.status_code == 200
@@ -368,20 +525,20 @@ async def test_default_usernaming_logic(db_conn, api_client, event_loop):
         "first_name": "test_first_name",
         "last_name": "test_last_name",
     }
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(f"{base_url}/signup", json=body)
         mock_method.assert_called_once()
         assert result.status_code == 200
 
     # Create 2 more users with the same username part in the email address
     body["email"] = "test@yahoo.com"
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(f"{base_url}/signup", json=body)
         mock_method.assert_called_once()
         assert result.status_code == 200
 
     body["email"] = "test@something.com"
-    with patch.object(SendGridAPIClient, "send", return_value=None) as mock_method:
+    with patch.object(user_commands, "enqueue_email", AsyncMock()) as mock_method:
         result = await api_client.post(f"{base_url}/signup", json=body)
         mock_method.assert_called_once()
         assert result.status_code == 200
@@ -398,3 +555,90 @@ async def test_default_usernaming_logic(db_conn, api_client, event_loop):
     assert usernames_dict["test@gmail.com"] == "test"
     assert usernames_dict["test@yahoo.com"] == "test_0"
     assert usernames_dict["test@something.com"] == "test_1"
+
+
+@pytest.mark.asyncio
+async def test_v2_signup_creates_default_posts(db_conn, api_client, event_loop):
+    body = {
+        "email": "test@gmail.com",
+        "password": "Test1234!",
+        "first_name": "test_first_name",
+        "last_name": "test_last_name",
+    }
+    with patch.object(user_commands, "enqueue_email", AsyncMock()):
+        result = await api_client.post(f"{v2_base_url}/signup", json=body)
+        assert result.status_code == 200
+
+    query = await db_conn.execute(
+        text(
+            """
+select "user".username, post.source
+from "user"
+join board on board.user_id = "user".id
+join post on post.user_id = "user".id
+join post_layout on post_layout.post_id = post.id
+where "user".email = 'test@gmail.com'
+order by post_layout.x
+            """
+        )
+    )
+    query_result = query.fetchall()
+    assert [row.username for row in query_result] == ["test"] * 3
+    assert [row.source for row in query_result] == [
+        "youtube",
+        "16personalities",
+        "whoami",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_signups_with_the_same_username_prefix(db_conn, event_loop):
+    signups = [
+        {
+            "email": f"test@domain{i}.com",
+            "password": "Test1234!",
+            "first_name": "test_first_name",
+            "last_name": "test_last_name",
+            "access_token": None,
+        }
+        for i in range(5)
+    ]
+
+    with patch.object(user_commands, "hash_password", AsyncMock(return_value="x")):
+        await asyncio.gather(*[user_commands.create_user(s) for s in signups])
+
+    query = await db_conn.execute(text('select username from "user"'))
+    usernames = {user_row.username for user_row in query.fetchall()}
+    assert usernames == {"test", "test_0", "test_1", "test_2", "test_3"}
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_username_allocation_benchmark(db_conn, event_loop):
+    """
+    Benchmark: sign up 10k users sharing the same email prefix. Every signup
+    allocates its username with a single query instead of probing suffixes one
+    by one, which would take ~50M round trips in total here.
+    """
+    signup_count = 10000
+    started_at = time.perf_counter()
+
+    with patch.object(user_commands, "hash_password", AsyncMock(return_value="x")):
+        for i in range(signup_count):
+            await user_commands.create_user(
+                {
+                    "email": f"john@domain{i}.com",
+                    "password": "Test1234!",
+                    "first_name": "test_first_name",
+                    "last_name": "test_last_name",
+                    "access_token": None,
+                }
+            )
+
+    elapsed = time.perf_counter() - started_at
+    print(f"{signup_count} signups with the same prefix: {elapsed:.2f}s")
+
+    query = await db_conn.execute(
+        text('select count(distinct username) from "user"')
+    )
+    assert query.scalar() == signup_count
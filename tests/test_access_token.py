@@ -0,0 +1,104 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from jose import jwt
+
+from whoami_back.api.v1.users import commands as user_commands
+from whoami_back.api.v1.users.commands import (
+    CredentialsException,
+    _decode_access_token,
+    access_token_cache,
+    create_access_token,
+)
+from whoami_back.utils.config import JWT_ALGORITHM, JWT_SIGNATURE
+
+
+@pytest.fixture(autouse=True)
+def clear_access_token_cache():
+    access_token_cache.clear()
+    yield
+    access_token_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_access_token_verified_once(event_loop):
+    token = await create_access_token("some_user_id", 1)
+
+    with patch.object(
+        user_commands.jwt, "decode", wraps=user_commands.jwt.decode
+    ) as mock_decode:
+        for _ in range(10):
+            assert _decode_access_token(token)["sub"] == "some_user_id"
+
+    mock_decode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_access_token_not_cached_past_its_expiry(event_loop):
+    # Expires well before the cache would drop it
+    expires_in = int(access_token_cache.ttl / 5)
+    token = jwt.encode(
+        {"sub": "some_user_id", "exp": int(time.time()) + expires_in},
+        JWT_SIGNATURE,
+        algorithm=JWT_ALGORITHM,
+    )
+    now = time.monotonic()
+
+    with patch.object(
+        user_commands.jwt, "decode", wraps=user_commands.jwt.decode
+    ) as mock_decode:
+        _decode_access_token(token)
+
+        with patch(
+            "whoami_back.utils.cache.time.monotonic",
+            return_value=now + expires_in - 2,
+        ):
+            _decode_access_token(token)
+
+        assert mock_decode.call_count == 1
+
+        # Just after the token expired
+        with patch(
+            "whoami_back.utils.cache.time.monotonic",
+            return_value=now + expires_in + 1,
+        ):
+            _decode_access_token(token)
+
+        assert mock_decode.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_access_token_rejected(event_loop):
+    token = await create_access_token("some_user_id", 1)
+
+    for _ in range(2):
+        with pytest.raises(CredentialsException):
+            _decode_access_token(token[:-2])
+
+    assert len(access_token_cache) == 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_access_token_decode_benchmark(event_loop):
+    """
+    Benchmark: CPU time spent authenticating a request with and without the
+    access token cache.
+    """
+    token = await create_access_token("some_user_id", 1)
+    request_count = 10000
+
+    started_at = time.process_time()
+    for _ in range(request_count):
+        access_token_cache.clear()
+        _decode_access_token(token)
+    uncached = (time.process_time() - started_at) / request_count
+
+    started_at = time.process_time()
+    for _ in range(request_count):
+        _decode_access_token(token)
+    cached = (time.process_time() - started_at) / request_count
+
+    # A hit only hashes the token, which is far cheaper than verifying it
+    assert cached < uncached / 2
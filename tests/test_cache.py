@@ -0,0 +1,44 @@
+import time
+from unittest.mock import patch
+
+from whoami_back.utils.cache import TTLCache
+
+
+def test_ttl_cache_hit_miss_and_expiry():
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    assert cache.get("a") is None
+    cache.set("a", {"id": "a"})
+    assert cache.get("a") == {"id": "a"}
+
+    # Entries expire after the TTL
+    now = time.monotonic()
+    with patch("whoami_back.utils.cache.time.monotonic", return_value=now + 11):
+        assert cache.get("a") is None
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Touch "a" so that "b" becomes the least recently used entry
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.invalidate("a")
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
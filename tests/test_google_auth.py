@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from whoami_back.utils.google_auth import GoogleIdTokenVerifier
+
+CERTS_URL = "http://certs.test/oauth2/v1/certs"
+AUDIENCE = "test_client_id"
+
+
+def _create_signer_and_cert(key_id: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-google")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(private_key, hashes.SHA256())
+    )
+    private_key_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    signer = crypt.RSASigner.from_string(private_key_pem, key_id=key_id)
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+
+    return signer, cert_pem
+
+
+def _create_id_token(signer, **claims):
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": AUDIENCE,
+        "sub": "fake_google_id",
+        "email": "test@gmail.com",
+        "iat": now,
+        "exp": now + 3600,
+        **claims,
+    }
+
+    return google_jwt.encode(signer, payload).decode()
+
+
+class FakeCertsEndpoint:
+    def __init__(self, certs, *, max_age: int = 3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.requests = 0
+
+    def __call__(self, request):
+        self.requests += 1
+
+        return httpx.Response(
+            200,
+            json=self.certs,
+            headers={"Cache-Control": f"public, max-age={self.max_age}"},
+        )
+
+
+@pytest.mark.asyncio
+async def test_google_id_token_verified_with_cached_certs(event_loop):
+    signer, cert_pem = _create_signer_and_cert("key_1")
+    endpoint = FakeCertsEndpoint({"key_1": cert_pem})
+    verifier = GoogleIdTokenVerifier(
+        certs_url=CERTS_URL,
+        audience=AUDIENCE,
+        transport=httpx.MockTransport(endpoint),
+    )
+    id_token = _create_id_token(signer)
+
+    for _ in range(10):
+        payload = await verifier.verify(id_token)
+        assert payload["sub"] == "fake_google_id"
+
+    # Steady state verification does not touch the network
+    assert endpoint.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_google_expired_certs_refreshed_in_background(event_loop):
+    signer, cert_pem = _create_signer_and_cert("key_1")
+    endpoint = FakeCertsEndpoint({"key_1": cert_pem}, max_age=60)
+    verifier = GoogleIdTokenVerifier(
+        certs_url=CERTS_URL,
+        audience=AUDIENCE,
+        transport=httpx.MockTransport(endpoint),
+    )
+    id_token = _create_id_token(signer)
+    await verifier.verify(id_token)
+
+    # Let the max-age run out
+    verifier._expires_at = time.monotonic() - 1
+
+    # Served from the stale certs while the refresh happens in the background
+    await verifier.verify(id_token)
+    assert endpoint.requests == 1
+
+    await asyncio.sleep(0.1)
+    assert endpoint.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_google_unknown_key_id_triggers_refresh(event_loop):
+    old_signer, old_cert_pem = _create_signer_and_cert("key_1")
+    new_signer, new_cert_pem = _create_signer_and_cert("key_2")
+    endpoint = FakeCertsEndpoint({"key_1": old_cert_pem})
+    verifier = GoogleIdTokenVerifier(
+        certs_url=CERTS_URL,
+        audience=AUDIENCE,
+        min_refresh_interval=0,
+        transport=httpx.MockTransport(endpoint),
+    )
+    await verifier.verify(_create_id_token(old_signer))
+
+    # Google rotated its keys
+    endpoint.certs = {"key_1": old_cert_pem, "key_2": new_cert_pem}
+    payload = await verifier.verify(_create_id_token(new_signer))
+    assert payload["sub"] == "fake_google_id"
+    assert endpoint.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_google_id_token_with_wrong_audience_rejected(event_loop):
+    signer, cert_pem = _create_signer_and_cert("key_1")
+    verifier = GoogleIdTokenVerifier(
+        certs_url=CERTS_URL,
+        audience=AUDIENCE,
+        transport=httpx.MockTransport(FakeCertsEndpoint({"key_1": cert_pem})),
+    )
+
+    with pytest.raises(ValueError):
+        await verifier.verify(_create_id_token(signer, aud="someone_else"))
@@ -0,0 +1,104 @@
+import io
+import time
+
+import pytest
+from PIL import Image
+
+from whoami_back.utils.image_derivatives import (
+    AVATAR_DERIVATIVES,
+    IMAGE_DERIVATIVES,
+    _render,
+)
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _create_photo(width: int, height: int, *, orientation: int = 1) -> bytes:
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    # Camera model
+    exif[0x0110] = "some phone"
+
+    # Some texture so that it compresses like a photo
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 32)
+    image = Image.merge(
+        "RGB", (gradient, noise, gradient.transpose(Image.ROTATE_180))
+    )
+
+    photo = io.BytesIO()
+    image.save(photo, "JPEG", quality=95, exif=exif)
+
+    return photo.getvalue()
+
+
+def _open(derivatives, file_name: str) -> Image.Image:
+    body = next(body for name, body, _ in derivatives if name == file_name)
+
+    return Image.open(io.BytesIO(body))
+
+
+def test_image_derivatives_resized():
+    derivatives = _render(_create_photo(4000, 3000), IMAGE_DERIVATIVES, False)
+
+    assert [name for name, _, _ in derivatives] == [
+        "tile_480.webp",
+        "tile_480.jpg",
+        "full_1600.webp",
+        "full_1600.jpg",
+    ]
+    assert _open(derivatives, "tile_480.webp").size == (480, 360)
+    assert _open(derivatives, "full_1600.jpg").size == (1600, 1200)
+
+    # Small images are never upscaled
+    derivatives = _render(_create_photo(300, 200), IMAGE_DERIVATIVES, False)
+    assert _open(derivatives, "full_1600.webp").size == (300, 200)
+
+
+def test_avatar_derivatives_cropped_to_square():
+    derivatives = _render(_create_photo(400, 300), AVATAR_DERIVATIVES, True)
+
+    assert _open(derivatives, "avatar_64.webp").size == (64, 64)
+    assert _open(derivatives, "avatar_128.jpg").size == (128, 128)
+
+
+def test_image_derivatives_exif_stripped():
+    # Orientation 6 means the camera was rotated 90 degrees
+    derivatives = _render(
+        _create_photo(400, 300, orientation=6), IMAGE_DERIVATIVES, False
+    )
+
+    for name, _, _ in derivatives:
+        image = _open(derivatives, name)
+        assert image.size == (300, 400)
+        assert not image.getexif()
+
+
+def test_transparent_image_derivatives():
+    image = io.BytesIO()
+    Image.new("RGBA", (100, 100), (0, 0, 0, 0)).save(image, "PNG")
+    derivatives = _render(image.getvalue(), AVATAR_DERIVATIVES, True)
+
+    assert _open(derivatives, "avatar_64.webp").mode == "RGBA"
+    # JPEG has no alpha channel, so the transparent parts turn white
+    assert _open(derivatives, "avatar_64.jpg").getpixel((0, 0)) == (255, 255, 255)
+
+
+@pytest.mark.benchmark
+def test_image_derivatives_benchmark():
+    """
+    Benchmark: CPU time and bytes to render the derivatives of a 12MP phone photo.
+    """
+    photo = _create_photo(4000, 3000)
+
+    started_at = time.process_time()
+    derivatives = _render(photo, IMAGE_DERIVATIVES, False)
+    elapsed = time.process_time() - started_at
+
+    print(f"Rendered derivatives of a 12MP photo in {elapsed * 1000:.0f}ms")
+    print(f"Original: {len(photo)} bytes")
+
+    for name, body, _ in derivatives:
+        print(f"{name}: {len(body)} bytes")
+
+    assert sum(len(body) for _, body, _ in derivatives) < len(photo)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from whoami_back.api.v1.users.commands import password_hasher
+from whoami_back.utils.password_hasher import (
+    PasswordHasher,
+    PasswordHasherSaturated,
+    _hash,
+)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_hash_and_verify(event_loop):
+    hasher = PasswordHasher(max_workers=1, max_queue_size=1)
+
+    hashed_password = await hasher.hash("secret123")
+    assert await hasher.verify("secret123", hashed_password)
+    assert not await hasher.verify("wrong_password", hashed_password)
+    assert hasher.stats()["completed"] == 3
+
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated(event_loop):
+    hasher = PasswordHasher(max_workers=1, max_queue_size=0)
+
+    in_flight = asyncio.ensure_future(hasher.hash("secret123"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PasswordHasherSaturated):
+        await hasher.hash("secret123")
+
+    await in_flight
+    assert hasher.stats()["rejected"] == 1
+
+    hasher.shutdown()
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_ping_p99_during_login_storm(api_client, event_loop):
+    """
+    Benchmark: /ping latency while the hasher is saturated with bcrypt work.
+    Hashing inline would stall every ping for ~250ms per hash.
+    """
+    # What a ping would wait for if a hash ran on the event loop. Measured here,
+    # so that the bound scales with the speed of the machine.
+    started_at = time.perf_counter()
+    _hash("secret123")
+    hash_duration = time.perf_counter() - started_at
+
+    async def ping_latencies(count: int):
+        latencies = []
+
+        for _ in range(count):
+            started_at = time.perf_counter()
+            # Waits for the event loop like a request from a socket would. The
+            # test client alone never hands it to the hashing tasks.
+            await asyncio.sleep(0)
+            response = await api_client.get("/ping")
+            latencies.append(time.perf_counter() - started_at)
+            assert response.status_code == 200
+
+        return sorted(latencies)
+
+    def p99(latencies):
+        return latencies[int(len(latencies) * 0.99) - 1]
+
+    baseline = await ping_latencies(100)
+
+    storm_size = password_hasher.max_workers + password_hasher.max_queue_size
+    pinging = True
+
+    async def login_storm():
+        # Keeps the hasher saturated until the last ping
+        while pinging:
+            await asyncio.gather(
+                *(password_hasher.hash("secret123") for _ in range(storm_size))
+            )
+
+    storm = asyncio.ensure_future(login_storm())
+    during_storm = await ping_latencies(100)
+    pinging = False
+    await storm
+
+    assert p99(during_storm) < p99(baseline) + hash_duration / 2
@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import time
+import tracemalloc
+
+import pytest
+from botocore.stub import Stubber
+
+from whoami_back.utils.storage import (
+    MULTIPART_PART_SIZE,
+    LocalBackend,
+    ObjectStorage,
+    ObjectTooLargeError,
+    S3Backend,
+)
+
+
+async def _generate_chunks(size: int, chunk_size: int = 64 * 1024):
+    # Stands in for a request body arriving over the network
+    chunk = os.urandom(chunk_size)
+
+    for _ in range(size // chunk_size):
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_local_storage_upload_and_delete(event_loop, tmp_path):
+    storage = ObjectStorage(backend=LocalBackend(root=tmp_path), max_concurrency=2)
+
+    await storage.upload("bucket", "user_id/post_id/1", io.BytesIO(b"image"))
+    await storage.put("bucket", "user_id/post_id/2", b"thumbnail")
+    assert (tmp_path / "bucket/user_id/post_id/1").read_bytes() == b"image"
+    assert (tmp_path / "bucket/user_id/post_id/2").read_bytes() == b"thumbnail"
+
+    await storage.delete("bucket", "user_id/post_id/1")
+    await storage.delete("bucket", "user_id/post_id/1")
+    assert not (tmp_path / "bucket/user_id/post_id/1").exists()
+
+    stats = storage.stats()
+    assert stats["upload"]["completed"] == 2
+    assert stats["delete"]["completed"] == 2
+    storage.shutdown()
+
+
+def test_s3_upload_intent_requires_sha256_checksum():
+    backend = S3Backend(
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+        max_pool_connections=1,
+    )
+    upload_intent = backend.create_upload_intent(
+        "bucket", "key", max_size=1024, expires_in=60
+    )
+
+    assert upload_intent["fields"]["x-amz-checksum-algorithm"] == "SHA256"
+    policy = base64.b64decode(upload_intent["fields"]["policy"]).decode()
+    assert '["starts-with", "$x-amz-checksum-sha256", ""]' in policy
+
+
+def test_s3_sha256_read_from_checksum():
+    backend = S3Backend(
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+        max_pool_connections=1,
+    )
+    digest = hashlib.sha256(b"image")
+    expected_params = {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"}
+
+    with Stubber(backend._client) as stubber:
+        stubber.add_response(
+            "head_object",
+            {"ChecksumSHA256": base64.b64encode(digest.digest()).decode()},
+            expected_params,
+        )
+        # Uploaded without a checksum
+        stubber.add_response("head_object", {}, expected_params)
+        stubber.add_client_error(
+            "head_object", "404", expected_params=expected_params
+        )
+
+        assert backend.get_sha256("bucket", "key") == digest.hexdigest()
+        assert backend.get_sha256("bucket", "key") is None
+        assert backend.get_sha256("bucket", "key") is None
+
+
+@pytest.mark.asyncio
+async def test_local_storage_key_outside_bucket_rejected(event_loop, tmp_path):
+    storage = ObjectStorage(backend=LocalBackend(root=tmp_path), max_concurrency=1)
+
+    with pytest.raises(ValueError):
+        await storage.put("bucket", "../other_bucket/key", b"image")
+
+    storage.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_local_storage_upload_stream(event_loop, tmp_path):
+    storage = ObjectStorage(backend=LocalBackend(root=tmp_path), max_concurrency=2)
+    size = MULTIPART_PART_SIZE * 2 + 64 * 1024
+
+    digest = hashlib.sha256()
+    chunks = []
+
+    async for chunk in _generate_chunks(size):
+        digest.update(chunk)
+        chunks.append(chunk)
+
+    async def replay():
+        for chunk in chunks:
+            yield chunk
+
+    result = await storage.upload_stream("bucket", "key", replay(), max_size=size)
+    assert result == (size, digest.hexdigest())
+    assert (tmp_path / "bucket/key").read_bytes() == b"".join(chunks)
+    storage.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_local_storage_upload_stream_too_large(event_loop, tmp_path):
+    storage = ObjectStorage(backend=LocalBackend(root=tmp_path), max_concurrency=2)
+    size = MULTIPART_PART_SIZE * 2
+
+    with pytest.raises(ObjectTooLargeError):
+        await storage.upload_stream(
+            "bucket", "key", _generate_chunks(size), max_size=size - 1
+        )
+
+    # The multipart upload was aborted
+    assert os.listdir(tmp_path / "bucket") == []
+    storage.shutdown()
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_upload_stream_memory_benchmark(event_loop, tmp_path):
+    """
+    Benchmark: peak memory allocated while uploading a 50MB body, streamed versus
+    read into memory first.
+    """
+    size = 50 * 1024 * 1024
+    storage = ObjectStorage(backend=LocalBackend(root=tmp_path), max_concurrency=2)
+
+    tracemalloc.start()
+    await storage.upload_stream(
+        "bucket", "streamed", _generate_chunks(size), max_size=size
+    )
+    _, streamed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    body = b"".join([chunk async for chunk in _generate_chunks(size)])
+    await storage.put("bucket", "buffered", body)
+    _, buffered_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    storage.shutdown()
+
+    print(f"Streamed upload peak memory: {streamed_peak / 1024 / 1024:.1f}MB")
+    print(f"Buffered upload peak memory: {buffered_peak / 1024 / 1024:.1f}MB")
+    assert os.path.getsize(tmp_path / "bucket/streamed") == size
+    # The part being received and the part being uploaded, plus their copies
+    assert streamed_peak < MULTIPART_PART_SIZE * 4
+    assert buffered_peak > size
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_storage_benchmark(event_loop, tmp_path):
+    """
+    Benchmark: 100 concurrent uploads with 50ms of storage latency each, and how
+    late the event loop gets to other work meanwhile.
+    """
+    upload_count = 100
+    latency = 0.05
+    storage = ObjectStorage(
+        backend=LocalBackend(root=tmp_path, latency=latency), max_concurrency=20
+    )
+    loop_lags = []
+
+    async def measure_loop_lag():
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(0.005)
+            loop_lags.append(time.perf_counter() - started_at - 0.005)
+
+    lag_task = asyncio.ensure_future(measure_loop_lag())
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        *[
+            storage.upload("bucket", f"key_{i}", io.BytesIO(b"image"))
+            for i in range(upload_count)
+        ]
+    )
+    elapsed = time.perf_counter() - started_at
+    lag_task.cancel()
+    storage.shutdown()
+
+    print(f"Uploaded {upload_count} objects in {elapsed:.2f}s")
+    print(f"Max event loop lag: {max(loop_lags) * 1000:.1f}ms")
+    print(storage.stats())
@@ -1,4 +1,9 @@
+from unittest.mock import patch
+
 import pytest
+from starlette.datastructures import Secret
+
+from whoami_back.api.system import routes as system_routes
 
 
 @pytest.mark.asyncio
@@ -13,3 +18,27 @@ async def test_deep_ping(api_client, event_loop):
     response = await api_client.get("/deep-ping")
     assert response.status_code == 200
     assert response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_requires_token(api_client, event_loop):
+    with patch.object(system_routes, "METRICS_TOKEN", None):
+        response = await api_client.get(
+            "/metrics", headers={"Authorization": "Bearer "}
+        )
+        assert response.status_code == 404
+
+    with patch.object(system_routes, "METRICS_TOKEN", Secret("metrics_token")):
+        response = await api_client.get("/metrics")
+        assert response.status_code == 401
+
+        response = await api_client.get(
+            "/metrics", headers={"Authorization": "Bearer wrong_token"}
+        )
+        assert response.status_code == 401
+
+        response = await api_client.get(
+            "/metrics", headers={"Authorization": "Bearer metrics_token"}
+        )
+        assert response.status_code == 200
+        assert "token_version_cache" in response.json()
@@ -1,5 +1,11 @@
+from whoami_back.api.assets.commands import save_favicon
 from whoami_back.api.main import get_app
+from whoami_back.api.v1.users.commands import email_dispatcher, password_hasher
+from whoami_back.api.v2.posts.commands import post_layout_buffer
+from whoami_back.api.v2.posts.resources.default_posts import default_favicons
 from whoami_back.utils.db import database
+from whoami_back.utils.http import fetch_pool
+from whoami_back.utils.s3 import image_derivatives, storage, storage_gc
 
 app = get_app()
 
@@ -8,7 +14,22 @@ app = get_app()
 async def startup():
     await database.connect()
 
+    # Default posts on signup refer to these
+    for favicon in default_favicons:
+        await save_favicon(favicon)
+
+    email_dispatcher.start()
+    storage_gc.start()
+    post_layout_buffer.start()
+
 
 @app.on_event("shutdown")
 async def shutdown():
+    await email_dispatcher.stop()
+    await image_derivatives.stop()
+    await storage_gc.stop()
+    await post_layout_buffer.stop()
+    await fetch_pool.close()
     await database.disconnect()
+    password_hasher.shutdown()
+    storage.shutdown()
@@ -0,0 +1 @@
+base_url = "/assets"
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Optional
+
+from whoami_back.api.assets import base_url
+from whoami_back.utils.config import ASSETS_HOST
+from whoami_back.utils.db import database
+
+# Magic numbers of the image formats browsers render as favicons
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\x00\x00\x01\x00", "image/x-icon"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+)
+
+
+def get_favicon_hash(image: bytes) -> str:
+    return hashlib.sha256(image).hexdigest()
+
+
+def get_favicon_url(favicon_hash: Optional[str]) -> Optional[str]:
+    if not favicon_hash:
+        return None
+
+    return f"{ASSETS_HOST}{base_url}/favicons/{favicon_hash}"
+
+
+def get_image_media_type(image: bytes) -> str:
+    for signature, media_type in IMAGE_SIGNATURES:
+        if image.startswith(signature):
+            return media_type
+
+    if image[:4] == b"RIFF" and image[8:12] == b"WEBP":
+        return "image/webp"
+
+    return "application/octet-stream"
+
+
+async def save_favicon(image: bytes) -> str:
+    """
+    Store the favicon unless the same image is already stored and return its hash.
+    """
+    favicon_hash = get_favicon_hash(image)
+    query = """
+INSERT INTO favicon (hash, image)
+VALUES (:hash, :image)
+ON CONFLICT (hash) DO NOTHING
+    """
+    await database.execute(
+        query=query, values={"hash": favicon_hash, "image": image}
+    )
+
+    return favicon_hash
+
+
+async def get_favicon(favicon_hash: str) -> Optional[bytes]:
+    query = """
+SELECT image
+FROM favicon
+WHERE hash = :hash
+    """
+
+    return await database.execute(query=query, values={"hash": favicon_hash})
@@ -0,0 +1,56 @@
+import re
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from whoami_back.api.assets import base_url, commands
+
+router = APIRouter(prefix=base_url, tags=["assets"])
+FAVICON_HASH_PATTERN = re.compile("^[0-9a-f]{64}$")
+
+# Favicons are addressed by their content hash, so a URL never changes what it
+# points to
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/favicons/{favicon_hash}")
+async def get_favicon(
+    favicon_hash: str,
+    *,
+    if_none_match: str = Header(None),
+):
+    """
+    Return the raw favicon image with the given hash.
+    """
+    if not FAVICON_HASH_PATTERN.match(favicon_hash):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Favicon not found"
+        )
+
+    headers = {
+        "ETag": f'"{favicon_hash}"',
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or headers["ETag"]
+        in [etag.strip().replace("W/", "") for etag in if_none_match.split(",")]
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    image = await commands.get_favicon(favicon_hash)
+
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Favicon not found"
+        )
+
+    return Response(
+        content=image,
+        media_type=commands.get_image_media_type(image),
+        headers={**headers, "X-Content-Type-Options": "nosniff"},
+    )
+
+
+def add_router(app):
+    app.include_router(router)
@@ -1,6 +1,26 @@
-from fastapi import APIRouter, Response
+import secrets
+from typing import Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from whoami_back.api.v1.posts.commands import thumbnail_fetcher
+from whoami_back.api.v1.users.commands import (
+    access_token_cache,
+    email_dispatcher,
+    oauth2_scheme,
+    password_hasher,
+    principal_cache,
+    token_version_cache,
+)
+from whoami_back.api.v2.links.commands import (
+    link_preview_flight,
+    site_favicon_flight,
+)
+from whoami_back.api.v2.posts.commands import post_layout_buffer
+from whoami_back.utils.config import METRICS_TOKEN
 from whoami_back.utils.db import database
+from whoami_back.utils.http import fetch_pool
+from whoami_back.utils.s3 import image_derivatives, storage, storage_gc
 
 router = APIRouter()
 
@@ -24,5 +44,46 @@ async def deep_ping():
     return Response(str(result))
 
 
+def verify_metrics_token(token: Optional[str] = Depends(oauth2_scheme)) -> None:
+    if METRICS_TOKEN is None or not str(METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Not Found"
+        )
+
+    if not secrets.compare_digest(
+        (token or "").encode(), str(METRICS_TOKEN).encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/metrics", dependencies=[Depends(verify_metrics_token)])
+async def metrics():
+    """
+    This endpoint reports in-process counters of this worker. Used to size caches
+    and pools. Only served with METRICS_TOKEN as the bearer token.
+    """
+    return {
+        "principal_cache": principal_cache.stats(),
+        "token_version_cache": token_version_cache.stats(),
+        "access_token_cache": access_token_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_dispatcher": email_dispatcher.stats(),
+        "storage": storage.stats(),
+        "image_derivatives": image_derivatives.stats(),
+        "storage_gc": storage_gc.stats(),
+        "fetch_pool": fetch_pool.stats(),
+        "thumbnail_fetcher": thumbnail_fetcher.stats(),
+        "post_layout_buffer": post_layout_buffer.stats(),
+        "link_previews": {
+            "in_flight": len(link_preview_flight),
+            "site_favicons_in_flight": len(site_favicon_flight),
+        },
+    }
+
+
 def add_router(app):
     app.include_router(router)
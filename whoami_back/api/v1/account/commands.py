@@ -8,6 +8,7 @@ from whoami_back.api.v1.users import commands as user_commands
 from whoami_back.api.v1.utils.commands import validate_email
 from whoami_back.utils.config import CONFIRMATION_JWT_EXPIRES_IN_HOURS, FE_HOSTS
 from whoami_back.utils.db import database, to_csv, to_ref_csv
+from whoami_back.utils.stored_objects import release_object_uris
 
 # Initialize shared objects
 FE_HOST = FE_HOSTS[0]
@@ -21,52 +22,42 @@ class EMAIL_TEMPLATE_IDS:
 
 
 async def send_deactivate_account_confirmation_email(
-    user_id: str, email: str, background_tasks
+    user_id: str, email: str
 ) -> None:
-    user_token = await user_commands.create_access_token(
+    user_token = await user_commands.create_link_token(
         user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS
     )
     deactivate_account_link = (
         f"{FE_HOST}/users/deactivate/confirm?token={user_token}"
     )
-    background_tasks.add_task(
-        user_commands.send_email,
+    await user_commands.send_email(
         email,
         EMAIL_TEMPLATE_IDS.CONFIRM_DEACTIVATE_ACCOUNT,
         deactivate_account_link,
     )
 
 
-async def send_delete_account_confirmation_email(
-    user_id: str, email: str, background_tasks
-) -> None:
-    user_token = await user_commands.create_access_token(
+async def send_delete_account_confirmation_email(user_id: str, email: str) -> None:
+    user_token = await user_commands.create_link_token(
         user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS
     )
     delete_account_link = f"{FE_HOST}/users/delete/confirm?token={user_token}"
-    background_tasks.add_task(
-        user_commands.send_email,
+    await user_commands.send_email(
         email,
         EMAIL_TEMPLATE_IDS.CONFIRM_DELETE_ACCOUNT,
         delete_account_link,
     )
 
 
-def send_account_deleted_email(email: str, background_tasks) -> None:
-    background_tasks.add_task(
-        user_commands.send_email,
-        email,
-        EMAIL_TEMPLATE_IDS.ACCOUNT_DELETED,
-        FE_HOST,
+async def send_account_deleted_email(email: str) -> None:
+    await user_commands.send_email(
+        email, EMAIL_TEMPLATE_IDS.ACCOUNT_DELETED, FE_HOST
     )
 
 
-def send_account_deactivated_email(email: str, background_tasks) -> None:
-    background_tasks.add_task(
-        user_commands.send_email,
-        email,
-        EMAIL_TEMPLATE_IDS.ACCOUNT_DEACTIVATED,
-        FE_HOST,
+async def send_account_deactivated_email(email: str) -> None:
+    await user_commands.send_email(
+        email, EMAIL_TEMPLATE_IDS.ACCOUNT_DEACTIVATED, FE_HOST
     )
 
 
@@ -75,11 +66,13 @@ async def update_account_privacy(user_id: str, public: bool):
 UPDATE \"user\"
 SET
     public = :public,
+    token_version = token_version + 1,
     updated_at = NOW()
 WHERE id = :user_id
     """
     values = {"user_id": user_id, "public": public}
     await database.execute(query=query, values=values)
+    user_commands.invalidate_principal(user_id)
 
 
 async def get_linked_profiles(user_id: str):
@@ -157,11 +150,34 @@ VALUES {value_statement}
 
 
 async def delete_user(user_id: str) -> None:
+    """
+    Call this in a transaction so that the user's references to uploaded objects
+    are given back only if the user is deleted.
+    """
+    query = """
+SELECT profile_image_s3_uri AS uri FROM "user" WHERE id = :user_id
+UNION ALL
+SELECT profile_background_s3_uri FROM "user" WHERE id = :user_id
+UNION ALL
+SELECT background_image_s3_uri FROM board WHERE user_id = :user_id
+UNION ALL
+SELECT uri
+FROM (
+    -- Image posts created through v1 hold their image in both columns
+    SELECT DISTINCT post.id, uri
+    FROM post, unnest(ARRAY[post.thumbnail_image_uri, post.content_uri]) AS uri
+    WHERE post.user_id = :user_id
+) AS post_uri
+    """
+    rows = await database.fetch_all(query=query, values={"user_id": user_id})
+    await release_object_uris([row["uri"] for row in rows])
+
     query = """
 DELETE FROM \"user\"
 WHERE id = :user_id
     """
     await database.execute(query=query, values={"user_id": user_id})
+    user_commands.invalidate_principal(user_id)
 
 
 async def deactivate_user(user_id: str) -> None:
@@ -169,10 +185,12 @@ async def deactivate_user(user_id: str) -> None:
 UPDATE \"user\"
 SET
     active = FALSE,
+    token_version = token_version + 1,
     updated_at = NOW()
 WHERE id = :user_id
     """
     await database.execute(query=query, values={"user_id": user_id})
+    user_commands.invalidate_principal(user_id)
 
 
 async def initiate_email_update(
@@ -194,6 +212,7 @@ WHERE
     """
     values = {"user_id": user_id, "new_email": new_email}
     await database.execute(query=query, values=values)
+    user_commands.invalidate_principal(user_id)
 
 
 async def confirm_new_email(user_id: str) -> None:
@@ -208,6 +227,7 @@ WHERE
     id = :user_id
     """
     await database.execute(query=query, values={"user_id": user_id})
+    user_commands.invalidate_principal(user_id)
 
 
 async def cancel_email_update(user_id: str) -> None:
@@ -221,9 +241,13 @@ WHERE
     id = :user_id
     """
     await database.execute(query=query, values={"user_id": user_id})
+    user_commands.invalidate_principal(user_id)
 
 
-async def update_password(user_id: str, new_password: str) -> None:
+async def update_password(user_id: str, new_password: str) -> int:
+    """
+    Revoke the tokens minted so far and return the new token_version.
+    """
     valid, message = user_commands.validate_password(new_password)
 
     if not valid:
@@ -233,22 +257,30 @@ async def update_password(user_id: str, new_password: str) -> None:
 UPDATE \"user\"
 SET
     password = :new_hashed_password,
+    token_version = token_version + 1,
+    min_token_version = token_version + 1,
     updated_at = NOW(),
     failed_login_attempt_count = 0
 WHERE id = :user_id
+RETURNING token_version
     """
     values = {
         "user_id": user_id,
-        "new_hashed_password": user_commands.hash_password(new_password),
+        "new_hashed_password": await user_commands.hash_password(new_password),
     }
-    await database.execute(query=query, values=values)
+    token_version = await database.execute(query=query, values=values)
+    user_commands.invalidate_principal(user_id)
+
+    return token_version
 
 
-def confirm_password(given_password: str, correct_hashed_password: str):
+async def confirm_password(given_password: str, correct_hashed_password: str):
     """
     Raise an exception if not matching
     """
-    if not user_commands.verify_password(given_password, correct_hashed_password):
+    if not await user_commands.verify_password(
+        given_password, correct_hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong password"
         )
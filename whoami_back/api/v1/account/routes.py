@@ -1,13 +1,16 @@
 from typing import Dict
 
 from asyncpg.exceptions import UniqueViolationError
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from pydantic import EmailStr
 
 from whoami_back.api.v1.account import base_url, commands
 from whoami_back.api.v1.account.models import UpdateLinkedProfilesModel
 from whoami_back.api.v1.users import commands as user_commands
+from whoami_back.api.v1.users.models import Token
+from whoami_back.utils.config import LOGIN_JWT_EXPIRES_IN_HOURS
+from whoami_back.utils.db import database
 
 router = APIRouter(prefix=f"{base_url}", tags=["account"])
 
@@ -41,90 +44,84 @@ async def update_linked_profiles(
 
 @router.delete("")
 async def delete_account_with_password(
-    background_tasks: BackgroundTasks,
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
     password: str = Body(..., embed=True),
 ):
-    commands.confirm_password(password, user["password"])
+    await commands.confirm_password(password, user["password"])
 
-    await commands.delete_user(user["id"])
-    commands.send_account_deleted_email(user["email"], background_tasks)
+    async with database.transaction():
+        await commands.delete_user(user["id"])
+        await commands.send_account_deleted_email(user["email"])
 
 
 @router.patch("/deactivate")
 async def deactivate_account_with_password(
-    background_tasks: BackgroundTasks,
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
     password: str = Body(..., embed=True),
 ):
-    commands.confirm_password(password, user["password"])
+    await commands.confirm_password(password, user["password"])
 
-    await commands.deactivate_user(user["id"])
-    commands.send_account_deactivated_email(user["email"], background_tasks)
+    async with database.transaction():
+        await commands.deactivate_user(user["id"])
+        await commands.send_account_deactivated_email(user["email"])
 
 
 @router.get("/send-delete-confirmation")
 async def send_delete_confirmation(
-    background_tasks: BackgroundTasks,
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
     """
     This endpoint sends a confirmation email to delete the account only to be used
       by 3rd party OAuth users
     """
-    await commands.send_delete_account_confirmation_email(
-        user["id"], user["email"], background_tasks
-    )
+    await commands.send_delete_account_confirmation_email(user["id"], user["email"])
 
 
 @router.get("/send-deactivate-confirmation")
 async def send_deactivate_confirmation(
-    background_tasks: BackgroundTasks,
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
     """
     This endpoint sends a confirmation email to deactivate the account only to be
       used by 3rd party OAuth users
     """
     await commands.send_deactivate_account_confirmation_email(
-        user["id"], user["email"], background_tasks
+        user["id"], user["email"]
     )
 
 
 @router.delete("/delete-without-password")
 async def delete_account_without_password(
-    background_tasks: BackgroundTasks,
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
 ):
-    await commands.delete_user(user["id"])
-    commands.send_account_deleted_email(user["email"], background_tasks)
+    async with database.transaction():
+        await commands.delete_user(user["id"])
+        await commands.send_account_deleted_email(user["email"])
 
 
 @router.patch("/deactivate-without-password")
 async def deactivate_account_without_password(
-    background_tasks: BackgroundTasks,
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
 ):
-    await commands.deactivate_user(user["id"])
-    commands.send_account_deactivated_email(user["email"], background_tasks)
+    async with database.transaction():
+        await commands.deactivate_user(user["id"])
+        await commands.send_account_deactivated_email(user["email"])
 
 
 @router.patch("/email")
 async def initiate_email_update(
-    background_tasks: BackgroundTasks,
     new_email: EmailStr = Body(..., embed=True),
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
-    await commands.initiate_email_update(user["id"], user["email"], new_email)
-    await user_commands.send_new_email_confirmation_email(
-        new_email, user["id"], background_tasks
-    )
+    async with database.transaction():
+        await commands.initiate_email_update(user["id"], user["email"], new_email)
+        await user_commands.send_new_email_confirmation_email(new_email, user["id"])
 
 
 @router.patch("/confirm-new-email")
 async def confirm_new_email(
     confirmed_new_email: EmailStr = Body(..., embed=True),
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
     if user["unconfirmed_new_email"] != confirmed_new_email:
         raise HTTPException(
@@ -145,18 +142,26 @@ async def cancel_email_update(
     await commands.cancel_email_update(user["id"])
 
 
-@router.patch("/update-password")
+@router.patch("/update-password", response_model=Token)
 async def update_password(
     old_password: str = Body(..., embed=True),
     new_password: str = Body(..., embed=True),
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
-):
+) -> Token:
     """
-    This is updating password from the settings
+    This is updating password from the settings. The tokens minted before are
+    revoked, so a new one is returned to replace the caller's.
     """
-    commands.confirm_password(old_password, user["password"])
+    await commands.confirm_password(old_password, user["password"])
 
-    await commands.update_password(user["id"], new_password)
+    user["token_version"] = await commands.update_password(user["id"], new_password)
+    access_token = await user_commands.create_access_token(
+        user["id"],
+        LOGIN_JWT_EXPIRES_IN_HOURS,
+        claims=user_commands.get_login_claims(user),
+    )
+
+    return {"access_token": access_token}
 
 
 @router.patch("/reset-password")
@@ -175,7 +180,7 @@ async def confirm_password(
     password: str = Body(..., embed=True),
     user: Dict = Depends(user_commands.get_current_active_user_with_password),
 ):
-    commands.confirm_password(password, user["password"])
+    await commands.confirm_password(password, user["password"])
 
 
 def add_router(app):
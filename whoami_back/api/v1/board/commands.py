@@ -8,12 +8,17 @@ from whoami_back.api.v1.board.models import BoardBackgroundImageFittingMode
 from whoami_back.utils.config import BOARD_IMAGES_S3_BUCKET
 from whoami_back.utils.db import database, to_set_statement
 from whoami_back.utils.models import exclude_unset, nullify_text_columns
-from whoami_back.utils.s3 import get_s3_object_uri, s3_client
+from whoami_back.utils.s3 import get_s3_object_uri, image_derivatives
+from whoami_back.utils.stored_objects import release_object_uris, upload_deduplicated
 
 
 async def get_board_background(user_id: str) -> Dict:
     query = """
-SELECT background_image_s3_uri, background_image_fitting_mode, background_hex_color
+SELECT
+    background_image_s3_uri,
+    background_image_derivatives_uri,
+    background_image_fitting_mode,
+    background_hex_color
 FROM board
 WHERE user_id = :user_id
     """
@@ -22,16 +27,33 @@ WHERE user_id = :user_id
     return jsonable_encoder(result)
 
 
+async def bump_board_version(user_id: str) -> None:
+    """
+    Change the ETag of the user's board. Called, in the same transaction, by
+    everything that changes the posts or the background the board returns.
+    """
+    query = """
+UPDATE board
+SET version = version + 1
+WHERE user_id = :user_id
+    """
+    await database.execute(query=query, values={"user_id": user_id})
+
+
 async def delete_board_background_image(user_id: str) -> None:
+    # b2 is locked first, so that concurrent updates each read what the other
+    # wrote and never release the same image twice
     query = """
 UPDATE
     board b1
 SET
     background_image_s3_uri = NULL,
+    background_image_derivatives_uri = NULL,
     background_image_fitting_mode = NULL,
-    updated_at = NOW()
+    updated_at = NOW(),
+    version = b1.version + 1
 FROM
-    board b2
+    (SELECT * FROM board WHERE user_id = :user_id FOR UPDATE) b2
 WHERE
     b1.user_id = b2.user_id
     AND b1.user_id = :user_id
@@ -39,32 +61,33 @@ RETURNING
     b2.background_image_s3_uri,
     b2.background_image_fitting_mode
     """
-    result = await database.fetch_one(query=query, values={"user_id": user_id})
 
-    if result["background_image_s3_uri"]:
-        s3_object_key = result["background_image_s3_uri"].split("com/")[-1]
-        s3_client.delete_object(Bucket=BOARD_IMAGES_S3_BUCKET, Key=s3_object_key)
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values={"user_id": user_id})
+        await release_object_uris([result["background_image_s3_uri"]])
 
 
 async def update_board_background(
     user_id: str,
     *,
     background_image: Optional[UploadFile] = None,
+    background_image_s3_object_key: Optional[str] = None,
     background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = None,
     background_hex_color: Optional[str] = None,
 ) -> Dict:
     background_image_s3_uri = None
 
+    # Otherwise, the object was uploaded by the client through an upload intent
     if background_image:
-        s3_object_key = f"background_image/{user_id}/{uuid4()}"
-        background_image_s3_uri = get_s3_object_uri(
-            BOARD_IMAGES_S3_BUCKET, s3_object_key
-        )
-        s3_client.upload_fileobj(
-            background_image.file,
+        background_image_s3_object_key = await upload_deduplicated(
             BOARD_IMAGES_S3_BUCKET,
-            s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
+            f"background_image/{user_id}/{uuid4()}",
+            background_image.file,
+        )
+
+    if background_image_s3_object_key:
+        background_image_s3_uri = get_s3_object_uri(
+            BOARD_IMAGES_S3_BUCKET, background_image_s3_object_key
         )
 
     update_background_data = nullify_text_columns(
@@ -78,29 +101,43 @@ async def update_board_background(
     )
     update_background_data["user_id"] = user_id
 
+    if background_image_s3_uri:
+        update_background_data["background_image_derivatives_uri"] = None
+
     set_statement = to_set_statement(update_background_data.keys())
     query = f"""
 UPDATE
     board b1
 SET
-    {set_statement}
+    {set_statement},
+    version = b1.version + 1
 FROM
-    board b2
+    (SELECT * FROM board WHERE user_id = :user_id FOR UPDATE) b2
 WHERE
     b1.user_id = b2.user_id
     AND b1.user_id = :user_id
 RETURNING
     b2.background_image_s3_uri as prev_bg_image_uri,
     b1.background_image_s3_uri,
+    b1.background_image_derivatives_uri,
     b1.background_hex_color,
     b1.background_image_fitting_mode
     """
 
-    result = await database.fetch_one(query=query, values=update_background_data)
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values=update_background_data)
+
+        # The image is kept when only the color or the fitting mode changes.
+        # Attaching the same image again took a reference of its own.
+        if background_image_s3_uri:
+            await release_object_uris([result["prev_bg_image_uri"]])
 
-    if result["prev_bg_image_uri"]:
-        prev_bg_image_uri = result["prev_bg_image_uri"]
-        s3_object_key = prev_bg_image_uri.split("com/")[-1]
-        s3_client.delete_object(Bucket=BOARD_IMAGES_S3_BUCKET, Key=s3_object_key)
+    if background_image_s3_object_key:
+        image_derivatives.schedule(
+            "board_background",
+            user_id,
+            BOARD_IMAGES_S3_BUCKET,
+            background_image_s3_object_key,
+        )
 
     return jsonable_encoder(result)
@@ -17,6 +17,8 @@ class BoardBackgroundImageFittingMode(str, Enum):
 
 class BoardBackgroundModel(BaseModel):
     background_image_s3_uri: Optional[str] = Field(example="some uri")
+    # Resized copies of the image, see whoami_back/utils/image_derivatives.py
+    background_image_derivatives_uri: Optional[str] = Field(example="some uri")
     background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = Field(
         example="fill"
     )
@@ -13,7 +13,6 @@ from whoami_back.api.v1.board.models import (
 from whoami_back.api.v1.follow.commands import check_approved_following
 from whoami_back.api.v1.posts import commands as post_commands
 from whoami_back.api.v1.users import commands as user_commands
-from whoami_back.utils.db import database
 
 router = APIRouter(prefix=base_url, tags=["board_v1"])
 
@@ -55,6 +54,7 @@ async def get_board(
     username: str,
     *,
     board_view_type: Optional[BoardViewType] = None,
+    fields: Optional[str] = None,
     current_user: Optional[Dict] = Depends(
         user_commands.get_current_active_user_auth_optional
     ),
@@ -63,6 +63,8 @@ async def get_board(
     Return the user board. If user is not found, we assume it's either unauthorized
     or inactive user OR no JWT token given (public access)
     """
+    post_fields = post_commands.parse_post_fields(fields)
+
     # Check if the username exists
     target_user = await user_commands.get_user(username=username)
     if not target_user:
@@ -100,21 +102,14 @@ async def get_board(
 
     if not board_view_type:
         if current_user:
-            query = """
-SELECT board_view_type
-FROM board
-WHERE user_id = :user_id
-            """
-            board_view_type = await database.execute(
-                query=query, value={"user_id": current_user["id"]}
-            )
+            board_view_type = current_user["board_view_type"]
         else:
             # Default
             board_view_type = BoardViewType.BOARD
 
     # Either public OR private but passed the tests above
     posts = await post_commands.get_posts(
-        target_user["id"], board_view_type=board_view_type
+        target_user["id"], board_view_type=board_view_type, fields=post_fields
     )
 
     return {"posts": posts}
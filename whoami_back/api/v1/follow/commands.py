@@ -44,6 +44,7 @@ async def get_follow_requests(followed_user_id: str):
     columns = [
         '"user".id AS user_id',
         '"user".profile_image_s3_uri',
+        '"user".profile_image_derivatives_uri',
         '"user".username',
     ]
     filters = [
@@ -67,6 +68,7 @@ async def get_followers(followed_user_id: str, current_user_id: str):
     columns = [
         "f_1.following_user_id",
         '"user".profile_image_s3_uri',
+        '"user".profile_image_derivatives_uri',
         '"user".username',
         """
         (
@@ -116,6 +118,9 @@ WHERE {where_clause}
         row["user"] = {
             "id": row.pop("following_user_id"),
             "profile_image_s3_uri": row.pop("profile_image_s3_uri"),
+            "profile_image_derivatives_uri": row.pop(
+                "profile_image_derivatives_uri"
+            ),
             "username": row.pop("username"),
         }
         row["current_user_following_status"] = determine_following_status(
@@ -143,6 +148,7 @@ AND
 SELECT
     f_1.followed_user_id,
     "user".profile_image_s3_uri,
+    "user".profile_image_derivatives_uri,
     "user".username,
     (
         SELECT
@@ -175,6 +181,9 @@ WHERE
         row["user"] = {
             "id": row.pop("followed_user_id"),
             "profile_image_s3_uri": row.pop("profile_image_s3_uri"),
+            "profile_image_derivatives_uri": row.pop(
+                "profile_image_derivatives_uri"
+            ),
             "username": row.pop("username"),
         }
         row["current_user_following_status"] = determine_following_status(
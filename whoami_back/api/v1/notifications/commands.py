@@ -34,6 +34,7 @@ SELECT
     notification_action.message,
     "user".username,
     "user".profile_image_s3_uri,
+    "user".profile_image_derivatives_uri,
     (
         SELECT
             approved
@@ -63,6 +64,9 @@ ORDER BY notification.updated_at desc
         row["triggering_user"] = {
             "id": row.pop("triggering_user_id"),
             "profile_image_s3_uri": row.pop("profile_image_s3_uri"),
+            "profile_image_derivatives_uri": row.pop(
+                "profile_image_derivatives_uri"
+            ),
             "username": row.pop("username"),
             "current_user_following_status": determine_following_status(
                 row.pop("current_user_following_status")
@@ -123,6 +127,7 @@ SELECT
     notification_action.message,
     "user".username,
     "user".profile_image_s3_uri,
+    "user".profile_image_derivatives_uri,
     (
         SELECT
             approved
@@ -145,6 +150,7 @@ WHERE notification.target_user_id = :user_id
     result["triggering_user"] = {
         "id": result.pop("triggering_user_id"),
         "profile_image_s3_uri": result.pop("profile_image_s3_uri"),
+        "profile_image_derivatives_uri": result.pop("profile_image_derivatives_uri"),
         "username": result.pop("username"),
         "current_user_following_status": determine_following_status(
             result.pop("current_user_following_status")
@@ -1,49 +1,107 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from uuid import uuid4
 
-import httpx
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 
+from whoami_back.api.assets.commands import get_favicon_url
+from whoami_back.api.v1.board.commands import bump_board_version
 from whoami_back.api.v1.board.models import BoardViewType
 from whoami_back.api.v1.posts.models import CreatePostModel, UpdatePostModel
+from whoami_back.utils.cache import TTLCache
 from whoami_back.utils.config import (
     POST_IMAGES_S3_BUCKET,
     POST_THUMBNAIL_IMAGES_S3_BUCKET,
+    THUMBNAIL_CACHE_MAX_SIZE,
+    THUMBNAIL_CACHE_TTL_IN_SECONDS,
+    THUMBNAIL_FETCH_MAX_SIZE_IN_BYTES,
+)
+from whoami_back.utils.db import database, to_csv
+from whoami_back.utils.fetch_pool import FetchError
+from whoami_back.utils.http import fetch_pool
+from whoami_back.utils.post_layouts import (
+    POST_LAYOUT_JOIN_STATEMENT,
+    split_layout,
+    to_insert_post_statement,
+    to_post_columns_csv,
+    to_update_post_statement,
+    update_post_layout,
+)
+from whoami_back.utils.s3 import image_derivatives
+from whoami_back.utils.stored_objects import release_object_uris, upload_deduplicated
+from whoami_back.utils.thumbnail_fetcher import ThumbnailFetcher
+
+# Columns a post listing can be narrowed to with fields=
+POST_FIELDS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "user_id",
+    "content_uri",
+    "source",
+    "thumbnail_image_uri",
+    "thumbnail_image_derivatives_uri",
+    "title",
+    "description",
+    "post_image_s3_uri",
+    "x",
+    "y",
+    "width",
+    "height",
+    "scale",
+    "favicon_hash",
+)
+
+# Columns holding the image of a whoami image post
+IMAGE_POST_URI_COLUMNS = ("content_uri", "thumbnail_image_uri")
+
+# Enough to lay the tiles out for the first paint
+POST_FIELD_PRESETS = {"layout": ("id", "x", "y", "width", "height", "scale")}
+
+# Initialize shared objects
+thumbnail_fetcher = ThumbnailFetcher(
+    fetch_pool=fetch_pool,
+    max_size=THUMBNAIL_FETCH_MAX_SIZE_IN_BYTES,
+    cache=TTLCache(
+        maxsize=THUMBNAIL_CACHE_MAX_SIZE, ttl=THUMBNAIL_CACHE_TTL_IN_SECONDS
+    ),
 )
-from whoami_back.utils.db import database, to_csv, to_ref_csv, to_set_statement
-from whoami_back.utils.s3 import s3_client
+
+
+def _pop_previous_uris(result: Dict) -> List[Optional[str]]:
+    # Image posts hold their image in both columns, which counts once
+    return list(
+        {result.pop(f"previous_{column}") for column in IMAGE_POST_URI_COLUMNS}
+    )
 
 
 async def delete_whoami_post_image(
     post_id: str,
     user_id: str,
 ):
-    query = """
-SELECT content_uri
-FROM post
-WHERE user_id = :user_id AND id = :post_id
-    """
-    values = {"post_id": post_id, "user_id": user_id}
-    content_uri = await database.execute(query=query, values=values)
+    query = to_update_post_statement(
+        ["content_uri", "thumbnail_image_uri", "thumbnail_image_derivatives_uri"],
+        ["id", *CreatePostModel.__fields__.keys()],
+        previous_columns=IMAGE_POST_URI_COLUMNS,
+    )
+    values = {
+        "post_id": post_id,
+        "user_id": user_id,
+        "content_uri": None,
+        "thumbnail_image_uri": None,
+        "thumbnail_image_derivatives_uri": None,
+    }
 
-    if content_uri:
-        s3_object_key = content_uri.split("com/")[-1]
-        s3_client.delete_object(Bucket=POST_IMAGES_S3_BUCKET, Key=s3_object_key)
+    async with database.transaction():
+        result = jsonable_encoder(
+            await database.fetch_one(query=query, values=values)
+        )
+        await bump_board_version(user_id)
 
-    returning_statement = to_csv(CreatePostModel.__fields__.keys())
-    query = f"""
-UPDATE post
-SET
-    content_uri = NULL,
-    thumbnail_image_uri = NULL,
-    updated_at = NOW()
-WHERE user_id = :user_id AND id = :post_id
-RETURNING id, {returning_statement}
-    """
-    result = await database.fetch_one(query=query, values=values)
+        if result:
+            await release_object_uris(_pop_previous_uris(result))
 
-    return jsonable_encoder(result)
+    return result
 
 
 async def update_whoami_image_post(
@@ -69,55 +127,51 @@ async def update_whoami_image_post(
         "description": description,
     }
 
-    update_post_data = {
-        k: update_data[k] for k in update_data if update_data[k] is not None
-    }
+    update_post_data, layout = split_layout(
+        {k: update_data[k] for k in update_data if update_data[k] is not None}
+    )
 
     if content_image:
         # This content_uri setting mechanism is to trigger React
-        query = """
-SELECT content_uri
-FROM post
-WHERE user_id = :user_id AND id = :post_id
-        """
-        values = {
-            "user_id": user_id,
-            "post_id": post_id,
-        }
-        content_uri = await database.execute(query=query, values=values)
-
-        if content_uri:
-            s3_object_key = content_uri.split("com/")[-1]
-            s3_client.delete_object(Bucket=POST_IMAGES_S3_BUCKET, Key=s3_object_key)
-
-        s3_object_key = f"{user_id}/{post_id}/{uuid4()}"
+        s3_object_key = await upload_deduplicated(
+            POST_IMAGES_S3_BUCKET,
+            f"{user_id}/{post_id}/{uuid4()}",
+            content_image.file,
+        )
 
         content_image_s3_uri = (
             f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
         )
-        s3_client.upload_fileobj(
-            content_image.file,
-            POST_IMAGES_S3_BUCKET,
-            s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
-        )
         update_post_data["content_uri"] = content_image_s3_uri
         update_post_data["thumbnail_image_uri"] = content_image_s3_uri
+        update_post_data["thumbnail_image_derivatives_uri"] = None
 
-    set_statement = to_set_statement(update_post_data.keys())
-    returning_statement = to_csv(UpdatePostModel.__fields__.keys())
-
-    query = f"""
-UPDATE post
-SET {set_statement}
-WHERE user_id = :user_id AND id = :post_id
-RETURNING id, {returning_statement}
-    """
+    query = to_update_post_statement(
+        update_post_data.keys(),
+        ["id", *UpdatePostModel.__fields__.keys()],
+        previous_columns=IMAGE_POST_URI_COLUMNS if content_image else (),
+    )
     update_post_data["user_id"] = user_id
     update_post_data["post_id"] = post_id
-    result = await database.fetch_one(query=query, values=update_post_data)
 
-    return jsonable_encoder(result)
+    async with database.transaction():
+        if layout:
+            await update_post_layout(user_id, post_id, layout)
+
+        result = jsonable_encoder(
+            await database.fetch_one(query=query, values=update_post_data)
+        )
+        await bump_board_version(user_id)
+
+        if content_image and result:
+            await release_object_uris(_pop_previous_uris(result))
+
+    if content_image:
+        image_derivatives.schedule(
+            "post_image", post_id, POST_IMAGES_S3_BUCKET, s3_object_key
+        )
+
+    return result
 
 
 async def create_whoami_image_post(
@@ -148,49 +202,96 @@ async def create_whoami_image_post(
         create_post_data["description"] = description
 
     if content_image:
-        s3_object_key = f"{user_id}/{create_post_data['id']}/{uuid4()}"
+        s3_object_key = await upload_deduplicated(
+            POST_IMAGES_S3_BUCKET,
+            f"{user_id}/{create_post_data['id']}/{uuid4()}",
+            content_image.file,
+        )
         content_image_s3_uri = (
             f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
         )
-        s3_client.upload_fileobj(
-            content_image.file,
+        create_post_data["content_uri"] = content_image_s3_uri
+        create_post_data["thumbnail_image_uri"] = content_image_s3_uri
+
+    post_data, _ = split_layout(create_post_data)
+    query = to_insert_post_statement(
+        post_data.keys(), ["id", *CreatePostModel.__fields__.keys()]
+    )
+
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values=create_post_data)
+        await bump_board_version(user_id)
+
+    if content_image:
+        image_derivatives.schedule(
+            "post_image",
+            create_post_data["id"],
             POST_IMAGES_S3_BUCKET,
             s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
         )
-        create_post_data["content_uri"] = content_image_s3_uri
-        create_post_data["thumbnail_image_uri"] = content_image_s3_uri
 
-    insert_statement = to_csv(create_post_data.keys())
-    value_statement = to_ref_csv(create_post_data.keys())
-    returning_statement = to_csv(CreatePostModel.__fields__.keys())
+    return jsonable_encoder(result)
 
-    query = f"""
-INSERT INTO post ({insert_statement})
-VALUES ({value_statement})
-RETURNING id, {returning_statement}
+
+def parse_post_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Return the post columns to select given fields, either a comma separated list
+    of columns or the name of a preset. The id is always included. None means
+    every column.
     """
-    result = await database.fetch_one(query=query, values=create_post_data)
+    if not fields:
+        return None
 
-    return jsonable_encoder(result)
+    if fields in POST_FIELD_PRESETS:
+        return list(POST_FIELD_PRESETS[fields])
+
+    columns = [column.strip() for column in fields.split(",") if column.strip()]
+    unknown_columns = [column for column in columns if column not in POST_FIELDS]
+
+    if unknown_columns:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown post fields: {to_csv(unknown_columns)}",
+        )
+
+    # The order is kept and duplicates are dropped
+    return list(dict.fromkeys(["id", *columns]))
 
 
-async def get_posts(user_id: str, *, board_view_type: BoardViewType = None):
+async def get_posts(
+    user_id: str,
+    *,
+    board_view_type: BoardViewType = None,
+    fields: Optional[List[str]] = None,
+):
+    """
+    Return the posts of the user with only the given columns, if any. The
+    favicon_url is returned along with favicon_hash.
+    """
     order_by_statement = ""
 
     if board_view_type == BoardViewType.BOARD:
-        order_by_statement = "ORDER BY updated_at ASC"
+        order_by_statement = "ORDER BY p.updated_at ASC"
     elif board_view_type == BoardViewType.STACK:
-        order_by_statement = "ORDER BY created_at DESC"
+        order_by_statement = "ORDER BY p.created_at DESC"
 
     query = f"""
-SELECT * FROM post
-WHERE user_id = :user_id
+SELECT {to_post_columns_csv(fields or POST_FIELDS)}
+FROM post p
+{POST_LAYOUT_JOIN_STATEMENT}
+WHERE p.user_id = :user_id
 {order_by_statement}
     """
-    posts = await database.fetch_all(query=query, values={"user_id": user_id})
+    posts = jsonable_encoder(
+        await database.fetch_all(query=query, values={"user_id": user_id})
+    )
 
-    return jsonable_encoder(posts)
+    # Favicons are fetched and cached by the browser separately
+    for post in posts:
+        if "favicon_hash" in post:
+            post["favicon_url"] = get_favicon_url(post["favicon_hash"])
+
+    return posts
 
 
 async def create_post(user_id: str, create_post_data: Dict):
@@ -199,26 +300,32 @@ async def create_post(user_id: str, create_post_data: Dict):
     thumbnail_image_uri = None
 
     if "thumbnail_image_uri" in create_post_data:
-        async with httpx.AsyncClient() as client:
-            result = await client.get(create_post_data.pop("thumbnail_image_uri"))
-            thumbnail_image_in_bytes = result.content
-            s3_object_key = f'{user_id}/{create_post_data["id"]}'
-            thumbnail_image_uri = f"https://{POST_THUMBNAIL_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
-            s3_client.put_object(
-                Bucket=POST_THUMBNAIL_IMAGES_S3_BUCKET,
-                Key=s3_object_key,
-                Body=thumbnail_image_in_bytes,
-                ACL="public-read",
+        try:
+            s3_object_key = await thumbnail_fetcher.fetch_and_store(
+                create_post_data.pop("thumbnail_image_uri"),
+                POST_THUMBNAIL_IMAGES_S3_BUCKET,
+                f'{user_id}/{create_post_data["id"]}',
             )
+            thumbnail_image_uri = f"https://{POST_THUMBNAIL_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
+        except FetchError as e:
+            # The post is still worth creating without its thumbnail
+            print(str(e))
 
     create_post_data["thumbnail_image_uri"] = thumbnail_image_uri
-    insert_statement = to_csv(create_post_data.keys())
-    value_statement = to_ref_csv(create_post_data.keys())
-    query = f"""
-INSERT INTO post ({insert_statement})
-VALUES ({value_statement})
-    """
-    await database.execute(query=query, values=create_post_data)
+    post_data, _ = split_layout(create_post_data)
+    query = to_insert_post_statement(post_data.keys(), ["id"])
+
+    async with database.transaction():
+        await database.execute(query=query, values=create_post_data)
+        await bump_board_version(user_id)
+
+    if thumbnail_image_uri:
+        image_derivatives.schedule(
+            "post_image",
+            create_post_data["id"],
+            POST_THUMBNAIL_IMAGES_S3_BUCKET,
+            s3_object_key,
+        )
 
     create_post_data["source"] = create_post_data["source"].value
     create_post_data.pop("user_id", None)
@@ -227,17 +334,19 @@ VALUES ({value_statement})
 
 
 async def update_post(user_id: str, post_id: str, update_post_data: Dict):
-    set_statement = to_set_statement(update_post_data.keys())
-    returning_statement = to_csv(UpdatePostModel.__fields__.keys())
-    query = f"""
-UPDATE post
-SET {set_statement}
-WHERE user_id = :user_id AND id = :post_id
-RETURNING id, {returning_statement}
-    """
+    update_post_data, layout = split_layout(update_post_data)
+    query = to_update_post_statement(
+        update_post_data.keys(), ["id", *UpdatePostModel.__fields__.keys()]
+    )
     update_post_data["user_id"] = user_id
     update_post_data["post_id"] = post_id
-    result = await database.fetch_one(query=query, values=update_post_data)
+
+    async with database.transaction():
+        if layout:
+            await update_post_layout(user_id, post_id, layout)
+
+        result = await database.fetch_one(query=query, values=update_post_data)
+        await bump_board_version(user_id)
 
     return jsonable_encoder(result)
 
@@ -246,6 +355,15 @@ async def delete_post(user_id: str, post_id: str):
     query = """
 DELETE FROM post
 WHERE user_id = :user_id AND id = :post_id
+RETURNING thumbnail_image_uri, content_uri
     """
     values = {"user_id": user_id, "post_id": post_id}
-    await database.execute(query=query, values=values)
+
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values=values)
+
+        if result:
+            await bump_board_version(user_id)
+            await release_object_uris(
+                list({result["thumbnail_image_uri"], result["content_uri"]})
+            )
@@ -6,6 +6,7 @@ from whoami_back.api.utils.endpoint_helpers import deprecated_endpoint
 from whoami_back.api.v1.posts import base_url, commands
 from whoami_back.api.v1.posts.models import CreatePostModel, UpdatePostModel
 from whoami_back.api.v1.users.commands import get_current_active_user
+from whoami_back.api.v2.posts.commands import post_layout_buffer
 
 router = APIRouter(prefix=f"{base_url}", tags=["posts_v1"])
 
@@ -89,11 +90,19 @@ async def update_whoami_image_post(
 
 
 @router.get("")
-async def get_posts(user: Dict = Depends(get_current_active_user)):
+async def get_posts(
+    fields: Optional[str] = None,
+    *,
+    user: Dict = Depends(get_current_active_user),
+):
     """
-    Return the user posts
+    Return the user posts. fields narrows them down to a comma separated list of
+    columns, or to "layout" for only their id and geometry.
     """
-    posts = await commands.get_posts(user["id"])
+    posts = await commands.get_posts(
+        user["id"], fields=commands.parse_post_fields(fields)
+    )
+    post_layout_buffer.apply(user["id"], posts)
 
     return {"posts": posts}
 
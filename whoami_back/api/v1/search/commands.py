@@ -90,6 +90,7 @@ SELECT
     "user".id,
     "user".username,
     "user".profile_image_s3_uri,
+    "user".profile_image_derivatives_uri,
     "user".first_name,
     "user".last_name,
     LOWER({target_column_statement}) <-> LOWER(:keyword) AS distance
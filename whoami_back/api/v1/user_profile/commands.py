@@ -5,58 +5,52 @@ from fastapi import HTTPException, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 
 from whoami_back.api.v1.follow.commands import determine_following_status
+from whoami_back.api.v1.users.commands import invalidate_principal
 from whoami_back.api.v1.utils.commands import validate_username
 from whoami_back.utils.config import PROFILE_IMAGES_S3_BUCKET
 from whoami_back.utils.db import database, to_csv, to_set_statement
-from whoami_back.utils.s3 import s3_client
+from whoami_back.utils.s3 import get_s3_object_uri, image_derivatives
+from whoami_back.utils.stored_objects import release_object_uris, upload_deduplicated
 
 
 async def delete_user_profile_image(user_id: str) -> None:
+    # u2 is locked first, so that concurrent updates each read what the other
+    # wrote and never release the same image twice
     query = """
-SELECT profile_image_s3_uri
-FROM "user"
-WHERE id = :user_id
-    """
-    profile_image_s3_uri = await database.execute(
-        query=query, values={"user_id": user_id}
-    )
-
-    if profile_image_s3_uri:
-        s3_object_key = profile_image_s3_uri.split(".com/")[-1]
-        s3_client.delete_object(Bucket=PROFILE_IMAGES_S3_BUCKET, Key=s3_object_key)
-
-    query = """
-UPDATE "user"
+UPDATE "user" u1
 SET
     profile_image_s3_uri = NULL,
+    profile_image_derivatives_uri = NULL,
     updated_at = NOW()
-WHERE id = :user_id
+FROM (SELECT * FROM "user" WHERE id = :user_id FOR UPDATE) u2
+WHERE u1.id = u2.id AND u1.id = :user_id
+RETURNING u2.profile_image_s3_uri
     """
-    await database.execute(query=query, values={"user_id": user_id})
-
 
-async def delete_user_profile_background(user_id: str) -> None:
-    query = """
-SELECT profile_background_s3_uri
-FROM "user"
-WHERE id = :user_id
-    """
-    profile_background_s3_uri = await database.execute(
-        query=query, values={"user_id": user_id}
-    )
+    async with database.transaction():
+        profile_image_s3_uri = await database.execute(
+            query=query, values={"user_id": user_id}
+        )
+        await release_object_uris([profile_image_s3_uri])
 
-    if profile_background_s3_uri:
-        s3_object_key = profile_background_s3_uri.split(".com/")[-1]
-        s3_client.delete_object(Bucket=PROFILE_IMAGES_S3_BUCKET, Key=s3_object_key)
 
+async def delete_user_profile_background(user_id: str) -> None:
     query = """
-UPDATE "user"
+UPDATE "user" u1
 SET
     profile_background_s3_uri = NULL,
+    profile_background_derivatives_uri = NULL,
     updated_at = NOW()
-WHERE id = :user_id
+FROM (SELECT * FROM "user" WHERE id = :user_id FOR UPDATE) u2
+WHERE u1.id = u2.id AND u1.id = :user_id
+RETURNING u2.profile_background_s3_uri
     """
-    await database.execute(query=query, values={"user_id": user_id})
+
+    async with database.transaction():
+        profile_background_s3_uri = await database.execute(
+            query=query, values={"user_id": user_id}
+        )
+        await release_object_uris([profile_background_s3_uri])
 
 
 async def get_user_profile(
@@ -73,6 +67,8 @@ async def get_user_profile(
         '"user".bio',
         '"user".profile_image_s3_uri',
         '"user".profile_background_s3_uri',
+        '"user".profile_image_derivatives_uri',
+        '"user".profile_background_derivatives_uri',
         '"user".unconfirmed_new_email',
     ]
 
@@ -122,6 +118,8 @@ async def edit_user_profile(
     bio: Optional[str] = None,
     profile_image: Optional[UploadFile] = None,
     profile_background: [UploadFile] = None,
+    profile_image_s3_object_key: Optional[str] = None,
+    profile_background_s3_object_key: Optional[str] = None,
 ) -> None:
     user_object_updates = {}
 
@@ -150,36 +148,36 @@ WHERE id = :user_id
         """
         user_object_updates["user_id"] = user_id
         await database.execute(query=query, values=user_object_updates)
+        invalidate_principal(user_id)
 
     user_profile_object_updates = {}
 
+    # Otherwise, the objects were uploaded by the client through upload intents
     if profile_image:
-        s3_object_key = f"profile_image/{user_id}/{uuid4()}"
-        profile_image_s3_uri = (
-            f"https://{PROFILE_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
-        )
-        s3_client.upload_fileobj(
-            profile_image.file,
+        profile_image_s3_object_key = await upload_deduplicated(
             PROFILE_IMAGES_S3_BUCKET,
-            s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
+            f"profile_image/{user_id}/{uuid4()}",
+            profile_image.file,
         )
-        user_profile_object_updates["profile_image_s3_uri"] = profile_image_s3_uri
 
     if profile_background:
-        s3_object_key = f"profile_background/{user_id}/{uuid4()}"
-        profile_background_s3_uri = (
-            f"https://{PROFILE_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
-        )
-        s3_client.upload_fileobj(
-            profile_background.file,
+        profile_background_s3_object_key = await upload_deduplicated(
             PROFILE_IMAGES_S3_BUCKET,
-            s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
+            f"profile_background/{user_id}/{uuid4()}",
+            profile_background.file,
         )
-        user_profile_object_updates[
-            "profile_background_s3_uri"
-        ] = profile_background_s3_uri
+
+    if profile_image_s3_object_key:
+        user_profile_object_updates["profile_image_s3_uri"] = get_s3_object_uri(
+            PROFILE_IMAGES_S3_BUCKET, profile_image_s3_object_key
+        )
+        user_profile_object_updates["profile_image_derivatives_uri"] = None
+
+    if profile_background_s3_object_key:
+        user_profile_object_updates["profile_background_s3_uri"] = get_s3_object_uri(
+            PROFILE_IMAGES_S3_BUCKET, profile_background_s3_object_key
+        )
+        user_profile_object_updates["profile_background_derivatives_uri"] = None
 
     if isinstance(bio, str):
         if bio == " ":
@@ -190,9 +188,42 @@ WHERE id = :user_id
     if len(user_profile_object_updates):
         set_statement = to_set_statement(user_profile_object_updates.keys())
         query = f"""
-UPDATE "user"
+UPDATE "user" u1
 SET {set_statement}
-WHERE id = :user_id
+FROM (SELECT * FROM "user" WHERE id = :user_id FOR UPDATE) u2
+WHERE u1.id = u2.id AND u1.id = :user_id
+RETURNING u2.profile_image_s3_uri, u2.profile_background_s3_uri
         """
         user_profile_object_updates["user_id"] = user_id
-        await database.execute(query=query, values=user_profile_object_updates)
+
+        async with database.transaction():
+            previous = await database.fetch_one(
+                query=query, values=user_profile_object_updates
+            )
+            # The images that were replaced
+            await release_object_uris(
+                [
+                    previous["profile_image_s3_uri"]
+                    if profile_image_s3_object_key
+                    else None,
+                    previous["profile_background_s3_uri"]
+                    if profile_background_s3_object_key
+                    else None,
+                ]
+            )
+
+    if profile_image_s3_object_key:
+        image_derivatives.schedule(
+            "profile_image",
+            user_id,
+            PROFILE_IMAGES_S3_BUCKET,
+            profile_image_s3_object_key,
+        )
+
+    if profile_background_s3_object_key:
+        image_derivatives.schedule(
+            "profile_background",
+            user_id,
+            PROFILE_IMAGES_S3_BUCKET,
+            profile_background_s3_object_key,
+        )
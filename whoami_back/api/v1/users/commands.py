@@ -1,6 +1,8 @@
 import base64
+import hashlib
 import json
 import re
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 from uuid import uuid4
@@ -9,34 +11,91 @@ from asyncpg.exceptions import UniqueViolationError
 from fastapi import Depends, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token as google_auth_service
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 
+from whoami_back.api.v1.board.models import BoardViewType
 from whoami_back.api.v1.users import base_url
 from whoami_back.api.v1.users.models import UserModel
+from whoami_back.utils.cache import TTLCache
 from whoami_back.utils.config import (  # noqa: F401
+    ACCESS_TOKEN_CACHE_MAX_SIZE,
+    ACCESS_TOKEN_CACHE_TTL_IN_SECONDS,
     ADMIN_EMAIL,
     CONFIRMATION_JWT_EXPIRES_IN_HOURS,
+    EMAIL_DISPATCHER_BATCH_SIZE,
+    EMAIL_DISPATCHER_MAX_ATTEMPTS,
+    EMAIL_DISPATCHER_POLL_INTERVAL_IN_SECONDS,
     FE_HOSTS,
+    GOOGLE_CERTS_URL,
     GOOGLE_CLIENT_ID,
     JWT_ALGORITHM,
     JWT_SIGNATURE,
+    PASSWORD_HASHER_MAX_QUEUE_SIZE,
+    PASSWORD_HASHER_MAX_WORKERS,
     PASSWORD_RESET_JWT_EXPIRES_IN_HOURS,
+    PRINCIPAL_CACHE_MAX_SIZE,
+    PRINCIPAL_CACHE_TTL_IN_SECONDS,
+    SENDGRID_API_HOST,
     SENDGRID_API_KEY,
+    TOKEN_VERSION_CACHE_MAX_SIZE,
+    TOKEN_VERSION_CACHE_TTL_IN_SECONDS,
 )
 from whoami_back.utils.db import database, to_csv, to_ref_csv
+from whoami_back.utils.email_outbox import EmailDispatcher, enqueue_email
+from whoami_back.utils.google_auth import GoogleIdTokenVerifier
 from whoami_back.utils.models import remove_keys
+from whoami_back.utils.password_hasher import PasswordHasher, PasswordHasherSaturated
 
 # Initialize shared objects
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{base_url}/login", auto_error=False)
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-sendgrid_client = SendGridAPIClient(SENDGRID_API_KEY)
+password_hasher = PasswordHasher(
+    max_workers=PASSWORD_HASHER_MAX_WORKERS,
+    max_queue_size=PASSWORD_HASHER_MAX_QUEUE_SIZE,
+)
+email_dispatcher = EmailDispatcher(
+    api_key=SENDGRID_API_KEY,
+    api_host=SENDGRID_API_HOST,
+    from_email=ADMIN_EMAIL,
+    batch_size=EMAIL_DISPATCHER_BATCH_SIZE,
+    poll_interval=EMAIL_DISPATCHER_POLL_INTERVAL_IN_SECONDS,
+    max_attempts=EMAIL_DISPATCHER_MAX_ATTEMPTS,
+)
+google_id_token_verifier = GoogleIdTokenVerifier(
+    certs_url=GOOGLE_CERTS_URL, audience=GOOGLE_CLIENT_ID
+)
+principal_cache = TTLCache(
+    maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_IN_SECONDS
+)
+token_version_cache = TTLCache(
+    maxsize=TOKEN_VERSION_CACHE_MAX_SIZE, ttl=TOKEN_VERSION_CACHE_TTL_IN_SECONDS
+)
+access_token_cache = TTLCache(
+    maxsize=ACCESS_TOKEN_CACHE_MAX_SIZE, ttl=ACCESS_TOKEN_CACHE_TTL_IN_SECONDS
+)
 FE_HOST = FE_HOSTS[0]
 
+USERNAME_ALLOCATION_ATTEMPTS = 5
+USERNAME_UNIQUE_INDEXES = ("ix_user_username",)
+# The first available one out of :username_prefix, :username_prefix_0,
+# :username_prefix_1, ...
+AVAILABLE_USERNAME_QUERY = r"""
+WITH taken AS (
+    SELECT LOWER(username) AS username
+    FROM "user"
+    WHERE LOWER(username) LIKE :username_pattern ESCAPE '\'
+)
+SELECT candidate AS username
+FROM (
+    SELECT CAST(:username_prefix AS TEXT) AS candidate, -1 AS suffix
+    UNION ALL
+    SELECT CAST(:username_prefix AS TEXT) || '_' || suffix, suffix
+    FROM generate_series(0, (SELECT COUNT(*) FROM taken)::INT) AS suffix
+) AS candidates
+WHERE candidate NOT IN (SELECT username FROM taken)
+ORDER BY suffix
+LIMIT 1
+"""
+
 
 class EMAIL_TEMPLATE_IDS:
     CONFIRMATION = "d-554310a144774131bb53ddf318dc932e"
@@ -53,11 +112,12 @@ class CredentialsException(HTTPException):
         )
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), get_password: bool = False
-) -> Dict:
+def _decode_access_token(token: str) -> Dict:
     """
-    Given the JWT token, return a user found.
+    Verify the given JWT token and return its payload.
+
+    Verified payloads are cached by the token's digest until the token expires, so
+    a token presented again skips the signature and claim checks.
     """
     if not token:
         raise HTTPException(
@@ -65,6 +125,13 @@ async def get_current_user(
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    token_digest = hashlib.sha256(token.encode()).digest()
+    payload = access_token_cache.get(token_digest)
+
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(token, JWT_SIGNATURE, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
@@ -74,14 +141,63 @@ async def get_current_user(
     except JWTError as e:
         raise CredentialsException(message=e)
 
-    user = await get_user(user_id=user_id, get_password=get_password)
+    # Never keep a payload past the token's own expiry
+    ttl = access_token_cache.ttl
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    access_token_cache.set(token_digest, dict(payload), ttl=ttl)
+
+    return payload
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), get_password: bool = False
+) -> Dict:
+    """
+    Given the JWT token, return a user found.
+    """
+    payload = _decode_access_token(token)
+    user_id = payload["sub"]
+
+    if get_password:
+        user = await get_user(user_id=user_id, get_password=True)
+    else:
+        user = await get_principal(user_id)
 
     if not user:
         raise CredentialsException(message="The given user_id in JWT is not valid.")
 
+    # Tokens minted before the password was changed. Those minted before tokens
+    # carried a version count as version 0.
+    if payload.get("ver", 0) < user["min_token_version"]:
+        raise CredentialsException(message="The JWT has been revoked.")
+
     return user
 
 
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Dict:
+    """
+    Given the JWT token, return the user's id, active, confirmed and
+    board_view_type. Login tokens carry these as claims along with the
+    token_version they were minted at. As long as that version is still the
+    user's current one, the claims are used as they are. Otherwise, and for the
+    tokens of email links, fall back to the full user lookup.
+    """
+    payload = _decode_access_token(token)
+    user_id = payload["sub"]
+
+    if "active" in payload and payload["ver"] == await get_token_version(user_id):
+        return {
+            "id": user_id,
+            "active": payload["active"],
+            "confirmed": payload["confirmed"],
+            "board_view_type": payload["board_view_type"],
+            "token_version": payload["ver"],
+        }
+
+    return await get_current_user(token=token)
+
+
 async def get_current_active_user_with_password(
     token: str = Depends(oauth2_scheme),
 ) -> Dict:
@@ -94,8 +210,12 @@ async def get_current_active_user_with_password(
 
 
 async def get_current_active_user(
-    user: Dict = Depends(get_current_user),
+    user: Dict = Depends(get_current_principal),
 ) -> Dict:
+    """
+    Only id, active, confirmed and board_view_type are guaranteed to be present.
+    Use get_current_active_full_user when other user columns are needed.
+    """
     if not user["active"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user"
@@ -104,6 +224,12 @@ async def get_current_active_user(
     return user
 
 
+async def get_current_active_full_user(
+    user: Dict = Depends(get_current_user),
+) -> Dict:
+    return await get_current_active_user(user=user)
+
+
 async def get_current_active_user_auth_optional(
     token: str = Depends(oauth2_scheme),
 ) -> Optional[Dict]:
@@ -111,7 +237,7 @@ async def get_current_active_user_auth_optional(
         user = None
     else:
         try:
-            current_user = await get_current_user(token=token)
+            current_user = await get_current_principal(token=token)
             user = await get_current_active_user(user=current_user)
         except Exception:
             user = None
@@ -120,7 +246,7 @@ async def get_current_active_user_auth_optional(
 
 
 async def get_current_unconfirmed_active_user(
-    user: Dict = Depends(get_current_active_user),
+    user: Dict = Depends(get_current_active_full_user),
 ) -> Dict:
     if user["confirmed"]:
         raise HTTPException(
@@ -132,16 +258,34 @@ async def get_current_unconfirmed_active_user(
 
 
 # Password related
-def hash_password(password: str) -> str:
-    return password_context.hash(password)
+class PasswordHasherBusyException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password requests in progress. Try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+
 
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherSaturated:
+        raise PasswordHasherBusyException()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return password_context.verify(plain_password, hashed_password)
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherSaturated:
+        raise PasswordHasherBusyException()
 
-async def create_access_token(user_id: str, jwt_expires_in_hours: int) -> str:
+
+async def create_access_token(
+    user_id: str, jwt_expires_in_hours: int, *, claims: Optional[Dict] = None
+) -> str:
     data_to_encode = {
+        **(claims or {}),
         "sub": user_id,
         "exp": datetime.now(tz=timezone.utc) + timedelta(hours=jwt_expires_in_hours),
     }
@@ -151,6 +295,38 @@ async def create_access_token(user_id: str, jwt_expires_in_hours: int) -> str:
     return encoded_jwt
 
 
+async def create_link_token(user_id: str, jwt_expires_in_hours: int) -> str:
+    """
+    Create a JWT for a link sent by email. It carries the user's current
+    token_version, so that changing the password revokes it along with the login
+    tokens.
+    """
+    query = """
+SELECT token_version
+FROM \"user\"
+WHERE id = :user_id
+    """
+    token_version = await database.execute(query=query, values={"user_id": user_id})
+
+    return await create_access_token(
+        user_id, jwt_expires_in_hours, claims={"ver": token_version}
+    )
+
+
+def get_login_claims(user: Dict) -> Dict:
+    """
+    Claims to put into a login JWT so that get_current_principal() can skip the
+    user lookup. Missing columns fall back to their defaults so that the signup
+    data of a user just created can be given as is.
+    """
+    return {
+        "ver": user.get("token_version", 0),
+        "active": user.get("active", True),
+        "confirmed": user["confirmed"],
+        "board_view_type": user.get("board_view_type", BoardViewType.BOARD.value),
+    }
+
+
 def _prepare_get_user_param(
     user_id: Optional[str] = None,
     email: Optional[str] = None,
@@ -222,6 +398,52 @@ async def get_user(
         return None
 
 
+async def get_principal(user_id: str) -> Optional[Dict]:
+    """
+    Same as get_user(user_id=user_id), but served from the in-process principal
+    cache when possible. Commands changing the cached columns must call
+    invalidate_principal() after their write.
+    """
+    principal = principal_cache.get(str(user_id))
+
+    if principal is None:
+        principal = await get_user(user_id=user_id)
+
+        if not principal:
+            return None
+
+        principal_cache.set(str(user_id), principal)
+
+    # Callers are free to mutate what they get back
+    return dict(principal)
+
+
+def invalidate_principal(user_id: str) -> None:
+    principal_cache.invalidate(str(user_id))
+    token_version_cache.invalidate(str(user_id))
+
+
+async def get_token_version(user_id: str) -> Optional[int]:
+    token_version = token_version_cache.get(str(user_id))
+
+    if token_version is None:
+        query = """
+SELECT token_version
+FROM \"user\"
+WHERE id = :user_id
+        """
+        token_version = await database.execute(
+            query=query, values={"user_id": user_id}
+        )
+
+        if token_version is None:
+            return None
+
+        token_version_cache.set(str(user_id), token_version)
+
+    return token_version
+
+
 async def reset_failed_login_attempt(user_id: str) -> None:
     query = """
 UPDATE \"user\"
@@ -280,7 +502,7 @@ async def authenticate_user(login_credential: Dict):
                 detail="Account locked due to too many failed login attempts",
             )
 
-        if not verify_password(login_credential["password"], user["password"]):
+        if not await verify_password(login_credential["password"], user["password"]):
             new_failed_attempt_count = await increment_failed_login_attempt(
                 user["id"]
             )
@@ -294,7 +516,7 @@ async def authenticate_user(login_credential: Dict):
 
     # Login using the access_token and auth_service
     if login_credential["access_token"] and login_credential["auth_service"]:
-        new_auth_attributes = validate_access_token(
+        new_auth_attributes = await validate_access_token(
             login_credential["service_user_id"],
             login_credential["email"],
             login_credential["access_token"],
@@ -339,18 +561,27 @@ def validate_password(password: str) -> bool:
     return True, ""
 
 
-async def create_user(signup_data: Dict) -> str:
+async def create_user(
+    signup_data: Dict,
+    *,
+    default_posts_statement: Optional[str] = None,
+    default_posts_values: Optional[Dict] = None,
+) -> str:
     """
     Complete a user signup.
     Allow signup using email & password or email & access_token
     & auth_service. If successful, return the newly created
     user's ID.
+
+    The user, the board and the default posts, if given, are inserted by a single
+    statement. default_posts_statement is a list of CTEs inserting the posts,
+    which refer to the new user's ID as :id.
     """
     signup_data["auth_attributes"] = None
     signup_data["confirmed"] = False
 
     if signup_data["access_token"]:
-        signup_data["auth_attributes"] = validate_access_token(
+        signup_data["auth_attributes"] = await validate_access_token(
             signup_data["service_user_id"],
             signup_data["email"],
             signup_data["access_token"],
@@ -366,45 +597,55 @@ async def create_user(signup_data: Dict) -> str:
                 detail=error_message,
             )
 
-        signup_data["password"] = hash_password(signup_data["password"])
+        signup_data["password"] = await hash_password(signup_data["password"])
 
     new_user_data = remove_keys(
         signup_data, ["access_token", "auth_service", "service_user_id"]
     )
     new_user_data["id"] = str(uuid4())
+    insert_statement = to_csv(new_user_data.keys())
+    value_statement = to_ref_csv(new_user_data.keys())
 
     # Add the default username. Take the username part of email address
-    username = signup_data["email"].split("@")[0].casefold()
-    possible_username = username
-    username_counter = 0
-
-    # If the username is taken, try adding number incrementally until it works
-    username_already_exists = await username_exists(possible_username)
-    while username_already_exists:
-        possible_username = f"{username}_{username_counter}"
-        username_already_exists = await username_exists(possible_username)
-        username_counter += 1
-
-    new_user_data["username"] = possible_username
-
-    try:
-        insert_statement = to_csv(new_user_data.keys())
-        value_statement = to_ref_csv(new_user_data.keys())
-        query = f"""
-WITH new_user AS (
-    INSERT INTO "user" ({insert_statement})
-    VALUES ({value_statement})
+    username_prefix = signup_data["email"].split("@")[0].casefold()
+    escaped_username_prefix = re.sub(r"([\\%_])", r"\\\1", username_prefix)
+    new_user_data["username_prefix"] = username_prefix
+    new_user_data["username_pattern"] = f"{escaped_username_prefix}%"
+
+    new_user_data.update(default_posts_values or {})
+    query = f"""
+WITH available_username AS ({AVAILABLE_USERNAME_QUERY}),
+new_user AS (
+    INSERT INTO "user" ({insert_statement}, username)
+    VALUES ({value_statement}, (SELECT username FROM available_username))
     RETURNING id
-)
-INSERT INTO board (user_id)
-SELECT id FROM new_user
-        """
-        await database.execute(query=query, values=new_user_data)
-    except UniqueViolationError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e.detail),
-        )
+),
+new_board AS (
+    INSERT INTO board (user_id)
+    SELECT id FROM new_user
+    RETURNING user_id
+){f", {default_posts_statement}" if default_posts_statement else ""}
+SELECT user_id FROM new_board
+    """
+
+    # A concurrent signup can take the username between the lookup and the insert.
+    # Look it up again in that case.
+    # Each attempt is a savepoint when called in a transaction, so that a failed
+    # attempt does not abort the transaction.
+    for attempt in range(USERNAME_ALLOCATION_ATTEMPTS):
+        try:
+            async with database.transaction():
+                await database.execute(query=query, values=new_user_data)
+            break
+        except UniqueViolationError as e:
+            if (
+                e.constraint_name not in USERNAME_UNIQUE_INDEXES
+                or attempt == USERNAME_ALLOCATION_ATTEMPTS - 1
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e.detail),
+                )
 
     return new_user_data["id"]
 
@@ -430,69 +671,50 @@ async def confirm_user(user: Dict) -> str:
 UPDATE \"user\"
 SET
     confirmed = TRUE,
+    token_version = token_version + 1,
     updated_at = NOW()
 WHERE id = :user_id
     """
     await database.execute(query=query, values={"user_id": user["id"]})
+    invalidate_principal(user["id"])
 
     return user["email"]
 
 
-def send_email(email: str, template_id: str, content_url: Optional[str]):
-    message = Mail(
-        from_email=ADMIN_EMAIL,
-        to_emails=email,
-    )
-    message.template_id = template_id
-
-    if content_url:
-        message.dynamic_template_data = {"link": content_url}
-
-    sendgrid_client.send(message)
+async def send_email(email: str, template_id: str, content_url: Optional[str]):
+    """
+    Queue the email in the email outbox. email_dispatcher sends it after the
+    current transaction commits.
+    """
+    template_data = {"link": content_url} if content_url else None
+    await enqueue_email(email, template_id, template_data)
 
 
-async def send_password_reset_email(
-    email: str, user_id: str, background_tasks
-) -> None:
-    user_token = await create_access_token(
+async def send_password_reset_email(email: str, user_id: str) -> None:
+    user_token = await create_link_token(
         user_id, PASSWORD_RESET_JWT_EXPIRES_IN_HOURS
     )
     password_reset_url = f"{FE_HOST}/users/reset-password?token={user_token}"
-    background_tasks.add_task(
-        send_email, email, EMAIL_TEMPLATE_IDS.PASSWORD_RESET, password_reset_url
-    )
+    await send_email(email, EMAIL_TEMPLATE_IDS.PASSWORD_RESET, password_reset_url)
 
 
-async def send_confirmation_email(
-    email: str, user_id: str, background_tasks
-) -> None:
-    user_token = await create_access_token(
-        user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS
-    )
+async def send_confirmation_email(email: str, user_id: str) -> None:
+    user_token = await create_link_token(user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS)
     confirmation_url = f"{FE_HOST}/users/confirm?token={user_token}"
-    background_tasks.add_task(
-        send_email, email, EMAIL_TEMPLATE_IDS.CONFIRMATION, confirmation_url
-    )
+    await send_email(email, EMAIL_TEMPLATE_IDS.CONFIRMATION, confirmation_url)
 
 
-async def send_new_email_confirmation_email(
-    email: str, user_id: str, background_tasks
-) -> None:
-    user_token = await create_access_token(
-        user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS
-    )
+async def send_new_email_confirmation_email(email: str, user_id: str) -> None:
+    user_token = await create_link_token(user_id, CONFIRMATION_JWT_EXPIRES_IN_HOURS)
     confirmation_url = (
         f"{FE_HOST}/users/confirm-new-email?token={user_token}&new_email={email}"
     )
-    background_tasks.add_task(
-        send_email,
-        email,
-        EMAIL_TEMPLATE_IDS.NEW_EMAIL_CONFIRMATION,
-        confirmation_url,
+    await send_email(
+        email, EMAIL_TEMPLATE_IDS.NEW_EMAIL_CONFIRMATION, confirmation_url
     )
 
 
-def validate_google_access_token(
+async def validate_google_access_token(
     google_user_id: str,
     email: str,
     access_token: str,
@@ -500,9 +722,7 @@ def validate_google_access_token(
     target_auth_attributes: Optional[Dict] = None,
 ) -> Dict:
     try:
-        google_user_info = google_auth_service.verify_oauth2_token(
-            access_token, google_requests.Request(), GOOGLE_CLIENT_ID
-        )
+        google_user_info = await google_id_token_verifier.verify(access_token)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -603,7 +823,7 @@ def validate_facebook_signed_request(
     return new_auth_attributes
 
 
-def validate_access_token(
+async def validate_access_token(
     service_user_id: str,
     email: str,
     access_token: str,
@@ -619,7 +839,7 @@ def validate_access_token(
     new_auth_attributes = {}
 
     if auth_service == "google":
-        new_auth_attributes = validate_google_access_token(
+        new_auth_attributes = await validate_google_access_token(
             service_user_id,
             email,
             access_token,
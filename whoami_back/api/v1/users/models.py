@@ -94,6 +94,9 @@ class UserModel(BaseModel):
     public: bool = Field(..., example=True)
     confirmed: bool = Field(..., example=False)
     active: bool = Field(..., example=True)
+    token_version: int = Field(..., example=0)
+    # Login tokens minted at an older token_version are revoked
+    min_token_version: int = Field(..., example=0)
 
     unconfirmed_new_email: Optional[EmailStr] = Field(example="josephcho@gmail.com")
 
@@ -102,4 +105,7 @@ class UserWithProfileModel(UserModel):
     bio: Optional[str] = Field(example="some_bio")
     profile_image_s3_uri: Optional[str] = Field(example="some_s3_uri")
     profile_background_s3_uri: Optional[str] = Field(example="some_s3_uri")
+    # Resized copies of the images, see whoami_back/utils/image_derivatives.py
+    profile_image_derivatives_uri: Optional[str] = Field(example="some_s3_uri")
+    profile_background_derivatives_uri: Optional[str] = Field(example="some_s3_uri")
     auth_service: Optional[str] = Field(example="google")
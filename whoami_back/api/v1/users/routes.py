@@ -1,6 +1,6 @@
 from typing import Dict
 
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from pydantic import EmailStr
 
@@ -17,29 +17,25 @@ from whoami_back.api.v1.users.models import (
     UserWithProfileModel,
 )
 from whoami_back.utils.config import LOGIN_JWT_EXPIRES_IN_HOURS
+from whoami_back.utils.db import database
 
 router = APIRouter(prefix=f"{base_url}", tags=["users_v1"])
 
 
 @router.post("/send-password-reset")
-async def send_password_reset_email(
-    background_tasks: BackgroundTasks, email: EmailStr = Body(..., embed=True)
-):
+async def send_password_reset_email(email: EmailStr = Body(..., embed=True)):
     user = await commands.get_user(email=email, get_password=True)
 
     # Do not return an error even when there was no user found
     if user and user["password"]:
-        await commands.send_password_reset_email(email, user["id"], background_tasks)
+        await commands.send_password_reset_email(email, user["id"])
 
 
 @router.get("/resend-confirmation")
 async def resend_confirmation_email(
-    background_tasks: BackgroundTasks,
     user: Dict = Depends(commands.get_current_unconfirmed_active_user),
 ) -> None:
-    await commands.send_confirmation_email(
-        user["email"], user["id"], background_tasks
-    )
+    await commands.send_confirmation_email(user["email"], user["id"])
 
 
 @router.get("/confirm", response_model=Confirmed)
@@ -52,9 +48,7 @@ async def confirm_user(
 
 
 @router.post("/signup")
-async def user_signup(
-    signup_data: UserSignUpModel, background_tasks: BackgroundTasks
-) -> None:
+async def user_signup(signup_data: UserSignUpModel) -> None:
     """
     ### Deprecated ###
 
@@ -64,19 +58,21 @@ async def user_signup(
     deprecated_endpoint()
 
     signup_data_dict = jsonable_encoder(signup_data)
-    user_id = await commands.create_user(signup_data_dict)
 
-    if signup_data.password:
-        await commands.send_confirmation_email(
-            signup_data.email, user_id, background_tasks
-        )
+    async with database.transaction():
+        user_id = await commands.create_user(signup_data_dict)
+
+        if signup_data.password:
+            await commands.send_confirmation_email(signup_data.email, user_id)
 
     # Create 3 default posts
     for create_post_data in get_default_posts():
         await post_commands.create_post(user_id, create_post_data)
 
     access_token = await commands.create_access_token(
-        user_id, LOGIN_JWT_EXPIRES_IN_HOURS
+        user_id,
+        LOGIN_JWT_EXPIRES_IN_HOURS,
+        claims=commands.get_login_claims(signup_data_dict),
     )
     return {"access_token": access_token}
 
@@ -96,7 +92,9 @@ async def user_login(login_credential: UserLoginModel) -> Token:
     user = await commands.authenticate_user(login_credential_dict)
 
     access_token = await commands.create_access_token(
-        user["id"], LOGIN_JWT_EXPIRES_IN_HOURS
+        user["id"],
+        LOGIN_JWT_EXPIRES_IN_HOURS,
+        claims=commands.get_login_claims(user),
     )
 
     if not user["confirmed"]:
@@ -12,7 +12,7 @@ router = APIRouter(prefix=f"{base_url}", tags=["utils"])
 @router.post("/validate/username")
 async def validate_username(
     username: str = Body(..., embed=True),
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
     # Check if the given username is available and in a valid form
     valid, reason = await commands.validate_username(
@@ -26,7 +26,7 @@ async def validate_username(
 @router.post("/validate/email")
 async def validate_email(
     email: EmailStr = Body(..., embed=True),
-    user: Dict = Depends(user_commands.get_current_active_user),
+    user: Dict = Depends(user_commands.get_current_active_full_user),
 ):
     # Check if the given email is available
     valid, reason = await commands.validate_email(
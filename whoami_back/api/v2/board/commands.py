@@ -0,0 +1,174 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+from whoami_back.api.assets.commands import get_favicon_url
+from whoami_back.api.v1.board.models import BoardViewType
+from whoami_back.api.v1.posts.commands import POST_FIELDS
+from whoami_back.utils.db import database
+from whoami_back.utils.post_layouts import POST_LAYOUT_JOIN_STATEMENT, to_post_column
+
+# Resolves the target user and whether the viewer may see their board
+TARGET_USER_STATEMENT = """
+target_user AS (
+    SELECT
+        u.id,
+        u.active,
+        (
+            u.public
+            OR u.id = :viewer_id
+            OR EXISTS(
+                SELECT TRUE
+                FROM follow
+                WHERE following_user_id = :viewer_id
+                    AND followed_user_id = u.id
+                    AND approved IS TRUE
+            )
+        ) IS TRUE AS viewable
+    FROM "user" u
+    WHERE u.username = :username
+)
+"""
+
+
+# The rectangle a post covers on the board. Matches the expression of the
+# ix_post_layout_user_id_geometry GiST index, which is only used if they are
+# identical.
+POST_BOX_STATEMENT = "box(point(l.x, l.y), point(l.x + l.width, l.y + l.height))"
+
+# x, y, width and height of the part of the board the client shows
+Viewport = Tuple[int, int, int, int]
+
+
+def get_board_etag(
+    board: Dict,
+    board_view_type: BoardViewType,
+    *,
+    viewport: Optional[Viewport] = None,
+    fields: Optional[List[str]] = None,
+) -> str:
+    # The user id tells apart the boards of users who reused a username
+    etag = f"{board['user_id']}.{board['version']}.{board_view_type.value}"
+
+    if viewport:
+        etag += ".{}_{}_{}_{}".format(*viewport)
+
+    if fields:
+        etag += f".{'_'.join(fields)}"
+
+    return f'"{etag}"'
+
+
+async def get_board_version(
+    username: str, viewer_id: Optional[str]
+) -> Optional[Dict]:
+    """
+    Return whether the target user is active, whether the viewer may see the
+    board and its version, without reading the posts. Returns None if the username
+    does not exist.
+    """
+    query = f"""
+WITH {TARGET_USER_STATEMENT}
+SELECT t.id AS user_id, t.active, t.viewable, b.version
+FROM target_user t
+LEFT JOIN board b ON b.user_id = t.id
+    """
+    values = {"username": username, "viewer_id": viewer_id}
+
+    return await database.fetch_one(query=query, values=values)
+
+
+async def get_board(
+    username: str,
+    viewer_id: Optional[str],
+    board_view_type: BoardViewType,
+    *,
+    viewport: Optional[Viewport] = None,
+    fields: Optional[List[str]] = None,
+) -> Optional[Dict]:
+    """
+    Return whether the target user is active and whether the viewer may see the
+    board, and the posts, background and version, in one round trip. The posts and
+    background are only returned if the board is viewable. Returns None if the
+    username does not exist.
+
+    Given a viewport, only the posts intersecting it are returned. Given fields,
+    the posts only have those columns.
+    """
+    values = {"username": username, "viewer_id": viewer_id}
+    viewport_statement = ""
+    # The columns come from the POST_FIELDS allow-list
+    post_statement = "json_build_object({})".format(
+        ", ".join(
+            f"'{column}', {to_post_column(column)}"
+            for column in fields or POST_FIELDS
+        )
+    )
+
+    if board_view_type == BoardViewType.STACK:
+        order_by_statement = "ORDER BY p.created_at DESC"
+    else:
+        order_by_statement = "ORDER BY p.updated_at ASC"
+
+    if viewport:
+        x, y, width, height = viewport
+        viewport_statement = (
+            f"WHERE {POST_BOX_STATEMENT} "
+            "&& box(point(:left, :top), point(:right, :bottom))"
+        )
+        values.update(
+            {"left": x, "top": y, "right": x + width, "bottom": y + height}
+        )
+
+    query = f"""
+WITH {TARGET_USER_STATEMENT},
+visible_board AS (
+    SELECT id AS user_id
+    FROM target_user
+    WHERE active AND viewable
+)
+SELECT
+    t.id AS user_id,
+    t.active,
+    t.viewable,
+    (
+        SELECT COALESCE(json_agg({post_statement} {order_by_statement}), '[]')
+        FROM post p
+        {POST_LAYOUT_JOIN_STATEMENT}
+        JOIN visible_board v ON l.user_id = v.user_id
+        {viewport_statement}
+    ) AS posts,
+    (
+        SELECT row_to_json(b)
+        FROM (
+            SELECT
+                background_image_s3_uri,
+                background_image_derivatives_uri,
+                background_image_fitting_mode,
+                background_hex_color
+            FROM board
+            JOIN visible_board USING (user_id)
+        ) b
+    ) AS background,
+    (SELECT version FROM board WHERE user_id = t.id) AS version
+FROM target_user t
+    """
+    result = await database.fetch_one(query=query, values=values)
+
+    if not result:
+        return None
+
+    posts = json.loads(result["posts"])
+
+    # Favicons are fetched and cached by the browser separately
+    for post in posts:
+        if "favicon_hash" in post:
+            post["favicon_url"] = get_favicon_url(post["favicon_hash"])
+
+    return {
+        "user_id": result["user_id"],
+        "active": result["active"],
+        "viewable": result["viewable"],
+        "version": result["version"],
+        "posts": posts,
+        "background": json.loads(result["background"] or "null"),
+    }
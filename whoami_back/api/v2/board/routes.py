@@ -1,47 +1,47 @@
 from typing import Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
 
-from whoami_back.api.v1.board import commands
 from whoami_back.api.v1.board.models import BoardViewType
-from whoami_back.api.v1.follow.commands import check_approved_following
-from whoami_back.api.v1.posts import commands as post_commands
+from whoami_back.api.v1.posts.commands import parse_post_fields
 from whoami_back.api.v1.users import commands as user_commands
-from whoami_back.api.v2.board import base_url
+from whoami_back.api.v2.board import base_url, commands
+from whoami_back.api.v2.posts.commands import post_layout_buffer
 
 router = APIRouter(prefix=base_url, tags=["board_v2"])
 
+# Boards may be private and change at any time, so browsers keep them to
+# themselves and revalidate them on every view
+BOARD_CACHE_CONTROL = "private, no-cache"
 
-@router.get("/{username}")
-async def get_board(
-    username: str,
-    *,
-    board_view_type: Optional[BoardViewType] = None,
-    current_user: Optional[Dict] = Depends(
-        user_commands.get_current_active_user_auth_optional
-    ),
-):
-    """
-    Return the user board. If user is not found, we assume it's either unauthorized
-    or inactive user OR no JWT token given (public access)
-    """
+
+def _check_board_access(
+    board: Optional[Dict], username: str, current_user: Optional[Dict]
+) -> None:
     # Check if the username exists
-    target_user = await user_commands.get_user(username=username)
-    if not target_user:
+    if not board:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with the given username ({username}) does not exist",
         )
 
     # Check if the target user is active
-    if not target_user["active"]:
+    if not board["active"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with the given username ({username}) is not active",
         )
 
     # Check if the target user account is private
-    if not target_user["public"]:
+    if not board["viewable"]:
         if not current_user:
             # Non-user trying to look at a private account
             raise HTTPException(
@@ -49,32 +49,101 @@ async def get_board(
                 detail="Not authenticated",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        elif current_user["id"] != target_user[
-            "id"
-        ] and not await check_approved_following(
-            current_user["id"], target_user["id"]
-        ):
+        else:
             # Requires the current user to be an authorized follower
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Current user is not an approved follower of the target user",
             )
 
+
+def _has_pending_layouts(board: Dict, viewer_id: Optional[str]) -> bool:
+    # The author's buffered layouts are not part of the board version yet
+    return str(board["user_id"]) == str(viewer_id) and (
+        post_layout_buffer.has_pending(viewer_id)
+    )
+
+
+@router.get("/{username}")
+async def get_board(
+    username: str,
+    response: Response,
+    *,
+    board_view_type: Optional[BoardViewType] = None,
+    viewport_x: Optional[int] = None,
+    viewport_y: Optional[int] = None,
+    viewport_width: Optional[int] = Query(None, gt=0),
+    viewport_height: Optional[int] = Query(None, gt=0),
+    fields: Optional[str] = None,
+    if_none_match: str = Header(None),
+    current_user: Optional[Dict] = Depends(
+        user_commands.get_current_active_user_auth_optional
+    ),
+):
+    """
+    Return the user board. If user is not found, we assume it's either unauthorized
+    or inactive user OR no JWT token given (public access)
+
+    The response carries the board version as its ETag. Given it back in
+    If-None-Match, an unchanged board is answered with 304 Not Modified without
+    reading the posts.
+
+    Given viewport_x, viewport_y, viewport_width and viewport_height, only the
+    posts intersecting that rectangle of the board are returned. fields narrows the
+    posts down to a comma separated list of columns, or to "layout" for only their
+    id and geometry.
+    """
+    post_fields = parse_post_fields(fields)
+    viewport = (viewport_x, viewport_y, viewport_width, viewport_height)
+
+    if all(value is None for value in viewport):
+        viewport = None
+    elif any(value is None for value in viewport):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The viewport requires its x, y, width and height",
+        )
+
     if not board_view_type:
         if current_user:
-            board_view_type = current_user["board_view_type"]
+            board_view_type = BoardViewType(current_user["board_view_type"])
         else:
             # Default
             board_view_type = BoardViewType.BOARD
 
-    # Either public OR private but passed the tests above
-    posts = await post_commands.get_posts(
-        target_user["id"], board_view_type=board_view_type
+    viewer_id = current_user["id"] if current_user else None
+
+    if if_none_match:
+        board = await commands.get_board_version(username, viewer_id)
+        _check_board_access(board, username, current_user)
+        etag = commands.get_board_etag(
+            board, board_view_type, viewport=viewport, fields=post_fields
+        )
+
+        if etag in [
+            tag.strip().replace("W/", "") for tag in if_none_match.split(",")
+        ] and not _has_pending_layouts(board, viewer_id):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": BOARD_CACHE_CONTROL},
+            )
+
+    board = await commands.get_board(
+        username, viewer_id, board_view_type, viewport=viewport, fields=post_fields
     )
+    _check_board_access(board, username, current_user)
+
+    if _has_pending_layouts(board, viewer_id):
+        # The author reads their own moves before they are written
+        post_layout_buffer.apply(viewer_id, board["posts"])
+    else:
+        response.headers["ETag"] = commands.get_board_etag(
+            board, board_view_type, viewport=viewport, fields=post_fields
+        )
 
-    background = await commands.get_board_background(target_user["id"])
+    response.headers["Cache-Control"] = BOARD_CACHE_CONTROL
 
-    return {"posts": posts, "background": background}
+    return {"posts": board["posts"], "background": board["background"]}
 
 
 def add_router(app):
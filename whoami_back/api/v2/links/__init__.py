@@ -0,0 +1,3 @@
+from whoami_back.api.v2 import version
+
+base_url = f"{version}/links"
@@ -0,0 +1,211 @@
+import json
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, status
+
+from whoami_back.api.assets.commands import (
+    get_favicon_url,
+    get_image_media_type,
+    save_favicon,
+)
+from whoami_back.utils.config import (
+    LINK_PREVIEW_FAILURE_TTL_IN_SECONDS,
+    LINK_PREVIEW_TTL_IN_SECONDS,
+    SITE_FAVICON_TTL_IN_SECONDS,
+)
+from whoami_back.utils.db import database
+from whoami_back.utils.fetch_pool import FetchError
+from whoami_back.utils.http import fetch_pool
+from whoami_back.utils.link_metadata import canonicalize_url, parse_link_metadata
+from whoami_back.utils.singleflight import SingleFlight
+
+PAGE_MAX_SIZE = 1024 * 1024
+OEMBED_MAX_SIZE = 64 * 1024
+FAVICON_MAX_SIZE = 100 * 1024
+
+# Initialize shared objects
+link_preview_flight = SingleFlight()
+site_favicon_flight = SingleFlight()
+
+
+def _to_response(link_preview) -> Dict:
+    return {
+        "url": link_preview["url"],
+        "title": link_preview["title"],
+        "description": link_preview["description"],
+        "thumbnail_image_uri": link_preview["thumbnail_image_uri"],
+        "favicon_url": get_favicon_url(link_preview["favicon_hash"]),
+    }
+
+
+async def get_link_preview(url: str) -> Dict:
+    """
+    Return the title, description, thumbnail and favicon of the page at url. Each
+    link is unfurled once and then served from the link_preview table until it
+    expires, whoever asks for it.
+    """
+    canonical_url = canonicalize_url(url)
+
+    if canonical_url is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid URL"
+        )
+
+    query = """
+SELECT *
+FROM link_preview
+WHERE url = :url AND expires_at > NOW()
+    """
+    link_preview = await database.fetch_one(
+        query=query, values={"url": canonical_url}
+    )
+
+    if link_preview is None:
+        link_preview = await link_preview_flight.do(
+            canonical_url, lambda: _unfurl(canonical_url)
+        )
+
+    return _to_response(link_preview)
+
+
+async def _unfurl(url: str):
+    metadata = {}
+    ttl = LINK_PREVIEW_FAILURE_TTL_IN_SECONDS
+
+    try:
+        body, content_type, final_url = await fetch_pool.get(
+            url,
+            max_size=PAGE_MAX_SIZE,
+            content_types=("text/html", "application/xhtml+xml"),
+        )
+    except FetchError as e:
+        print(f"Failed to unfurl {url}. Error: {str(e)}")
+    else:
+        metadata = parse_link_metadata(_decode(body, content_type), final_url)
+
+        if metadata["oembed_uri"] and not (
+            metadata["title"] and metadata["thumbnail_image_uri"]
+        ):
+            await _add_oembed_metadata(metadata)
+
+        metadata["favicon_hash"] = await _get_site_favicon(
+            final_url, metadata["favicon_uri"]
+        )
+        ttl = LINK_PREVIEW_TTL_IN_SECONDS
+
+    query = """
+INSERT INTO link_preview (
+    url, title, description, thumbnail_image_uri, favicon_hash, expires_at
+)
+VALUES (
+    :url,
+    :title,
+    :description,
+    :thumbnail_image_uri,
+    :favicon_hash,
+    NOW() + make_interval(secs => :ttl)
+)
+ON CONFLICT (url) DO UPDATE
+SET
+    title = EXCLUDED.title,
+    description = EXCLUDED.description,
+    thumbnail_image_uri = EXCLUDED.thumbnail_image_uri,
+    favicon_hash = EXCLUDED.favicon_hash,
+    fetched_at = NOW(),
+    expires_at = EXCLUDED.expires_at
+RETURNING *
+    """
+    values = {
+        "url": url,
+        "title": metadata.get("title"),
+        "description": metadata.get("description"),
+        "thumbnail_image_uri": metadata.get("thumbnail_image_uri"),
+        "favicon_hash": metadata.get("favicon_hash"),
+        "ttl": ttl,
+    }
+
+    return await database.fetch_one(query=query, values=values)
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    charset = "utf-8"
+
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.strip().partition("=")
+
+        if name.lower() == "charset" and value:
+            charset = value.strip('"')
+
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+async def _add_oembed_metadata(metadata: Dict) -> None:
+    """
+    Fill in the title and thumbnail from the oEmbed endpoint of the page, which
+    video sites such as YouTube provide instead of complete OpenGraph tags.
+    """
+    try:
+        body, _, _ = await fetch_pool.get(
+            metadata["oembed_uri"], max_size=OEMBED_MAX_SIZE
+        )
+        oembed = json.loads(body)
+    except (FetchError, ValueError) as e:
+        print(f"Failed to fetch {metadata['oembed_uri']}. Error: {str(e)}")
+        return
+
+    if not isinstance(oembed, dict):
+        return
+
+    metadata["title"] = metadata["title"] or oembed.get("title")
+    metadata["thumbnail_image_uri"] = metadata["thumbnail_image_uri"] or oembed.get(
+        "thumbnail_url"
+    )
+
+
+async def _get_site_favicon(url: str, favicon_uri: str) -> Optional[str]:
+    host = urlsplit(url).hostname
+    query = """
+SELECT favicon_hash
+FROM site_favicon
+WHERE host = :host AND expires_at > NOW()
+    """
+    site_favicon = await database.fetch_one(query=query, values={"host": host})
+
+    if site_favicon is not None:
+        return site_favicon["favicon_hash"]
+
+    return await site_favicon_flight.do(
+        host, lambda: _fetch_site_favicon(host, favicon_uri)
+    )
+
+
+async def _fetch_site_favicon(host: str, favicon_uri: str) -> Optional[str]:
+    favicon_hash = None
+
+    try:
+        body, _, _ = await fetch_pool.get(favicon_uri, max_size=FAVICON_MAX_SIZE)
+    except FetchError as e:
+        print(f"Failed to fetch the favicon of {host}. Error: {str(e)}")
+    else:
+        # Servers often label icons wrongly, so the bytes decide
+        if get_image_media_type(body) != "application/octet-stream":
+            favicon_hash = await save_favicon(body)
+
+    query = """
+INSERT INTO site_favicon (host, favicon_hash, expires_at)
+VALUES (:host, :favicon_hash, NOW() + make_interval(secs => :ttl))
+ON CONFLICT (host) DO UPDATE
+SET favicon_hash = EXCLUDED.favicon_hash, expires_at = EXCLUDED.expires_at
+    """
+    values = {
+        "host": host,
+        "favicon_hash": favicon_hash,
+        "ttl": SITE_FAVICON_TTL_IN_SECONDS,
+    }
+    await database.execute(query=query, values=values)
+
+    return favicon_hash
@@ -0,0 +1,15 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class LinkPreviewResponse(BaseModel):
+    url: str = Field(..., example="https://www.youtube.com/watch?v=some_id")
+    title: Optional[str] = Field(example="some title")
+    description: Optional[str] = Field(example="some description")
+    thumbnail_image_uri: Optional[str] = Field(
+        example="https://i.ytimg.com/vi/some_id/hqdefault.jpg"
+    )
+    favicon_url: Optional[str] = Field(
+        example="https://assets.whoami.com/assets/favicons/some_hash"
+    )
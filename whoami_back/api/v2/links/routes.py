@@ -0,0 +1,26 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from whoami_back.api.v1.users.commands import get_current_active_user
+from whoami_back.api.v2.links import base_url, commands
+from whoami_back.api.v2.links.models import LinkPreviewResponse
+
+router = APIRouter(prefix=base_url, tags=["links"])
+
+
+@router.get("/preview", response_model=LinkPreviewResponse)
+async def get_link_preview(
+    url: str,
+    *,
+    user: Dict = Depends(get_current_active_user),
+):
+    """
+    Return the title, description, thumbnail and favicon to create a link post of
+    url with, from its OpenGraph or oEmbed metadata.
+    """
+    return await commands.get_link_preview(url)
+
+
+def add_router(app):
+    app.include_router(router)
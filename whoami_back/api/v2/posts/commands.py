@@ -1,26 +1,37 @@
-import base64
-from typing import Dict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 from uuid import uuid4
 
+from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from starlette.datastructures import UploadFile
 
-from whoami_back.utils.config import POST_IMAGES_S3_BUCKET
-from whoami_back.utils.db import database, to_csv, to_ref_csv, to_set_statement
-from whoami_back.utils.s3 import s3_client
-
-
-def _delete_post_image(thumbnail_image_uri: str) -> None:
-    s3_object_key = thumbnail_image_uri.split("com/")[-1]
-    s3_client.delete_object(Bucket=POST_IMAGES_S3_BUCKET, Key=s3_object_key)
-
-
-def _is_saved_in_whoami_s3(thumbnail_image_uri: str) -> bool:
-    host = f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com"
-
-    return thumbnail_image_uri.startswith(
-        host
-    ) and not thumbnail_image_uri.startswith(f"{host}/default-post-images")
+from whoami_back.api.assets.commands import get_favicon_url, save_favicon
+from whoami_back.api.v1.board.commands import bump_board_version
+from whoami_back.utils.config import (
+    POST_IMAGES_S3_BUCKET,
+    POST_LAYOUT_BUFFER_MAX_POSTS,
+    POST_LAYOUT_FLUSH_INTERVAL_IN_MS,
+    POST_LAYOUT_WRITE_BEHIND,
+)
+from whoami_back.utils.db import database, to_csv, to_set_statement
+from whoami_back.utils.post_layouts import (
+    LAYOUT_COLUMNS,
+    PostLayoutBuffer,
+    split_layout,
+    to_insert_post_statement,
+    to_update_post_statement,
+    update_post_layout,
+    write_post_layouts,
+)
+from whoami_back.utils.s3 import image_derivatives
+from whoami_back.utils.stored_objects import release_object_uris, upload_deduplicated
+
+# Initialize shared objects
+post_layout_buffer = PostLayoutBuffer(
+    flush_interval=POST_LAYOUT_FLUSH_INTERVAL_IN_MS / 1000,
+    max_pending=POST_LAYOUT_BUFFER_MAX_POSTS,
+)
 
 
 async def delete_post(
@@ -30,13 +41,18 @@ async def delete_post(
     query = """
 DELETE FROM post
 WHERE user_id = :user_id AND id = :post_id
-RETURNING thumbnail_image_uri
+RETURNING thumbnail_image_uri, content_uri
     """
     values = {"post_id": post_id, "user_id": user_id}
-    thumbnail_image_uri = await database.execute(query=query, values=values)
 
-    if thumbnail_image_uri and _is_saved_in_whoami_s3(thumbnail_image_uri):
-        _delete_post_image(thumbnail_image_uri)
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values=values)
+
+        if result:
+            await bump_board_version(user_id)
+            await release_object_uris(
+                list({result["thumbnail_image_uri"], result["content_uri"]})
+            )
 
 
 async def update_post(
@@ -45,10 +61,11 @@ async def update_post(
     update_post_data: Dict,
 ) -> Dict:
     delete_post_image = False
+    s3_object_key = None
 
     if "favicon_image" in update_post_data:
         favicon_image = update_post_data.pop("favicon_image")
-        update_post_data["b64_favicon"] = await _favicon_to_b64(favicon_image)
+        update_post_data["favicon_hash"] = await _save_favicon_image(favicon_image)
 
     if "post_image" in update_post_data:
         delete_post_image = True
@@ -60,54 +77,138 @@ async def update_post(
             update_post_data["thumbnail_image_uri"] = None
         else:
             # Create a new thumbnail image and save its S3 signature
-            s3_object_key = f"{user_id}/{post_id}/{uuid4()}"
+            s3_object_key = await upload_deduplicated(
+                POST_IMAGES_S3_BUCKET,
+                f"{user_id}/{post_id}/{uuid4()}",
+                post_image.file,
+            )
             thumbnail_image_uri = (
                 f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
             )
-            s3_client.upload_fileobj(
-                post_image.file,
-                POST_IMAGES_S3_BUCKET,
-                s3_object_key,
-                ExtraArgs={"ACL": "public-read"},
-            )
             update_post_data["thumbnail_image_uri"] = thumbnail_image_uri
 
-    set_statement = to_set_statement(update_post_data.keys())
+    if "post_image_s3_object_key" in update_post_data:
+        # Uploaded by the client through an upload intent
+        delete_post_image = True
+        s3_object_key = update_post_data.pop("post_image_s3_object_key")
+        update_post_data[
+            "thumbnail_image_uri"
+        ] = f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
+
+    if "thumbnail_image_uri" in update_post_data:
+        update_post_data["thumbnail_image_derivatives_uri"] = None
 
-    query = f"""
+    update_post_data, layout = split_layout(update_post_data)
+
+    if layout:
+        # Keeps buffered layouts written later from moving the post back
+        post_layout_buffer.discard(user_id, [post_id])
+
+    if update_post_data:
+        set_statement = to_set_statement(update_post_data.keys())
+        # p2 is locked first, so that concurrent updates each read what the other
+        # wrote and never release the same image twice
+        query = f"""
 UPDATE
     post p1
 SET
     {set_statement}
 FROM
-    post p2
+    (
+        SELECT *
+        FROM post
+        WHERE id = :post_id AND user_id = :user_id
+        FOR UPDATE
+    ) p2
+    JOIN post_layout l ON l.post_id = p2.id
 WHERE
     p1.id = p2.id
     AND p1.id = :post_id
     AND p1.user_id = :user_id
 RETURNING
-    p2.*
+    p2.*, {to_csv(f"l.{column}" for column in LAYOUT_COLUMNS)}
+        """
+    else:
+        # Only the geometry changed, which leaves the post row alone
+        query = to_update_post_statement([], ["*", *LAYOUT_COLUMNS])
+
+    async with database.transaction():
+        if layout:
+            await update_post_layout(user_id, post_id, layout)
+
+        result = await database.fetch_one(
+            query=query,
+            values={
+                **update_post_data,
+                "user_id": user_id,
+                "post_id": post_id,
+            },
+        )
+        result = jsonable_encoder(result)
+        await bump_board_version(user_id)
+
+        # Image posts created through v1 hold their image in both columns
+        if (
+            delete_post_image
+            and result["thumbnail_image_uri"] != result["content_uri"]
+        ):
+            await release_object_uris([result["thumbnail_image_uri"]])
+
+    if s3_object_key:
+        image_derivatives.schedule(
+            "post_image", post_id, POST_IMAGES_S3_BUCKET, s3_object_key
+        )
+
+    result.update({**update_post_data, **layout})
+    result["favicon_url"] = get_favicon_url(result["favicon_hash"])
+
+    return result
+
+
+async def update_post_layouts(
+    user_id: str, layouts: List[Dict], *, buffered: bool = False
+) -> Dict:
     """
-    result = await database.fetch_one(
-        query=query,
-        values={
-            **update_post_data,
-            "user_id": user_id,
-            "post_id": post_id,
-        },
-    )
-    result = jsonable_encoder(result)
+    Move and resize every post in layouts in a single statement. Returns the
+    updated geometry and the ids of the posts the user has no post with.
 
-    if (
-        delete_post_image
-        and result["thumbnail_image_uri"]
-        and _is_saved_in_whoami_s3(result["thumbnail_image_uri"])
-    ):
-        _delete_post_image(result["thumbnail_image_uri"])
+    If buffered and write-behind is on, the layouts are only written with the
+    next flush of post_layout_buffer. They are then returned as given, since whose
+    posts they are is only checked when they are written.
+    """
+    post_ids = [str(layout["id"]) for layout in layouts]
 
-    result.update(update_post_data)
+    if len(set(post_ids)) != len(post_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each post can only be given once",
+        )
 
-    return result
+    if buffered and POST_LAYOUT_WRITE_BEHIND:
+        await post_layout_buffer.put(user_id, layouts)
+
+        return {
+            "posts": [{**layout, "id": str(layout["id"])} for layout in layouts],
+            "not_found": [],
+        }
+
+    # Superseded by these, e.g. when a drag ends
+    post_layout_buffer.discard(user_id, post_ids)
+    updated_at = datetime.now(timezone.utc)
+    posts = await write_post_layouts(
+        [
+            {**layout, "user_id": user_id, "updated_at": updated_at}
+            for layout in layouts
+        ]
+    )
+    updated_post_ids = {post["id"] for post in posts}
+
+    return {
+        "posts": posts,
+        "not_found": [
+            post_id for post_id in post_ids if post_id not in updated_post_ids
+        ],
+    }
 
 
 async def create_post(
@@ -115,45 +216,50 @@ async def create_post(
     create_post_data: Dict,
 ):
     create_post_data["user_id"] = user_id
+    s3_object_key = None
 
     if "favicon_image" in create_post_data:
         favicon_image = create_post_data.pop("favicon_image")
-        create_post_data["b64_favicon"] = await _favicon_to_b64(favicon_image)
+        create_post_data["favicon_hash"] = await _save_favicon_image(favicon_image)
 
     if "post_image" in create_post_data:
         post_image = create_post_data.pop("post_image")
-        s3_object_key = f"{user_id}/{create_post_data['id']}/{uuid4()}"
+        s3_object_key = await upload_deduplicated(
+            POST_IMAGES_S3_BUCKET,
+            f"{user_id}/{create_post_data['id']}/{uuid4()}",
+            post_image.file,
+        )
         thumbnail_image_uri = (
             f"https://{POST_IMAGES_S3_BUCKET}.s3.amazonaws.com/{s3_object_key}"
         )
 
-        s3_client.upload_fileobj(
-            post_image.file,
-            POST_IMAGES_S3_BUCKET,
-            s3_object_key,
-            ExtraArgs={"ACL": "public-read"},
-        )
-
         create_post_data["thumbnail_image_uri"] = thumbnail_image_uri
 
-    insert_statement = to_csv(create_post_data.keys())
-    value_statement = to_ref_csv(create_post_data.keys())
+    post_data, _ = split_layout(create_post_data)
+    query = to_insert_post_statement(post_data.keys(), ["*", *LAYOUT_COLUMNS])
 
-    query = f"""
-INSERT INTO post ({insert_statement})
-VALUES ({value_statement})
-RETURNING *
-    """
-    result = await database.fetch_one(query=query, values=create_post_data)
+    async with database.transaction():
+        result = jsonable_encoder(
+            await database.fetch_one(query=query, values=create_post_data)
+        )
+        await bump_board_version(user_id)
 
-    return jsonable_encoder(result)
+    if s3_object_key:
+        image_derivatives.schedule(
+            "post_image", result["id"], POST_IMAGES_S3_BUCKET, s3_object_key
+        )
+    result["favicon_url"] = get_favicon_url(result["favicon_hash"])
+
+    return result
 
 
-async def _favicon_to_b64(favicon_image: UploadFile) -> bytes:
+async def _save_favicon_image(favicon_image: UploadFile) -> Optional[str]:
     contents = await favicon_image.read()
-    base64_favicon = base64.b64encode(contents) or None
 
-    return base64_favicon
+    if not contents:
+        return None
+
+    return await save_favicon(contents)
 
 
 def _is_file_empty(tempfile: UploadFile) -> bool:
@@ -182,16 +288,20 @@ UPDATE
 SET
     post_image_s3_uri = NULL
 FROM
-    post p2
+    (
+        SELECT *
+        FROM post
+        WHERE id = :post_id AND user_id = :user_id
+        FOR UPDATE
+    ) p2
 WHERE
-    p1.user_id = p2.user_id AND
-    p1.user_id = :user_id AND
-    p1.id = :post_id
+    p1.id = p2.id
 RETURNING
     p2.post_image_s3_uri
     """
     update_post_data = {"user_id": user_id, "post_id": post_id}
-    result = await database.fetch_one(query=query, values=update_post_data)
 
-    if getattr(result, "post_image_s3_uri"):
-        _delete_post_image(result.post_image_s3_uri)
+    async with database.transaction():
+        result = await database.fetch_one(query=query, values=update_post_data)
+        await bump_board_version(user_id)
+        await release_object_uris([result["post_image_s3_uri"]])
@@ -1,6 +1,12 @@
-from typing import Optional
+from typing import List, Optional
+from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conint
+
+MAX_POST_LAYOUTS_PER_REQUEST = 1000
+
+# The geometry columns are INTEGER
+Int32 = conint(ge=-(2**31), le=2**31 - 1)
 
 
 class PostModel(BaseModel):
@@ -16,10 +22,34 @@ class PostModel(BaseModel):
     source: Optional[str] = Field(example="some source")
     content_uri: Optional[str] = Field(example="some uri")
     thumbnail_image_uri: Optional[str] = Field(example="some uri")
+    # Resized copies of the image, see whoami_back/utils/image_derivatives.py
+    thumbnail_image_derivatives_uri: Optional[str] = Field(example="some uri")
     title: Optional[str] = Field(example="some title")
     description: Optional[str] = Field(example="some description")
-    b64_favicon: Optional[str] = Field(example="some favicon in base64 string")
+    favicon_hash: Optional[str] = Field(example="some sha256 hex digest")
+    favicon_url: Optional[str] = Field(example="some favicon uri")
 
 
 class PostResponse(BaseModel):
     post: PostModel
+
+
+class PostLayoutModel(BaseModel):
+    id: UUID = Field(..., example="some uuid")
+    x: Int32 = Field(..., example=3)
+    y: Int32 = Field(..., example=3)
+    height: Int32 = Field(..., example=3)
+    width: Int32 = Field(..., example=3)
+    scale: float = Field(..., example=1.0)
+
+
+class UpdatePostLayoutsRequest(BaseModel):
+    posts: List[PostLayoutModel] = Field(
+        ..., min_items=1, max_items=MAX_POST_LAYOUTS_PER_REQUEST
+    )
+
+
+class UpdatePostLayoutsResponse(BaseModel):
+    posts: List[PostLayoutModel]
+    # Posts that do not exist or belong to someone else
+    not_found: List[str] = Field(..., example=["some uuid"])
@@ -1,8 +1,19 @@
-from copy import deepcopy
+import base64
+
+from whoami_back.api.assets.commands import get_favicon_hash
+from whoami_back.utils.db import to_csv, to_multi_row_values, to_ref_csv
+from whoami_back.utils.post_layouts import LAYOUT_COLUMNS
+
+youtube_favicon = base64.b64decode(
+    b"iVBORw0KGgoAAAANSUhEUgAAAJAAAACQCAYAAADnRuK4AAAABGdBTUEAALGPC/xhBQAAACBjSFJNAAB6JgAAgIQAAPoAAACA6AAAdTAAAOpgAAA6mAAAF3CculE8AAAAhGVYSWZNTQAqAAAACAAFARIAAwAAAAEAAQAAARoABQAAAAEAAABKARsABQAAAAEAAABSASgAAwAAAAEAAgAAh2kABAAAAAEAAABaAAAAAAAAAEgAAAABAAAASAAAAAEAA6ABAAMAAAABAAEAAKACAAQAAAABAAAAkKADAAQAAAABAAAAkAAAAADMBWeLAAAACXBIWXMAAAsTAAALEwEAmpwYAAABWWlUWHRYTUw6Y29tLmFkb2JlLnhtcAAAAAAAPHg6eG1wbWV0YSB4bWxuczp4PSJhZG9iZTpuczptZXRhLyIgeDp4bXB0az0iWE1QIENvcmUgNi4wLjAiPgogICA8cmRmOlJERiB4bWxuczpyZGY9Imh0dHA6Ly93d3cudzMub3JnLzE5OTkvMDIvMjItcmRmLXN5bnRheC1ucyMiPgogICAgICA8cmRmOkRlc2NyaXB0aW9uIHJkZjphYm91dD0iIgogICAgICAgICAgICB4bWxuczp0aWZmPSJodHRwOi8vbnMuYWRvYmUuY29tL3RpZmYvMS4wLyI+CiAgICAgICAgIDx0aWZmOk9yaWVudGF0aW9uPjE8L3RpZmY6T3JpZW50YXRpb24+CiAgICAgIDwvcmRmOkRlc2NyaXB0aW9uPgogICA8L3JkZjpSREY+CjwveDp4bXBtZXRhPgoZXuEHAAAIYElEQVR4Ae2d+3XbNhjF6Z7+H6UD1LA7QHzSAaKkA+QxQPNYoEkGqGUP0KQTJFmgdRaIlQUSZ4GIXiBWFqh7L8VPAWm+JFOKBVycAwEEPoLED/d8AKFXkiiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAismcDWmq+3ksudJ8kADTNWhaa6KvvLlqU1DUwBe1pTt7HFaxcQBtvltJja4F5D/npevp2nVsdDP191nJ+ycQkFxWghtUye2vFXHJudlVmatYGBtGOYri/0KqDcEzjc/h4iU4phgMhjBpe96mWVBFI0nokKKfOniGeInxDpBU+Q9hbQ3vIhFwzFcQ/xLqJDVLj6BCiiFPEI8T1EwPxSYSkB5cL5A1d8ijhY6so66SoRGONmXkMMbxa9qYUEJOEsinfj7Ce442cQxduud95ZQBDPHhr9F9F1bVx2G0vgBYTxvMvd/9DFCOLhdHWM6LrYy2bjCTzDmH9AbB1vCK05oJF9WIyarVQbKIEJ+nUTIpnW9a/RA0k8ddiiKd9BT/9p6m2tgCCeezhx1HSy6qIgcBta+Kuup5VTGE5wOOEYkamCCEASyR2IZVxGUeeBRjB0ZWMdR0sA2kn+rOo9Kwoh9z6TQqEORCBJKr1QlQcaiZYIVBCgs/m9XF7lgeh9XNlQxyIAAmeIuxDN/LG+4IHgo4YwcIgKIlBFYIDCPb+iIKBypW+ovAiAAGesoU+iLKBbfqXyIlBB4IZfVhaQ8yuVF4EKAgUnQ5eUBax/OL9xkaQgAk0EIJVsIZ3SyPdAhcURKxVEoIbAfBrzBUQPpCACXQjsmJEvIHkgo6K0iQCXPdtm4AvIWaFSEWgh4KzeF9BcVVapVARqCGgNVANGxd0IzNfLvgdy3c6VlQgkg3zbp/AYP1dVkIAePsS32J4G2bXv1KlML5kHgprcd7qJ9V12B0+eL14kyWSC3obf3TWAzSDaFBYPUYqHIqKYJKTL6KwgoMs0tJnncjo7Pk4STm0KSxMwDxT2+qcODz3Q69dJ8uqVvFEdo+ryLRQ7VsUtIBJgePRoNq3t72eHeulE4BqtTECu0ymhG41GMyHdvRt6T/voX0FAfTQYRhuc1o6ONK21j2b2i3LmgdrNY7PgtKZFdtOoFzyQa7KMts4W2do7qpLAt43EqlqVeQQoJNs7GsT5wOrRsKwEZCQ6p9w7+vhRe0ceMFsDbXtlyjYRsGlNe0eOmExATchUV0WAi+zPn/HzW3HvHUlAVeLoWra1hV9QGs2ENBx2PSsoOwmoj+Hc2Zk98kc2rZ3j7QwJqA8BWRuc1t69i2qRLQHZ4PeV0hvxDVquj7jgDjxIQKsaYArJFtkB7x1JQKsSENu1RfaHD8FOaxLQKgVkbdu0FuAiWwKyQV5HantH4Xy4X09h69BN4Rrj8ezjIoXCzT34cXNvfcPunG/GPnmCX1oeb9iNN97uVFNYI5+eKl++xD9O3AxNPIQzlQfqSSOVzfADac/xr0knJ5XVIRTKA61iFM/O8Ldtz/DnAHeCFg/RyQP1LSBOVwcHcO7Tvlu+ku1JQH0NS5iL5FY6msJaEbUY0NPQ4+zuhrhIbuz8Fv7tWR6oEVFLJRfJfDRP0xbDcKvNA52G28UV9IzT1f37s0VyxOIhWRPQCigH2qTt6fDLh3GH7ClBU1hXEUSwp9MVRW6XCUgeqI0aF8mR7Om0oSjVFzxQWqrUIQnwk4UUTyR7OgsOekFAC54buDkXxo8fR/dYvsyo2hQGYgoJ34Lgng4/ABbWu+arGNyUjWoRTQrn5zPBRL6nQxSLBvNA2Xy26MlB2HNP58ED7eksPpjZ3mG8AqLX0Z7O4rKZnQF4yVdmbQpLeRBFsOnq8FDrnMsNeIRPYVwkUzj0PAqXJZCygS1rBT6JbincMBzOPtylPZ0+xphauQnxnPgCmqDQ9dG62gieAAX0E8RT+FB9vE9iwY93/x2keNiqPYUxn/JFQQQ6EDgxG19Ap1aoVARaCMxnK19AactJqhYBI/DJMhKQkVDalQAX0KkZ+wKaz2tWqVQEagjMPRAW098CpIWdtmTwrUQ5EbhAYP4IzxrfA/E45YuCCDQQmNojPG3KApq7poYGVBU3gcJSpyygcdxs1PsOBN77NhKQT0P5NgJc/9QLCHNbCoMxooIIVBFIoZGxX1H2QKx76xsoLwIegbGXz7IQVDHAR/ExHr+SnVwv1ugocgKcvnbzWWqO4oIHgsEUtYdzC2VEYPZZsYOyeAjmggcyWpAb/vQhuW3HSqMm8BlC+aWKwAUP5BnhqwrJxDtWNk4CX9Dt3+q6XisgKI5T2R1EiaiOXvjlmXighbSuq6hrDpjKHCw4ne00W6o2MAImnsLOc7mPtR7IDHP10RMdW5nSoAnAZ2RP4b9i7BvFQwqtAqIRRYRIER0g8gIKYRLg2P6NSPGkK+kiruAQXyH+h8iv6SmGweAYYzlcVDQQ2nIBF3M4cx/xFiLzDEu3Nztdr2smwAelI8Q3GLjxMtfuZcBz5d7ADZiY9ko308t1Sm3qcHECKU7humaMyI/u8IuBFNHSYWUDC1E53BXjAJGCupZHh5RlfsRhY1jZfTZedTMq0/w2mU7zeIqUny79injCMgBMkfYersTAQGy+mJhnsDLmHV+88LOXZ9aVjv3Dct26+pz6N+Hlp8gz+oED7ZfZ4JtNmmcsTdCJeT6vUyICIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIrAxBP4HtLBfcwuxz0sAAAAASUVORK5CYII="
+)
+web_page_favicon = base64.b64decode(
+    b"iVBORw0KGgoAAAANSUhEUgAAAMIAAADCCAMAAAAsP+0DAAAItmlUWHRYTUw6Y29tLmFkb2JlLnhtcAAAAAAAPD94cGFja2V0IGJlZ2luPSLvu78iIGlkPSJXNU0wTXBDZWhpSHpyZVN6TlRjemtjOWQiPz4KPHg6eG1wbWV0YSB4bWxuczp4PSJhZG9iZTpuczptZXRhLyIgeDp4bXB0az0iQWRvYmUgWE1QIENvcmUgNS42LWMxMzcgNzkuMTU5NTQ3LCAyMDE2LzA3LzA3LTExOjM5OjI0ICAgICAgICAiPgogPHJkZjpSREYgeG1sbnM6cmRmPSJodHRwOi8vd3d3LnczLm9yZy8xOTk5LzAyLzIyLXJkZi1zeW50YXgtbnMjIj4KICA8cmRmOkRlc2NyaXB0aW9uIHJkZjphYm91dD0iIgogICAgeG1sbnM6ZGM9Imh0dHA6Ly9wdXJsLm9yZy9kYy9lbGVtZW50cy8xLjEvIgogICAgeG1sbnM6SXB0YzR4bXBDb3JlPSJodHRwOi8vaXB0Yy5vcmcvc3RkL0lwdGM0eG1wQ29yZS8xLjAveG1sbnMvIgogICAgeG1sbnM6cGhvdG9zaG9wPSJodHRwOi8vbnMuYWRvYmUuY29tL3Bob3Rvc2hvcC8xLjAvIgogICAgeG1sbnM6eG1wUmlnaHRzPSJodHRwOi8vbnMuYWRvYmUuY29tL3hhcC8xLjAvcmlnaHRzLyIKICAgIHhtbG5zOnhtcD0iaHR0cDovL25zLmFkb2JlLmNvbS94YXAvMS4wLyIKICAgIHhtbG5zOnhtcE1NPSJodHRwOi8vbnMuYWRvYmUuY29tL3hhcC8xLjAvbW0vIgogICAgeG1sbnM6c3RFdnQ9Imh0dHA6Ly9ucy5hZG9iZS5jb20veGFwLzEuMC9zVHlwZS9SZXNvdXJjZUV2ZW50IyIKICAgcGhvdG9zaG9wOkNyZWRpdD0iTmV2ZXIgTm9ydGggTGFicyIKICAgeG1wUmlnaHRzOk1hcmtlZD0iVHJ1ZSIKICAgeG1wOk1ldGFkYXRhRGF0ZT0iMjAxNi0xMS0wMlQxNDoyMDoyN1oiCiAgIHhtcE1NOkluc3RhbmNlSUQ9InhtcC5paWQ6MmZhOGZjZDUtNTZmOC03NzQzLTg1MzItZDFjZTQzNDgyOGVhIgogICB4bXBNTTpEb2N1bWVudElEPSJ4bXAuZGlkOjJmYThmY2Q1LTU2ZjgtNzc0My04NTMyLWQxY2U0MzQ4MjhlYSIKICAgeG1wTU06T3JpZ2luYWxEb2N1bWVudElEPSJ4bXAuZGlkOjJmYThmY2Q1LTU2ZjgtNzc0My04NTMyLWQxY2U0MzQ4MjhlYSI+CiAgIDxkYzpjcmVhdG9yPgogICAgPHJkZjpTZXE+CiAgICAgPHJkZjpsaT5ORVJJUyBBbmFseXRpY3MgTGltaXRlZDwvcmRmOmxpPgogICAgPC9yZGY6U2VxPgogICA8L2RjOmNyZWF0b3I+CiAgIDxkYzpzdWJqZWN0PgogICAgPHJkZjpCYWc+CiAgICAgPHJkZjpsaT4xNlBlcnNvbmFsaXRpZXM8L3JkZjpsaT4KICAgICA8cmRmOmxpPnBlcnNvbmFsaXR5PC9yZGY6bGk+CiAgICAgPHJkZjpsaT5wZXJzb25hbGl0eSB0eXBlczwvcmRmOmxpPgogICAgIDxyZGY6bGk+cGVyc29uYWxpdHkgdGVzdDwvcmRmOmxpPgogICAgIDxyZGY6bGk+TkVSSVM8L3JkZjpsaT4KICAgICA8cmRmOmxpPnBzeWNob2xvZ3k8L3JkZjpsaT4KICAgICA8cmRmOmxpPnR5cG9sb2d5PC9yZGY6bGk+CiAgICAgPHJkZjpsaT5mcmVlIHBlcnNvbmFsaXR5IHRlc3Q8L3JkZjpsaT4KICAgIDwvcmRmOkJhZz4KICAgPC9kYzpzdWJqZWN0PgogICA8ZGM6cmlnaHRzPgogICAgPHJkZjpBbHQ+CiAgICAgPHJkZjpsaSB4bWw6bGFuZz0ieC1kZWZhdWx0Ij7CqSBORVJJUyBBbmFseXRpY3MgTGltaXRlZDwvcmRmOmxpPgogICAgPC9yZGY6QWx0PgogICA8L2RjOnJpZ2h0cz4KICAgPElwdGM0eG1wQ29yZTpDcmVhdG9yQ29udGFjdEluZm8KICAgIElwdGM0eG1wQ29yZTpDaUFkckV4dGFkcj0iNiBOZXcgU3RyZWV0IFNxdWFyZSIKICAgIElwdGM0eG1wQ29yZTpDaUFkckNpdHk9IkxvbmRvbiIKICAgIElwdGM0eG1wQ29yZTpDaUFkclBjb2RlPSJFQzRBIDNESiIKICAgIElwdGM0eG1wQ29yZTpDaUFkckN0cnk9IlVuaXRlZCBLaW5nZG9tIgogICAgSXB0YzR4bXBDb3JlOkNpVXJsV29yaz0iaHR0cHM6Ly93d3cuMTZwZXJzb25hbGl0aWVzLmNvbSIvPgogICA8eG1wTU06SGlzdG9yeT4KICAgIDxyZGY6U2VxPgogICAgIDxyZGY6bGkKICAgICAgc3RFdnQ6YWN0aW9uPSJzYXZlZCIKICAgICAgc3RFdnQ6aW5zdGFuY2VJRD0ieG1wLmlpZDoyZmE4ZmNkNS01NmY4LTc3NDMtODUzMi1kMWNlNDM0ODI4ZWEiCiAgICAgIHN0RXZ0OndoZW49IjIwMTYtMTEtMDJUMTQ6MjA6MjdaIgogICAgICBzdEV2dDpzb2Z0d2FyZUFnZW50PSJBZG9iZSBCcmlkZ2UgQ0MgMjAxNyAoV2luZG93cykiCiAgICAgIHN0RXZ0OmNoYW5nZWQ9Ii9tZXRhZGF0YSIvPgogICAgPC9yZGY6U2VxPgogICA8L3htcE1NOkhpc3Rvcnk+CiAgPC9yZGY6RGVzY3JpcHRpb24+CiA8L3JkZjpSREY+CjwveDp4bXBtZXRhPgo8P3hwYWNrZXQgZW5kPSJyIj8+/vrmFgAAAARnQU1BAACxjwv8YQUAAAABc1JHQgCuzhzpAAAACXBIWXMAAA7BAAAOwQG4kWvtAAADAFBMVEVMaXFHqKhvRlltiVDiwxtvQ1hFpaZ2h1lfgGtWhHt1TGBsi05Jqarjxh10j1bkxh5KqKpxSF3kyCHjxyBwRllOrK11TGBMqqp1kFfoyyZxRVt2TGBOrK10kFdySFzt0CjnyiXnyiZMqqtNrK52TGBzSl5vjVJ0j1Z1TGB2TGF2TGFNrK3kxyHkxyJNq6xzSF1KqKp2TGHoyyROra7myiR1TGBzjlVPr7BMqqvrzid1S19Nq6zoyyVwjFJMqqt1kFfkyCN3k1lMq6zoyybpzCbixiB1S2BKqap0Sl5LqapJqalOrq91TGBzj1ZOra5yR1zkxyLkyCPmySTmyiTpzCZzSV1yjVRzj1ZzjlVNrK1zSV1xjVR0j1Zvi1J1S192kllMq6zmyiTlySV0kFdzjVV0j1Z3k1pxjVVwjFN4TWJxjFNLqapNq6znyiVzSl5Nq6x0j1ZNq61xjFRMqqt0j1ZPr7BMqqtNq610S1/oyyXrzifnyiXqzSflySTmyiTmyiV0j1Z0jlZNrK11S2BNq61yjlVLqap1S19vi1F0Sl/myiVIqapzjlVNqqxzjlVzSV5xjVTmySNNrK10S191S19ySF1zjlVzjlV1kVhvilB3TWHszyfmyiVzR13lyCRzSV1xjVR1TGBzSV7nyiR0j1fnyiXlySV1Sl9LqarkxyPnyiROrq/nyyVzSl5zj1ZxjVTlyCN1S2BPr690j1Z0Sl51kVh0j1bkyCNNrK3lySNzjVV0S190j1ZQsLFvi1LjxyNOra50Sl90Sl9zSl5NqqxQsbJzSV5zj1ZyjlV0j1Z2kllNq6x0S19zj1blyCTrzyZ1kVfrzyfnyiTlySJ3TGByjVTkyCJ0j1Z0j1Z0kFdNq6zkxyPlySR2TGHkyCPnyiN2kllzj1VzjlVPsLF3lFpPsLF3k1royyTlySNzjVR3lFt2klqVb0xubVVzfVeLmUt1TGB0j1dOq6zlySdOrK3nyyfpzCd1kFdPrq92TGF2TGB1kVhzjlZ3TWJNqqt2klk56XGKAAAA8HRSTlMACwgIAgUGAQMC+wYRBfoJHhsWDQ3390D2+BLY/O0h/a70ToLpZBSj3+T1shsi0DAa7l/vlKlS/Fb7l5PXHUfiPvN8/eoRrihdORTKom3zFihDZGnNNj24XtkrKb8Mkvpxdv7xWOnoOiz6GySivmuJxuwlX5H2Z+WLtuDg8Huc7p3bu83gZjKcD3rJF0G4TEc1VMPBtEB0iP0R8fHTJ3BEILpKpczEj4QtOILn51PXMDP903tPlqpGm1tF0t7dGDCYcn9ZrNY70EmwsaTJg0+N29uKLMdHLn7T1adMh9NJLtKAgaDFp/2GS0PN/hwQTkL/83IVAAATKElEQVR42uyaS0gb2x/HjRgnkQSjMYZosJoomESjMYrRiEisb4nvhS6KdSe+EPFdFWxQqkjR1o1XLbb0VqsFKwUtF6la7Ua55bblLmztXfy5/LchmUgiWP5ja3XOJJlzTBOb/vG7PZPMfOb83md8fK50pStd6UpXutKVrnSl/39hLJY/i+36+k8XmyPskEp1bfP+jtdZo5m1xLqGx/JWAn/h2oo+1Yq3TugSMUfrku1qgdUq7lR0FHonAUujNOGmE+GC7Xn7dUZt57d1HG/VNnilG0iqTWcS7/Ps9qCj9Xxdrx31QoTEMfH5I5oEOgbFTwqK8PNlfLHNC/2hjfSSCSkppsSR6snL4jHv2wZGI0BgateAsZM3iJOX8U6hF9oR8IimVIolFaxYAQR1h9elB94YuAupFIe1Q6j1foQWzq+GwNmm+EIHmKLni0CEVslPzcKcwkIOtYbAdAIAgequhWupAIKSmtxYDOJfGZeyNYyhWq1ie6NjnhL4h5Rkf8YbEyncmnXyul4K/pzNk7TsKxpbMhM9DoHxaosWBbhJsFhUCz6kv05NIqgWUqukUS1pm6wTQ5Tyan9dLzaJ9eu7Qn8PIzSsqa04flLn4GotyJC4of7+nnFDh33ynVd8Z8DFRRIWWAAqxSf/SvxtqlLjWQbiVZ6bg4BiDDzpaZUkGHT4GHnazm/rrftCgADLJBkhrszEPFpFdJq+nN3si0ECGi5DKB1TKot2O/IcF0CFkhZifWJDQ6nFebvkaNXeyPHkJuyTSzmTdY16MwYvL69h1HkF93WdQ3nLmGYRCFYGT8bbIQMQOPGiIbeklJZ24G/FLR60JCEY+4n35Y6b8RqBlGGyNjI8iQDWcq1tHkHYHr3EXdD8crtQ0EnxhYJfzhd4CsCQrP9xT/hrU4PdkMaT5UVHK5mhU+OeBjhPQc4LqQqeR3uzXVJiELS4KQexJDvnDPiKxLOV3pBCb/02DLLqGxvgNosRQqh+O9bPaqTqNoZHCXyw+ZZqvdhqFatXpLD99ufw8oSEhhoSOZAXy9GMEfWvFRcsKjI9TEAwcITS7aIiha6A/lZY4VCbdmJnZ319fadIIc1soL+clUdcvTKxpuFdStPjT/RXDEhFXChZM+gJ4ziVQD1RO0T/ExaDQ3RtXjMg889sBAdjJ9FeqcvDfsrTsJisC9+Yp6vGTfYSDEou3M34cbk/xs0sqcpvjnkT5HuRH7GHdvUmh8J3ai9U/fgFvx+vKF+N57vuuSWvUw5k0bKDuZgg9FfBKlC0444RTNZFXSL6/fll/ZU9S0t/Pe77m+siwkxXbIDtRM+jixOQA8W8ItUZwclEW4ecDnMqMkQWQofZvzV9DHSJIKi43vhdAfdnEPdhtFFsohFu6ED0B35Fj8V8Ksv0Rz8XCHw3VcZzhT4JQYtFlImYPYMScaT9MePQfKbs7vcuICTs2UgIxoNJlG1gZRroCUxfxLtIB21x/dlmkqL6XNiGGDmZwBiwxUQpA/dNUKmRDnjKMixkhMPI4AsThNwIABCOhxEsiaXphCN8GUSJrEm/mQGEkYULI4QVUxBSghD6rw0cjmBqlcC3gTsLIlimyy4HoQCcwDvTGuNSEHy7KAjFYfC83KFHIcAn8uD3f0k1pOWLu3M+xZ2fwN2Zo01FQjAgWFLW9A+7s0/NvSMgqD6AB1WwB3YugQ6e3oKT08h2dL3ChaDKbI4mMchRUluBEg0B18KdASsjp7a0yHiXCowbU2fJTT4cgfCLzGocCcG6gdBcBlb0nDGkNZW5VuhFPAmv/1rmBUSnoxD4ZBoQEf5FqVdzkipFlsPDQ0v2re4sV0vVkhcp4bGy2PDcfLRiW9KJiIA2KQpc+L2yt6ent2m21M/HVbFLaibvTtaUMNEuRzakf9G+R8L48VmrqwtxgT6XJrf6ws8R8L0OXURq8fdWhMRdtKCqrvVaBH8pWnbeEWLeioC1LaJYEj7I8/Fa5Q2iWJKgheG9CAypAKHlMRR48ce2mHAFbklijx6NX8o2GDz/VR4rqCYhISLERW+Y+ALzBKlrnuAX/M/yq3ikRB0RMzy3t5f75IFLENABgFgx7xJAfFLy45HHkTfhBR/zQa6q/vjoKKA+fCsCc8mU1LQBtcilnMAfj7yeZrFY0kSVN+MgBA9vH5+2CLapG7QVNsbyJcS0Cy6JWrVzl7Yq7XpOjBsYGMjl+tH3Dmf9jyXqLT1D1QfSCE91x2nHzw4pqXkY09zcnD8ZEeZL+TSHhkFJOWHw4wcvj1cQepkVl8OlaaRJHdytWTqHKEmvB4eQTvYq4ln6nix6Sj4lV0XHzm1NlgB7UVjrqGIl3FwwVgDsQWDpy/7KpYEoQgNL05EVr3IcGxn/ETDNqKSbir05AKYW8i5HLs2u2dyTkyc0AdEpr4Ehk79QobZL07i4Gjwj5Zd9mo6qO3+yOlFv/58O5xRZ4HAy7abzbWDGyIBRsO1eiYOWuvkeOJ75BvGQfBKE8WrH9MAxgzXVsAEcx2LxnzJEZoqyl/oXHDjFbBQ4FnvkfBYQ0iUHBi+2gxo7yqphlc1or4DwO8BGsPLaNqrV7e0nh57i9vbFCWlmIdlKAj93iyxme2WPlOfYPdc78BrL47+dIwyHAs9lC6+izvhe3AMpz69Vpc8AHsEeLdDotGODg2Pb2trMIQa1tU8zO9RhT59dxPmdAjvyyvkQcksF7sJtSlhlvtizGZ3IFlpcQ/FGNqOwgRCvkNrh8G/2ZpudyHI9meoQn+oou+D8vIT1WgYgPL9PiaqTt400Ci2OQEtUgeW9FrNTWQb6KLaUtAQwpCXTDCdrPgAvWbUJnNZiM3NGWqmehCEhfM6gISC0VA6miNIR4HpREk0eDLkzRTaNuQRwXk85NbGXLB/lACeuu46WwFw3DY6xuU/JIemwu5S2xkufOjel8GfA/IiZL4MQEFE4AU7A7YsyQ1T3CDSV+Mjz+GvJ+JO2GGHPpKtsX43JVn+QDya2iNxjGIJRvgX9UABbyDBDdX2cC/4m8tbhV2M6zK4shxTcWMSdD6rnx8ehscUPwadhxciOoAjG8BmoL/9XBEewUI4TuKVPKwfSrl2LynhUBv+cwTehuSs9fetFGKUGLSmGbwIRlWJg3lD62Iygv8oo1hK4PJucnNy3GoxWqzv8GO1huA0BwZgL6ZT8ygdQEETv+GiPdRFtylEIjOEJ9Pfhv7WgIFi649zeUYfdqEdCUEHiamn3IRLCdJnbJ341c0h2ZAzoYl7kGNApwlKSn7sR3vxhRFMxfVgdv25GUtRNrrsRHsSiEdggCElpaAjX3rkd4UU0IkIKfUgqv4aI8NbtCM9UiAi5Yd6KcPeyDcn9CMjuPAxx5wE0BFGf2xES7qEF1eeQoFqWgRhUy90eVEuGEVNbDD3C+yY0hIzPbk9trDtoBUbsG/pb5/SjZeemeB+365kMCWEOVubNRiH5QjL/R953xJu7kwl2T4LS8RDF9ibsS4HlERSCnnGqN3PjFlazSlHA2Alb9/+Qxe4NP6PEd+bmFIodQTvPwOQ6BARqoeq3/DRyujejKXkcekjim7932uPL0mvYlEIPvg2hXfDGc7UXTnCLMsPIKa887fWWkiFVeEjMmcUfyXPBD7WZMdAa4+h2FcIU6R2086yLjKOOzs6CgOgRraOz7h6Qor/8BjgVDkqBDGGOoptRvpkpHcmGIPSughs33ksKY6KndA4RBAT/o9iHoJtU3YbML9KDUOKF38te+tww0AcafHCkBeyraf58EuyPQ9PBuMT+X3vXH9JkGseHS95XRwstYhrrFHQrUSKxgXHjbVjRHzeqq7bRpmJubg2KMfZHP9QmhzRDpqHNGVeOsuLC3IXpoYlxCKmRYVFpXEcqcVfXXy+hL6ZxN8t0z7N37/vsbfPeO/z++7r33ef9/v58v3vsZyyUEhu3oMW8XSVtTBjSYXP/DYT8DYMa4o9nABA+PIXeatxxBgy3Gy7Q9JxYAk2qS65oY0BQCRt7SQrE0DDMF7bD5PzhEHffEM4f1jcegmgboUypeWasdvdYrC4c1sOpMHqYKs/LYZsvnHseAYQQy4ira8yiq/dmMorAGa/I5x7WVplM0lKpiRiQV9fLgMtruw8W0IGYelySjX3NfKEGni+Euid+6caG2zCIj1kNmXuDn4zr1UMmlZhaEFKsGutUyIDQ+lNl2zQMYvpM2hsaO78JzReOheeFsTubAAiJdB0Ytq6u6PesQOT6hOPDzMzM0YsNNVuCoykm02ml3sA3DxKquNdhFgEO0X31dH7B1CKMgvydaZdz6ErsXLDHyH+yi4HYBpmWcGE+teXX7zZkbM0KyMWtmx9uz9wC5GRc7yD+JkOEktiqm4GXkf3o5snT5eXpKSkp5eWnrj3pzqHvEXKuAeoqP89QDMdlbgaC5OGwsSvp/p3ME0VFRTWZV7akgnfENQ9UJK3MEpNWKFPv29F9+cn169crcve/CvtuV5UEq6HgKmOJsfdEUFdwt45x9SlhXUDiQv4E1xiKyTBCSR3WkO+3em1A1jD2aNmV6e8X/eHcDuass/HEQiE0k/jwDuKGLegqGoM3HAJyjpQ2Wbk0ADl5bZ9LjKmUY7+wdaSpe7ZtPnr0aNYPNw5x+tWrTxsewSc9dBRyuW1yblrb/Hzh2s2f2XtqPKmuf8+eW4e47VQVOsQko1BVbk43XpXzpjs39/y9r2nm0Do+hYlkEa/WJ+CzWIcoNgikpBrnMQJcx6qEgE8blDyG0CdnVwJJSnUi/kLoeYECYU5eyF87UheTKNLq5y0EWecfSBAII28d2qKdRYIg6eCtM2gGKCQIsw7h8n0pLJ52FzWcN1ehQXjXiejPn3dYv4alx9ZdqNnWuO1GSyoaUT5IkGha6EKr9dbcu1x5Mi0vN4cziIT72zavvx1o7DMaW5CKVrcJEcIDlOSGZd88nX7k/ZEjZ+hWDtF00PI0cXH/MTMumobkdCE8/l7aIo3f9ie3dYb7DUF8y6YrCHqobY+iL2RXBq1R7azgUqHuPZsIzGIRVgfrDWhBVTzMHlRXHwheE5jmNLeqA6c6m/rZ05FV/g4JghShVoXWTfLzIh+AxteAtNhH9smBQDSKlJ2pF7Xsr/QRSFlOc5i9rdse+fEFmNGE5AwPZOzP/x46vuDgjoghcDqBwf4AxRkkHvbkvLoEOr7gRw4QznKAIOyQINTaVX4sYi1Mc9BCiC8UofABltfsliRuQqmQQnxhX+QR6Qo4WcvIREnQQg+7GtqRuoXnx4CIVFDJ4XfbG4HJ2ofGS0ifUhrmWMKR1INUaYPOMPX4EZd9hpa7QFpApPYGq1jMSI7Y/O9LCxoqlr/kxB/F928I4rhRTzwTqgmSSREG1KYT23FskUZNf5ks4CTxdbu3zh8Wlnix4Rb6mW0uNRHepSlbLbJBrHqV15YS0ERByreXOSKY5ybvFO3evXt7/8ZICGKXeiQMrUqJtZpIuuZd+yuupqVdPfDqa45gwFOTkpJSI2S4XbrXXorWk53+yPr+VWuTs7OTl/EMiSV/MDuJEBBeic1jFfBFcJztnzTJjHKieGnaRpFeVetEPXM0xQK3XZ5jDTCh3W00PvMJmR/Xp2iySSVisXhOLJZIeuVqFgC4zGw0Gv2uZfhNvajeMU6YTERrk4XFroU+s27S0aV1NnncFhmb2qoNvSaTqWpI0RxrBIXVYwszEPEYO7ubIBS6mguF7OlYLy/90g51WmJL9Yl0QQGTUERL63b50mxIIrfHFIIZ4OsM/ui4X/OkJDj0TsSS6ytsAiZpktHoPKz2RXCnNNtaH0MI+laI0oqKzkUeFbgl0BFL3lcC9fE90bir1QmOJbzOGDp0LTSRNemi4QxKeTFEucr++xD6YmhIpZAhPYsGhL5O2JBiGJL0NsidfSF1QqGLsfIIXBfB13E16M5S9XIGVSjvNvsVngl1jz1cOpbVKzyjOo0VSom148sXVAXm1qDURhksYHD0D4+VqVSqMm21kr4Gd4x8ui53g4WQa1QFLJrEdIyVYKxa7IznBgaB4CdSGIqphdbASZMwhMYXC9X3O2IC7Bx8zqVoLXHEuKsQKWxfyjzbM9AeascoJp5CpAiaq0uHwbhpd0gXdGBqivl6A+4fNZSVlRE2jx5MQLIhwE3UsD9YbEsI5ihCB366WdE1ErjtiHzQJYi9FCrN7sF6HzyoATdIKJse+lQHEHbEQ1Dsx/v0b91v7bJlGqpjNH2n0AlmPRVUiSu14M4nYQ51tH/5fw73aUEIxaOgRfj/mgWDv453x/8pIQjeTtBSNOPg6KHUk8B3CMUOMOaYx0FDKlXzDkLzEARBDSYoPTh5oEwKviEQYGDtQZa9hXxFDrCUVLuFdxAEGoCVn5VDQVNkLAPyhsPFPwjCydIlU6FGBhlLaq/NLOCh2LsWMVCEOmRFAdN3SRauU95WhZCPEBL0Tb2ff3QhGaim4+QschP56brUwE8E80WE22lr7x0zDFtoGwZMputqbe8d0Kp9PD6NFFeae+qbw+ddoV3TY3FhghVZkRVZkRVZkRX5X8s/S/znepwxGwAAAAAASUVORK5CYII="
+)
 
 youtube_post_data = {
     "source": "youtube",
-    "b64_favicon": b"iVBORw0KGgoAAAANSUhEUgAAAJAAAACQCAYAAADnRuK4AAAABGdBTUEAALGPC/xhBQAAACBjSFJNAAB6JgAAgIQAAPoAAACA6AAAdTAAAOpgAAA6mAAAF3CculE8AAAAhGVYSWZNTQAqAAAACAAFARIAAwAAAAEAAQAAARoABQAAAAEAAABKARsABQAAAAEAAABSASgAAwAAAAEAAgAAh2kABAAAAAEAAABaAAAAAAAAAEgAAAABAAAASAAAAAEAA6ABAAMAAAABAAEAAKACAAQAAAABAAAAkKADAAQAAAABAAAAkAAAAADMBWeLAAAACXBIWXMAAAsTAAALEwEAmpwYAAABWWlUWHRYTUw6Y29tLmFkb2JlLnhtcAAAAAAAPHg6eG1wbWV0YSB4bWxuczp4PSJhZG9iZTpuczptZXRhLyIgeDp4bXB0az0iWE1QIENvcmUgNi4wLjAiPgogICA8cmRmOlJERiB4bWxuczpyZGY9Imh0dHA6Ly93d3cudzMub3JnLzE5OTkvMDIvMjItcmRmLXN5bnRheC1ucyMiPgogICAgICA8cmRmOkRlc2NyaXB0aW9uIHJkZjphYm91dD0iIgogICAgICAgICAgICB4bWxuczp0aWZmPSJodHRwOi8vbnMuYWRvYmUuY29tL3RpZmYvMS4wLyI+CiAgICAgICAgIDx0aWZmOk9yaWVudGF0aW9uPjE8L3RpZmY6T3JpZW50YXRpb24+CiAgICAgIDwvcmRmOkRlc2NyaXB0aW9uPgogICA8L3JkZjpSREY+CjwveDp4bXBtZXRhPgoZXuEHAAAIYElEQVR4Ae2d+3XbNhjF6Z7+H6UD1LA7QHzSAaKkA+QxQPNYoEkGqGUP0KQTJFmgdRaIlQUSZ4GIXiBWFqh7L8VPAWm+JFOKBVycAwEEPoLED/d8AKFXkiiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAiIgAismcDWmq+3ksudJ8kADTNWhaa6KvvLlqU1DUwBe1pTt7HFaxcQBtvltJja4F5D/npevp2nVsdDP191nJ+ycQkFxWghtUye2vFXHJudlVmatYGBtGOYri/0KqDcEzjc/h4iU4phgMhjBpe96mWVBFI0nokKKfOniGeInxDpBU+Q9hbQ3vIhFwzFcQ/xLqJDVLj6BCiiFPEI8T1EwPxSYSkB5cL5A1d8ijhY6so66SoRGONmXkMMbxa9qYUEJOEsinfj7Ce442cQxduud95ZQBDPHhr9F9F1bVx2G0vgBYTxvMvd/9DFCOLhdHWM6LrYy2bjCTzDmH9AbB1vCK05oJF9WIyarVQbKIEJ+nUTIpnW9a/RA0k8ddiiKd9BT/9p6m2tgCCeezhx1HSy6qIgcBta+Kuup5VTGE5wOOEYkamCCEASyR2IZVxGUeeBRjB0ZWMdR0sA2kn+rOo9Kwoh9z6TQqEORCBJKr1QlQcaiZYIVBCgs/m9XF7lgeh9XNlQxyIAAmeIuxDN/LG+4IHgo4YwcIgKIlBFYIDCPb+iIKBypW+ovAiAAGesoU+iLKBbfqXyIlBB4IZfVhaQ8yuVF4EKAgUnQ5eUBax/OL9xkaQgAk0EIJVsIZ3SyPdAhcURKxVEoIbAfBrzBUQPpCACXQjsmJEvIHkgo6K0iQCXPdtm4AvIWaFSEWgh4KzeF9BcVVapVARqCGgNVANGxd0IzNfLvgdy3c6VlQgkg3zbp/AYP1dVkIAePsS32J4G2bXv1KlML5kHgprcd7qJ9V12B0+eL14kyWSC3obf3TWAzSDaFBYPUYqHIqKYJKTL6KwgoMs0tJnncjo7Pk4STm0KSxMwDxT2+qcODz3Q69dJ8uqVvFEdo+ryLRQ7VsUtIBJgePRoNq3t72eHeulE4BqtTECu0ymhG41GMyHdvRt6T/voX0FAfTQYRhuc1o6ONK21j2b2i3LmgdrNY7PgtKZFdtOoFzyQa7KMts4W2do7qpLAt43EqlqVeQQoJNs7GsT5wOrRsKwEZCQ6p9w7+vhRe0ceMFsDbXtlyjYRsGlNe0eOmExATchUV0WAi+zPn/HzW3HvHUlAVeLoWra1hV9QGs2ENBx2PSsoOwmoj+Hc2Zk98kc2rZ3j7QwJqA8BWRuc1t69i2qRLQHZ4PeV0hvxDVquj7jgDjxIQKsaYArJFtkB7x1JQKsSENu1RfaHD8FOaxLQKgVkbdu0FuAiWwKyQV5HantH4Xy4X09h69BN4Rrj8ezjIoXCzT34cXNvfcPunG/GPnmCX1oeb9iNN97uVFNYI5+eKl++xD9O3AxNPIQzlQfqSSOVzfADac/xr0knJ5XVIRTKA61iFM/O8Ldtz/DnAHeCFg/RyQP1LSBOVwcHcO7Tvlu+ku1JQH0NS5iL5FY6msJaEbUY0NPQ4+zuhrhIbuz8Fv7tWR6oEVFLJRfJfDRP0xbDcKvNA52G28UV9IzT1f37s0VyxOIhWRPQCigH2qTt6fDLh3GH7ClBU1hXEUSwp9MVRW6XCUgeqI0aF8mR7Om0oSjVFzxQWqrUIQnwk4UUTyR7OgsOekFAC54buDkXxo8fR/dYvsyo2hQGYgoJ34Lgng4/ABbWu+arGNyUjWoRTQrn5zPBRL6nQxSLBvNA2Xy26MlB2HNP58ED7eksPpjZ3mG8AqLX0Z7O4rKZnQF4yVdmbQpLeRBFsOnq8FDrnMsNeIRPYVwkUzj0PAqXJZCygS1rBT6JbincMBzOPtylPZ0+xphauQnxnPgCmqDQ9dG62gieAAX0E8RT+FB9vE9iwY93/x2keNiqPYUxn/JFQQQ6EDgxG19Ap1aoVARaCMxnK19AactJqhYBI/DJMhKQkVDalQAX0KkZ+wKaz2tWqVQEagjMPRAW098CpIWdtmTwrUQ5EbhAYP4IzxrfA/E45YuCCDQQmNojPG3KApq7poYGVBU3gcJSpyygcdxs1PsOBN77NhKQT0P5NgJc/9QLCHNbCoMxooIIVBFIoZGxX1H2QKx76xsoLwIegbGXz7IQVDHAR/ExHr+SnVwv1ugocgKcvnbzWWqO4oIHgsEUtYdzC2VEYPZZsYOyeAjmggcyWpAb/vQhuW3HSqMm8BlC+aWKwAUP5BnhqwrJxDtWNk4CX9Dt3+q6XisgKI5T2R1EiaiOXvjlmXighbSuq6hrDpjKHCw4ne00W6o2MAImnsLOc7mPtR7IDHP10RMdW5nSoAnAZ2RP4b9i7BvFQwqtAqIRRYRIER0g8gIKYRLg2P6NSPGkK+kiruAQXyH+h8iv6SmGweAYYzlcVDQQ2nIBF3M4cx/xFiLzDEu3Nztdr2smwAelI8Q3GLjxMtfuZcBz5d7ADZiY9ko308t1Sm3qcHECKU7humaMyI/u8IuBFNHSYWUDC1E53BXjAJGCupZHh5RlfsRhY1jZfTZedTMq0/w2mU7zeIqUny79injCMgBMkfYersTAQGy+mJhnsDLmHV+88LOXZ9aVjv3Dct26+pz6N+Hlp8gz+oED7ZfZ4JtNmmcsTdCJeT6vUyICIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIiACIrAxBP4HtLBfcwuxz0sAAAAASUVORK5CYII=",
+    "favicon_hash": get_favicon_hash(youtube_favicon),
     "content_uri": "https://www.youtube.com/watch?v=anoV8E4ZZD8",
     "thumbnail_image_uri": "https://whoami-post-images.s3.us-east-2.amazonaws.com/default-post-images/youtube-post.jpg",
     "title": "Chill-out music",
@@ -41,7 +52,7 @@ image_post_data = {
 }
 web_page_post_data = {
     "source": "16personalities",
-    "b64_favicon": b"iVBORw0KGgoAAAANSUhEUgAAAMIAAADCCAMAAAAsP+0DAAAItmlUWHRYTUw6Y29tLmFkb2JlLnhtcAAAAAAAPD94cGFja2V0IGJlZ2luPSLvu78iIGlkPSJXNU0wTXBDZWhpSHpyZVN6TlRjemtjOWQiPz4KPHg6eG1wbWV0YSB4bWxuczp4PSJhZG9iZTpuczptZXRhLyIgeDp4bXB0az0iQWRvYmUgWE1QIENvcmUgNS42LWMxMzcgNzkuMTU5NTQ3LCAyMDE2LzA3LzA3LTExOjM5OjI0ICAgICAgICAiPgogPHJkZjpSREYgeG1sbnM6cmRmPSJodHRwOi8vd3d3LnczLm9yZy8xOTk5LzAyLzIyLXJkZi1zeW50YXgtbnMjIj4KICA8cmRmOkRlc2NyaXB0aW9uIHJkZjphYm91dD0iIgogICAgeG1sbnM6ZGM9Imh0dHA6Ly9wdXJsLm9yZy9kYy9lbGVtZW50cy8xLjEvIgogICAgeG1sbnM6SXB0YzR4bXBDb3JlPSJodHRwOi8vaXB0Yy5vcmcvc3RkL0lwdGM0eG1wQ29yZS8xLjAveG1sbnMvIgogICAgeG1sbnM6cGhvdG9zaG9wPSJodHRwOi8vbnMuYWRvYmUuY29tL3Bob3Rvc2hvcC8xLjAvIgogICAgeG1sbnM6eG1wUmlnaHRzPSJodHRwOi8vbnMuYWRvYmUuY29tL3hhcC8xLjAvcmlnaHRzLyIKICAgIHhtbG5zOnhtcD0iaHR0cDovL25zLmFkb2JlLmNvbS94YXAvMS4wLyIKICAgIHhtbG5zOnhtcE1NPSJodHRwOi8vbnMuYWRvYmUuY29tL3hhcC8xLjAvbW0vIgogICAgeG1sbnM6c3RFdnQ9Imh0dHA6Ly9ucy5hZG9iZS5jb20veGFwLzEuMC9zVHlwZS9SZXNvdXJjZUV2ZW50IyIKICAgcGhvdG9zaG9wOkNyZWRpdD0iTmV2ZXIgTm9ydGggTGFicyIKICAgeG1wUmlnaHRzOk1hcmtlZD0iVHJ1ZSIKICAgeG1wOk1ldGFkYXRhRGF0ZT0iMjAxNi0xMS0wMlQxNDoyMDoyN1oiCiAgIHhtcE1NOkluc3RhbmNlSUQ9InhtcC5paWQ6MmZhOGZjZDUtNTZmOC03NzQzLTg1MzItZDFjZTQzNDgyOGVhIgogICB4bXBNTTpEb2N1bWVudElEPSJ4bXAuZGlkOjJmYThmY2Q1LTU2ZjgtNzc0My04NTMyLWQxY2U0MzQ4MjhlYSIKICAgeG1wTU06T3JpZ2luYWxEb2N1bWVudElEPSJ4bXAuZGlkOjJmYThmY2Q1LTU2ZjgtNzc0My04NTMyLWQxY2U0MzQ4MjhlYSI+CiAgIDxkYzpjcmVhdG9yPgogICAgPHJkZjpTZXE+CiAgICAgPHJkZjpsaT5ORVJJUyBBbmFseXRpY3MgTGltaXRlZDwvcmRmOmxpPgogICAgPC9yZGY6U2VxPgogICA8L2RjOmNyZWF0b3I+CiAgIDxkYzpzdWJqZWN0PgogICAgPHJkZjpCYWc+CiAgICAgPHJkZjpsaT4xNlBlcnNvbmFsaXRpZXM8L3JkZjpsaT4KICAgICA8cmRmOmxpPnBlcnNvbmFsaXR5PC9yZGY6bGk+CiAgICAgPHJkZjpsaT5wZXJzb25hbGl0eSB0eXBlczwvcmRmOmxpPgogICAgIDxyZGY6bGk+cGVyc29uYWxpdHkgdGVzdDwvcmRmOmxpPgogICAgIDxyZGY6bGk+TkVSSVM8L3JkZjpsaT4KICAgICA8cmRmOmxpPnBzeWNob2xvZ3k8L3JkZjpsaT4KICAgICA8cmRmOmxpPnR5cG9sb2d5PC9yZGY6bGk+CiAgICAgPHJkZjpsaT5mcmVlIHBlcnNvbmFsaXR5IHRlc3Q8L3JkZjpsaT4KICAgIDwvcmRmOkJhZz4KICAgPC9kYzpzdWJqZWN0PgogICA8ZGM6cmlnaHRzPgogICAgPHJkZjpBbHQ+CiAgICAgPHJkZjpsaSB4bWw6bGFuZz0ieC1kZWZhdWx0Ij7CqSBORVJJUyBBbmFseXRpY3MgTGltaXRlZDwvcmRmOmxpPgogICAgPC9yZGY6QWx0PgogICA8L2RjOnJpZ2h0cz4KICAgPElwdGM0eG1wQ29yZTpDcmVhdG9yQ29udGFjdEluZm8KICAgIElwdGM0eG1wQ29yZTpDaUFkckV4dGFkcj0iNiBOZXcgU3RyZWV0IFNxdWFyZSIKICAgIElwdGM0eG1wQ29yZTpDaUFkckNpdHk9IkxvbmRvbiIKICAgIElwdGM0eG1wQ29yZTpDaUFkclBjb2RlPSJFQzRBIDNESiIKICAgIElwdGM0eG1wQ29yZTpDaUFkckN0cnk9IlVuaXRlZCBLaW5nZG9tIgogICAgSXB0YzR4bXBDb3JlOkNpVXJsV29yaz0iaHR0cHM6Ly93d3cuMTZwZXJzb25hbGl0aWVzLmNvbSIvPgogICA8eG1wTU06SGlzdG9yeT4KICAgIDxyZGY6U2VxPgogICAgIDxyZGY6bGkKICAgICAgc3RFdnQ6YWN0aW9uPSJzYXZlZCIKICAgICAgc3RFdnQ6aW5zdGFuY2VJRD0ieG1wLmlpZDoyZmE4ZmNkNS01NmY4LTc3NDMtODUzMi1kMWNlNDM0ODI4ZWEiCiAgICAgIHN0RXZ0OndoZW49IjIwMTYtMTEtMDJUMTQ6MjA6MjdaIgogICAgICBzdEV2dDpzb2Z0d2FyZUFnZW50PSJBZG9iZSBCcmlkZ2UgQ0MgMjAxNyAoV2luZG93cykiCiAgICAgIHN0RXZ0OmNoYW5nZWQ9Ii9tZXRhZGF0YSIvPgogICAgPC9yZGY6U2VxPgogICA8L3htcE1NOkhpc3Rvcnk+CiAgPC9yZGY6RGVzY3JpcHRpb24+CiA8L3JkZjpSREY+CjwveDp4bXBtZXRhPgo8P3hwYWNrZXQgZW5kPSJyIj8+/vrmFgAAAARnQU1BAACxjwv8YQUAAAABc1JHQgCuzhzpAAAACXBIWXMAAA7BAAAOwQG4kWvtAAADAFBMVEVMaXFHqKhvRlltiVDiwxtvQ1hFpaZ2h1lfgGtWhHt1TGBsi05Jqarjxh10j1bkxh5KqKpxSF3kyCHjxyBwRllOrK11TGBMqqp1kFfoyyZxRVt2TGBOrK10kFdySFzt0CjnyiXnyiZMqqtNrK52TGBzSl5vjVJ0j1Z1TGB2TGF2TGFNrK3kxyHkxyJNq6xzSF1KqKp2TGHoyyROra7myiR1TGBzjlVPr7BMqqvrzid1S19Nq6zoyyVwjFJMqqt1kFfkyCN3k1lMq6zoyybpzCbixiB1S2BKqap0Sl5LqapJqalOrq91TGBzj1ZOra5yR1zkxyLkyCPmySTmyiTpzCZzSV1yjVRzj1ZzjlVNrK1zSV1xjVR0j1Zvi1J1S192kllMq6zmyiTlySV0kFdzjVV0j1Z3k1pxjVVwjFN4TWJxjFNLqapNq6znyiVzSl5Nq6x0j1ZNq61xjFRMqqt0j1ZPr7BMqqtNq610S1/oyyXrzifnyiXqzSflySTmyiTmyiV0j1Z0jlZNrK11S2BNq61yjlVLqap1S19vi1F0Sl/myiVIqapzjlVNqqxzjlVzSV5xjVTmySNNrK10S191S19ySF1zjlVzjlV1kVhvilB3TWHszyfmyiVzR13lyCRzSV1xjVR1TGBzSV7nyiR0j1fnyiXlySV1Sl9LqarkxyPnyiROrq/nyyVzSl5zj1ZxjVTlyCN1S2BPr690j1Z0Sl51kVh0j1bkyCNNrK3lySNzjVV0S190j1ZQsLFvi1LjxyNOra50Sl90Sl9zSl5NqqxQsbJzSV5zj1ZyjlV0j1Z2kllNq6x0S19zj1blyCTrzyZ1kVfrzyfnyiTlySJ3TGByjVTkyCJ0j1Z0j1Z0kFdNq6zkxyPlySR2TGHkyCPnyiN2kllzj1VzjlVPsLF3lFpPsLF3k1royyTlySNzjVR3lFt2klqVb0xubVVzfVeLmUt1TGB0j1dOq6zlySdOrK3nyyfpzCd1kFdPrq92TGF2TGB1kVhzjlZ3TWJNqqt2klk56XGKAAAA8HRSTlMACwgIAgUGAQMC+wYRBfoJHhsWDQ3390D2+BLY/O0h/a70ToLpZBSj3+T1shsi0DAa7l/vlKlS/Fb7l5PXHUfiPvN8/eoRrihdORTKom3zFihDZGnNNj24XtkrKb8Mkvpxdv7xWOnoOiz6GySivmuJxuwlX5H2Z+WLtuDg8Huc7p3bu83gZjKcD3rJF0G4TEc1VMPBtEB0iP0R8fHTJ3BEILpKpczEj4QtOILn51PXMDP903tPlqpGm1tF0t7dGDCYcn9ZrNY70EmwsaTJg0+N29uKLMdHLn7T1adMh9NJLtKAgaDFp/2GS0PN/hwQTkL/83IVAAATKElEQVR42uyaS0gb2x/HjRgnkQSjMYZosJoomESjMYrRiEisb4nvhS6KdSe+EPFdFWxQqkjR1o1XLbb0VqsFKwUtF6la7Ua55bblLmztXfy5/LchmUgiWP5ja3XOJJlzTBOb/vG7PZPMfOb83md8fK50pStd6UpXutKVrnSl/39hLJY/i+36+k8XmyPskEp1bfP+jtdZo5m1xLqGx/JWAn/h2oo+1Yq3TugSMUfrku1qgdUq7lR0FHonAUujNOGmE+GC7Xn7dUZt57d1HG/VNnilG0iqTWcS7/Ps9qCj9Xxdrx31QoTEMfH5I5oEOgbFTwqK8PNlfLHNC/2hjfSSCSkppsSR6snL4jHv2wZGI0BgateAsZM3iJOX8U6hF9oR8IimVIolFaxYAQR1h9elB94YuAupFIe1Q6j1foQWzq+GwNmm+EIHmKLni0CEVslPzcKcwkIOtYbAdAIAgequhWupAIKSmtxYDOJfGZeyNYyhWq1ie6NjnhL4h5Rkf8YbEyncmnXyul4K/pzNk7TsKxpbMhM9DoHxaosWBbhJsFhUCz6kv05NIqgWUqukUS1pm6wTQ5Tyan9dLzaJ9eu7Qn8PIzSsqa04flLn4GotyJC4of7+nnFDh33ynVd8Z8DFRRIWWAAqxSf/SvxtqlLjWQbiVZ6bg4BiDDzpaZUkGHT4GHnazm/rrftCgADLJBkhrszEPFpFdJq+nN3si0ECGi5DKB1TKot2O/IcF0CFkhZifWJDQ6nFebvkaNXeyPHkJuyTSzmTdY16MwYvL69h1HkF93WdQ3nLmGYRCFYGT8bbIQMQOPGiIbeklJZ24G/FLR60JCEY+4n35Y6b8RqBlGGyNjI8iQDWcq1tHkHYHr3EXdD8crtQ0EnxhYJfzhd4CsCQrP9xT/hrU4PdkMaT5UVHK5mhU+OeBjhPQc4LqQqeR3uzXVJiELS4KQexJDvnDPiKxLOV3pBCb/02DLLqGxvgNosRQqh+O9bPaqTqNoZHCXyw+ZZqvdhqFatXpLD99ufw8oSEhhoSOZAXy9GMEfWvFRcsKjI9TEAwcITS7aIiha6A/lZY4VCbdmJnZ319fadIIc1soL+clUdcvTKxpuFdStPjT/RXDEhFXChZM+gJ4ziVQD1RO0T/ExaDQ3RtXjMg889sBAdjJ9FeqcvDfsrTsJisC9+Yp6vGTfYSDEou3M34cbk/xs0sqcpvjnkT5HuRH7GHdvUmh8J3ai9U/fgFvx+vKF+N57vuuSWvUw5k0bKDuZgg9FfBKlC0444RTNZFXSL6/fll/ZU9S0t/Pe77m+siwkxXbIDtRM+jixOQA8W8ItUZwclEW4ecDnMqMkQWQofZvzV9DHSJIKi43vhdAfdnEPdhtFFsohFu6ED0B35Fj8V8Ksv0Rz8XCHw3VcZzhT4JQYtFlImYPYMScaT9MePQfKbs7vcuICTs2UgIxoNJlG1gZRroCUxfxLtIB21x/dlmkqL6XNiGGDmZwBiwxUQpA/dNUKmRDnjKMixkhMPI4AsThNwIABCOhxEsiaXphCN8GUSJrEm/mQGEkYULI4QVUxBSghD6rw0cjmBqlcC3gTsLIlimyy4HoQCcwDvTGuNSEHy7KAjFYfC83KFHIcAn8uD3f0k1pOWLu3M+xZ2fwN2Zo01FQjAgWFLW9A+7s0/NvSMgqD6AB1WwB3YugQ6e3oKT08h2dL3ChaDKbI4mMchRUluBEg0B18KdASsjp7a0yHiXCowbU2fJTT4cgfCLzGocCcG6gdBcBlb0nDGkNZW5VuhFPAmv/1rmBUSnoxD4ZBoQEf5FqVdzkipFlsPDQ0v2re4sV0vVkhcp4bGy2PDcfLRiW9KJiIA2KQpc+L2yt6ent2m21M/HVbFLaibvTtaUMNEuRzakf9G+R8L48VmrqwtxgT6XJrf6ws8R8L0OXURq8fdWhMRdtKCqrvVaBH8pWnbeEWLeioC1LaJYEj7I8/Fa5Q2iWJKgheG9CAypAKHlMRR48ce2mHAFbklijx6NX8o2GDz/VR4rqCYhISLERW+Y+ALzBKlrnuAX/M/yq3ikRB0RMzy3t5f75IFLENABgFgx7xJAfFLy45HHkTfhBR/zQa6q/vjoKKA+fCsCc8mU1LQBtcilnMAfj7yeZrFY0kSVN+MgBA9vH5+2CLapG7QVNsbyJcS0Cy6JWrVzl7Yq7XpOjBsYGMjl+tH3Dmf9jyXqLT1D1QfSCE91x2nHzw4pqXkY09zcnD8ZEeZL+TSHhkFJOWHw4wcvj1cQepkVl8OlaaRJHdytWTqHKEmvB4eQTvYq4ln6nix6Sj4lV0XHzm1NlgB7UVjrqGIl3FwwVgDsQWDpy/7KpYEoQgNL05EVr3IcGxn/ETDNqKSbir05AKYW8i5HLs2u2dyTkyc0AdEpr4Ehk79QobZL07i4Gjwj5Zd9mo6qO3+yOlFv/58O5xRZ4HAy7abzbWDGyIBRsO1eiYOWuvkeOJ75BvGQfBKE8WrH9MAxgzXVsAEcx2LxnzJEZoqyl/oXHDjFbBQ4FnvkfBYQ0iUHBi+2gxo7yqphlc1or4DwO8BGsPLaNqrV7e0nh57i9vbFCWlmIdlKAj93iyxme2WPlOfYPdc78BrL47+dIwyHAs9lC6+izvhe3AMpz69Vpc8AHsEeLdDotGODg2Pb2trMIQa1tU8zO9RhT59dxPmdAjvyyvkQcksF7sJtSlhlvtizGZ3IFlpcQ/FGNqOwgRCvkNrh8G/2ZpudyHI9meoQn+oou+D8vIT1WgYgPL9PiaqTt400Ci2OQEtUgeW9FrNTWQb6KLaUtAQwpCXTDCdrPgAvWbUJnNZiM3NGWqmehCEhfM6gISC0VA6miNIR4HpREk0eDLkzRTaNuQRwXk85NbGXLB/lACeuu46WwFw3DY6xuU/JIemwu5S2xkufOjel8GfA/IiZL4MQEFE4AU7A7YsyQ1T3CDSV+Mjz+GvJ+JO2GGHPpKtsX43JVn+QDya2iNxjGIJRvgX9UABbyDBDdX2cC/4m8tbhV2M6zK4shxTcWMSdD6rnx8ehscUPwadhxciOoAjG8BmoL/9XBEewUI4TuKVPKwfSrl2LynhUBv+cwTehuSs9fetFGKUGLSmGbwIRlWJg3lD62Iygv8oo1hK4PJucnNy3GoxWqzv8GO1huA0BwZgL6ZT8ygdQEETv+GiPdRFtylEIjOEJ9Pfhv7WgIFi649zeUYfdqEdCUEHiamn3IRLCdJnbJ341c0h2ZAzoYl7kGNApwlKSn7sR3vxhRFMxfVgdv25GUtRNrrsRHsSiEdggCElpaAjX3rkd4UU0IkIKfUgqv4aI8NbtCM9UiAi5Yd6KcPeyDcn9CMjuPAxx5wE0BFGf2xES7qEF1eeQoFqWgRhUy90eVEuGEVNbDD3C+yY0hIzPbk9trDtoBUbsG/pb5/SjZeemeB+365kMCWEOVubNRiH5QjL/R953xJu7kwl2T4LS8RDF9ibsS4HlERSCnnGqN3PjFlazSlHA2Alb9/+Qxe4NP6PEd+bmFIodQTvPwOQ6BARqoeq3/DRyujejKXkcekjim7932uPL0mvYlEIPvg2hXfDGc7UXTnCLMsPIKa887fWWkiFVeEjMmcUfyXPBD7WZMdAa4+h2FcIU6R2086yLjKOOzs6CgOgRraOz7h6Qor/8BjgVDkqBDGGOoptRvpkpHcmGIPSughs33ksKY6KndA4RBAT/o9iHoJtU3YbML9KDUOKF38te+tww0AcafHCkBeyraf58EuyPQ9PBuMT+X3vXH9JkGseHS95XRwstYhrrFHQrUSKxgXHjbVjRHzeqq7bRpmJubg2KMfZHP9QmhzRDpqHNGVeOsuLC3IXpoYlxCKmRYVFpXEcqcVfXXy+hL6ZxN8t0z7N37/vsbfPeO/z++7r33ef9/v58v3vsZyyUEhu3oMW8XSVtTBjSYXP/DYT8DYMa4o9nABA+PIXeatxxBgy3Gy7Q9JxYAk2qS65oY0BQCRt7SQrE0DDMF7bD5PzhEHffEM4f1jcegmgboUypeWasdvdYrC4c1sOpMHqYKs/LYZsvnHseAYQQy4ira8yiq/dmMorAGa/I5x7WVplM0lKpiRiQV9fLgMtruw8W0IGYelySjX3NfKEGni+Euid+6caG2zCIj1kNmXuDn4zr1UMmlZhaEFKsGutUyIDQ+lNl2zQMYvpM2hsaO78JzReOheeFsTubAAiJdB0Ytq6u6PesQOT6hOPDzMzM0YsNNVuCoykm02ml3sA3DxKquNdhFgEO0X31dH7B1CKMgvydaZdz6ErsXLDHyH+yi4HYBpmWcGE+teXX7zZkbM0KyMWtmx9uz9wC5GRc7yD+JkOEktiqm4GXkf3o5snT5eXpKSkp5eWnrj3pzqHvEXKuAeoqP89QDMdlbgaC5OGwsSvp/p3ME0VFRTWZV7akgnfENQ9UJK3MEpNWKFPv29F9+cn169crcve/CvtuV5UEq6HgKmOJsfdEUFdwt45x9SlhXUDiQv4E1xiKyTBCSR3WkO+3em1A1jD2aNmV6e8X/eHcDuass/HEQiE0k/jwDuKGLegqGoM3HAJyjpQ2Wbk0ADl5bZ9LjKmUY7+wdaSpe7ZtPnr0aNYPNw5x+tWrTxsewSc9dBRyuW1yblrb/Hzh2s2f2XtqPKmuf8+eW4e47VQVOsQko1BVbk43XpXzpjs39/y9r2nm0Do+hYlkEa/WJ+CzWIcoNgikpBrnMQJcx6qEgE8blDyG0CdnVwJJSnUi/kLoeYECYU5eyF87UheTKNLq5y0EWecfSBAII28d2qKdRYIg6eCtM2gGKCQIsw7h8n0pLJ52FzWcN1ehQXjXiejPn3dYv4alx9ZdqNnWuO1GSyoaUT5IkGha6EKr9dbcu1x5Mi0vN4cziIT72zavvx1o7DMaW5CKVrcJEcIDlOSGZd88nX7k/ZEjZ+hWDtF00PI0cXH/MTMumobkdCE8/l7aIo3f9ie3dYb7DUF8y6YrCHqobY+iL2RXBq1R7azgUqHuPZsIzGIRVgfrDWhBVTzMHlRXHwheE5jmNLeqA6c6m/rZ05FV/g4JghShVoXWTfLzIh+AxteAtNhH9smBQDSKlJ2pF7Xsr/QRSFlOc5i9rdse+fEFmNGE5AwPZOzP/x46vuDgjoghcDqBwf4AxRkkHvbkvLoEOr7gRw4QznKAIOyQINTaVX4sYi1Mc9BCiC8UofABltfsliRuQqmQQnxhX+QR6Qo4WcvIREnQQg+7GtqRuoXnx4CIVFDJ4XfbG4HJ2ofGS0ifUhrmWMKR1INUaYPOMPX4EZd9hpa7QFpApPYGq1jMSI7Y/O9LCxoqlr/kxB/F928I4rhRTzwTqgmSSREG1KYT23FskUZNf5ks4CTxdbu3zh8Wlnix4Rb6mW0uNRHepSlbLbJBrHqV15YS0ERByreXOSKY5ybvFO3evXt7/8ZICGKXeiQMrUqJtZpIuuZd+yuupqVdPfDqa45gwFOTkpJSI2S4XbrXXorWk53+yPr+VWuTs7OTl/EMiSV/MDuJEBBeic1jFfBFcJztnzTJjHKieGnaRpFeVetEPXM0xQK3XZ5jDTCh3W00PvMJmR/Xp2iySSVisXhOLJZIeuVqFgC4zGw0Gv2uZfhNvajeMU6YTERrk4XFroU+s27S0aV1NnncFhmb2qoNvSaTqWpI0RxrBIXVYwszEPEYO7ubIBS6mguF7OlYLy/90g51WmJL9Yl0QQGTUERL63b50mxIIrfHFIIZ4OsM/ui4X/OkJDj0TsSS6ytsAiZpktHoPKz2RXCnNNtaH0MI+laI0oqKzkUeFbgl0BFL3lcC9fE90bir1QmOJbzOGDp0LTSRNemi4QxKeTFEucr++xD6YmhIpZAhPYsGhL5O2JBiGJL0NsidfSF1QqGLsfIIXBfB13E16M5S9XIGVSjvNvsVngl1jz1cOpbVKzyjOo0VSom148sXVAXm1qDURhksYHD0D4+VqVSqMm21kr4Gd4x8ui53g4WQa1QFLJrEdIyVYKxa7IznBgaB4CdSGIqphdbASZMwhMYXC9X3O2IC7Bx8zqVoLXHEuKsQKWxfyjzbM9AeascoJp5CpAiaq0uHwbhpd0gXdGBqivl6A+4fNZSVlRE2jx5MQLIhwE3UsD9YbEsI5ihCB366WdE1ErjtiHzQJYi9FCrN7sF6HzyoATdIKJse+lQHEHbEQ1Dsx/v0b91v7bJlGqpjNH2n0AlmPRVUiSu14M4nYQ51tH/5fw73aUEIxaOgRfj/mgWDv453x/8pIQjeTtBSNOPg6KHUk8B3CMUOMOaYx0FDKlXzDkLzEARBDSYoPTh5oEwKviEQYGDtQZa9hXxFDrCUVLuFdxAEGoCVn5VDQVNkLAPyhsPFPwjCydIlU6FGBhlLaq/NLOCh2LsWMVCEOmRFAdN3SRauU95WhZCPEBL0Tb2ff3QhGaim4+QschP56brUwE8E80WE22lr7x0zDFtoGwZMputqbe8d0Kp9PD6NFFeae+qbw+ddoV3TY3FhghVZkRVZkRVZkRX5X8s/S/znepwxGwAAAAAASUVORK5CYII=",
+    "favicon_hash": get_favicon_hash(web_page_favicon),
     "content_uri": "https://www.16personalities.com/entj-personality",
     "thumbnail_image_uri": "https://whoami-post-images.s3.us-east-2.amazonaws.com/default-post-images/web-page-post.jpeg",
     "title": "MBTI - ENTJ",
@@ -54,9 +65,49 @@ web_page_post_data = {
 }
 
 
-def get_default_posts():
-    return [
-        deepcopy(youtube_post_data),
-        deepcopy(image_post_data),
-        deepcopy(web_page_post_data),
-    ]
+default_posts = (youtube_post_data, image_post_data, web_page_post_data)
+default_favicons = (youtube_favicon, web_page_favicon)
+
+# Built once at import time. Signups only bind the new user's ID as :id.
+DEFAULT_POST_COLUMNS = (
+    "source",
+    "favicon_hash",
+    "content_uri",
+    "thumbnail_image_uri",
+    "title",
+    "description",
+    "x",
+    "y",
+    "width",
+    "height",
+    "scale",
+)
+_post_columns = [
+    column for column in DEFAULT_POST_COLUMNS if column not in LAYOUT_COLUMNS
+]
+
+
+def _to_value_statement(columns) -> str:
+    # A post and its post_layout refer to the post's ID generated up front
+    return ", ".join(
+        f"((SELECT id FROM default_post_id WHERE i = {i}), :id, "
+        f"{to_ref_csv([f'{column}_{i}' for column in columns])})"
+        for i in range(len(default_posts))
+    )
+
+
+default_posts_statement = f"""
+default_post_id AS (
+    SELECT i, uuid_generate_v4() AS id
+    FROM generate_series(0, {len(default_posts) - 1}) AS i
+),
+new_post AS (
+    INSERT INTO post (id, user_id, {to_csv(_post_columns)})
+    VALUES {_to_value_statement(_post_columns)}
+),
+new_post_layout AS (
+    INSERT INTO post_layout (post_id, user_id, {to_csv(LAYOUT_COLUMNS)})
+    VALUES {_to_value_statement(LAYOUT_COLUMNS)}
+)
+"""
+default_posts_values = to_multi_row_values(DEFAULT_POST_COLUMNS, default_posts)
@@ -8,7 +8,11 @@ from whoami_back.api.utils.endpoint_helpers import deprecated_endpoint
 from whoami_back.api.v1.notifications.resources.actions import actions_data
 from whoami_back.api.v1.users.commands import get_current_active_user
 from whoami_back.api.v2.posts import base_url, commands
-from whoami_back.api.v2.posts.models import PostResponse
+from whoami_back.api.v2.posts.models import (
+    PostResponse,
+    UpdatePostLayoutsRequest,
+    UpdatePostLayoutsResponse,
+)
 
 # from whoami_back.utils.config import TASK_QUEUE_HOST
 from whoami_back.utils.models import exclude_unset, nullify_text_columns
@@ -18,6 +22,28 @@ POPULATE_NOTIFICATION_ENDPOINT = "/api/tasks/populate-notifications"
 SHARED_A_NEW_POST_ACTION_ID = actions_data[3]["id_3"]
 
 
+@router.patch("/layout", response_model=UpdatePostLayoutsResponse)
+async def update_post_layouts(
+    update_post_layouts_data: UpdatePostLayoutsRequest,
+    buffered: bool = False,
+    *,
+    user: Dict = Depends(get_current_active_user),
+):
+    """
+    Move and resize many posts at once, e.g. after the board was rearranged. Posts
+    the user has no post with are returned in not_found.
+
+    With buffered, e.g. while a tile is being dragged, the layouts may be written
+    a moment later together with the following ones. The last update of a drag
+    should be sent without it.
+    """
+    return await commands.update_post_layouts(
+        user["id"],
+        [layout.dict() for layout in update_post_layouts_data.posts],
+        buffered=buffered,
+    )
+
+
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: str,
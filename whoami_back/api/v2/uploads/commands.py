@@ -0,0 +1,251 @@
+from typing import AsyncIterable, Dict, Optional
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+
+from whoami_back.api.v1.board import commands as board_commands
+from whoami_back.api.v1.board.models import BoardBackgroundImageFittingMode
+from whoami_back.api.v1.user_profile import commands as user_profile_commands
+from whoami_back.api.v2.posts import commands as post_commands
+from whoami_back.api.v2.uploads.models import UploadTarget
+from whoami_back.utils.config import (
+    BOARD_IMAGES_S3_BUCKET,
+    POST_IMAGES_S3_BUCKET,
+    PROFILE_IMAGES_S3_BUCKET,
+    UPLOAD_INTENT_EXPIRES_IN_SECONDS,
+    UPLOAD_MAX_SIZE_IN_BYTES,
+)
+from whoami_back.utils.db import database
+from whoami_back.utils.s3 import get_s3_object_uri, storage
+from whoami_back.utils.storage import ObjectTooLargeError
+from whoami_back.utils.storage_gc import enqueue_object_deletion
+from whoami_back.utils.stored_objects import is_object_known, register_object
+
+UPLOAD_BUCKETS = {
+    UploadTarget.POST_IMAGE: POST_IMAGES_S3_BUCKET,
+    UploadTarget.PROFILE_IMAGE: PROFILE_IMAGES_S3_BUCKET,
+    UploadTarget.PROFILE_BACKGROUND: PROFILE_IMAGES_S3_BUCKET,
+    UploadTarget.BOARD_BACKGROUND: BOARD_IMAGES_S3_BUCKET,
+}
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+    except ValueError:
+        return False
+
+    return True
+
+
+async def _get_object_key_prefix(
+    user_id: str, target: UploadTarget, post_id: Optional[str]
+) -> str:
+    """
+    Return the prefix of the object keys the user may upload to for the target.
+    Same layout as the images uploaded through the API.
+    """
+    if target == UploadTarget.POST_IMAGE:
+        query = """
+SELECT EXISTS (SELECT 1 FROM post WHERE user_id = :user_id AND id = :post_id)
+        """
+        values = {"user_id": user_id, "post_id": post_id}
+
+        if not (
+            post_id
+            and _is_uuid(post_id)
+            and await database.execute(query=query, values=values)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+            )
+
+        return f"{user_id}/{post_id}/"
+    elif target == UploadTarget.PROFILE_IMAGE:
+        return f"profile_image/{user_id}/"
+    elif target == UploadTarget.PROFILE_BACKGROUND:
+        return f"profile_background/{user_id}/"
+    else:
+        return f"background_image/{user_id}/"
+
+
+async def create_upload_intent(
+    user_id: str, target: UploadTarget, *, post_id: Optional[str] = None
+) -> Dict:
+    key_prefix = await _get_object_key_prefix(user_id, target, post_id)
+    key = f"{key_prefix}{uuid4()}"
+    upload_intent = storage.create_upload_intent(
+        UPLOAD_BUCKETS[target],
+        key,
+        max_size=UPLOAD_MAX_SIZE_IN_BYTES,
+        expires_in=UPLOAD_INTENT_EXPIRES_IN_SECONDS,
+    )
+
+    return {**upload_intent, "key": key, "max_size": UPLOAD_MAX_SIZE_IN_BYTES}
+
+
+async def finalize_upload(
+    user_id: str,
+    target: UploadTarget,
+    key: str,
+    *,
+    post_id: Optional[str] = None,
+    background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = None,
+) -> str:
+    """
+    Attach an object uploaded through an upload intent to the post, profile or
+    board, and return its URI.
+    """
+    key_prefix = await _get_object_key_prefix(user_id, target, post_id)
+
+    # Only keys handed out by create_upload_intent are accepted
+    if not (key.startswith(key_prefix) and _is_uuid(key[len(key_prefix) :])):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The key was not issued for this upload target",
+        )
+
+    bucket = UPLOAD_BUCKETS[target]
+
+    size = await storage.get_size(bucket, key)
+
+    if not size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The object has not been uploaded",
+        )
+
+    # Finalizing twice would attach the object again and release it as the image
+    # it replaces
+    if await is_object_known(bucket, key):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The object is already attached",
+        )
+
+    # Checked by S3 on upload, so the object never passes through here
+    sha256 = await storage.get_sha256(bucket, key)
+
+    if not sha256:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The object was uploaded without a SHA-256 checksum",
+        )
+
+    # Takes the reference the attached image holds, or one to the object with the
+    # same content. Neither is kept if the image cannot be attached, e.g. to a
+    # board without a fitting mode.
+    async with database.transaction():
+        key = await register_object(bucket, key, sha256, size)
+        await _attach_upload(
+            user_id,
+            target,
+            key,
+            post_id=post_id,
+            background_image_fitting_mode=background_image_fitting_mode,
+        )
+
+    return get_s3_object_uri(bucket, key)
+
+
+async def stream_upload(
+    user_id: str,
+    target: UploadTarget,
+    chunks: AsyncIterable[bytes],
+    *,
+    content_type: Optional[str],
+    content_length: Optional[int],
+    post_id: Optional[str] = None,
+    background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = None,
+) -> Dict:
+    """
+    Store the image in the request body while it is still arriving, attach it to
+    the post, profile or board, and return its URI, size and SHA-256 digest.
+    """
+    if not (content_type or "").startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Only images can be uploaded",
+        )
+
+    # Reject what is too large up front when the client says so
+    if content_length is not None and content_length > UPLOAD_MAX_SIZE_IN_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"The image exceeds {UPLOAD_MAX_SIZE_IN_BYTES} bytes",
+        )
+
+    key_prefix = await _get_object_key_prefix(user_id, target, post_id)
+    key = f"{key_prefix}{uuid4()}"
+    bucket = UPLOAD_BUCKETS[target]
+
+    try:
+        size, sha256 = await storage.upload_stream(
+            bucket,
+            key,
+            chunks,
+            max_size=UPLOAD_MAX_SIZE_IN_BYTES,
+            content_type=content_type,
+        )
+    except ObjectTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"The image exceeds {UPLOAD_MAX_SIZE_IN_BYTES} bytes",
+        )
+
+    if not size:
+        await storage.delete(bucket, key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="The image is empty"
+        )
+
+    # The hash is only known once the body has arrived, so a duplicate is stored
+    # and then dropped in favor of the object it duplicates
+    try:
+        async with database.transaction():
+            stored_key = await register_object(bucket, key, sha256, size)
+            await _attach_upload(
+                user_id,
+                target,
+                stored_key,
+                post_id=post_id,
+                background_image_fitting_mode=background_image_fitting_mode,
+            )
+    except Exception:
+        # Nothing refers to the uploaded object
+        await enqueue_object_deletion([(bucket, key)])
+        raise
+
+    return {
+        "uri": get_s3_object_uri(bucket, stored_key),
+        "size": size,
+        "sha256": sha256,
+    }
+
+
+async def _attach_upload(
+    user_id: str,
+    target: UploadTarget,
+    key: str,
+    *,
+    post_id: Optional[str],
+    background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode],
+) -> None:
+    if target == UploadTarget.POST_IMAGE:
+        await post_commands.update_post(
+            user_id, post_id, {"post_image_s3_object_key": key}
+        )
+    elif target == UploadTarget.PROFILE_IMAGE:
+        await user_profile_commands.edit_user_profile(
+            user_id, profile_image_s3_object_key=key
+        )
+    elif target == UploadTarget.PROFILE_BACKGROUND:
+        await user_profile_commands.edit_user_profile(
+            user_id, profile_background_s3_object_key=key
+        )
+    else:
+        await board_commands.update_board_background(
+            user_id,
+            background_image_s3_object_key=key,
+            background_image_fitting_mode=background_image_fitting_mode,
+        )
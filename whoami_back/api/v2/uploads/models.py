@@ -0,0 +1,44 @@
+from enum import Enum
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from whoami_back.api.v1.board.models import BoardBackgroundImageFittingMode
+
+
+class UploadTarget(str, Enum):
+    POST_IMAGE = "post_image"
+    PROFILE_IMAGE = "profile_image"
+    PROFILE_BACKGROUND = "profile_background"
+    BOARD_BACKGROUND = "board_background"
+
+
+class UploadIntentModel(BaseModel):
+    target: UploadTarget = Field(..., example="post_image")
+    # Required for post_image
+    post_id: Optional[str] = Field(example="some uuid")
+
+
+class UploadIntentResponse(BaseModel):
+    # Form fields go before the file in a multipart POST to url
+    url: str = Field(..., example="https://whoami-post-images.s3.amazonaws.com/")
+    fields: Dict[str, str] = Field(..., example={"key": "some key"})
+    key: str = Field(..., example="some key")
+    max_size: int = Field(..., example=10485760)
+
+
+class StreamUploadResponse(BaseModel):
+    uri: str = Field(..., example="https://whoami-post-images.s3.amazonaws.com/key")
+    size: int = Field(..., example=1048576)
+    sha256: str = Field(..., example="some hex digest")
+
+
+class FinalizeUploadModel(BaseModel):
+    target: UploadTarget = Field(..., example="post_image")
+    key: str = Field(..., example="some key")
+    # Required for post_image
+    post_id: Optional[str] = Field(example="some uuid")
+    # Required for board_background unless the board already has one
+    background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = Field(
+        example="fill"
+    )
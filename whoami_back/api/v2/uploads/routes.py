@@ -0,0 +1,97 @@
+from typing import Dict, Optional
+
+from asyncpg.exceptions import CheckViolationError
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from whoami_back.api.v1.board.models import BoardBackgroundImageFittingMode
+from whoami_back.api.v1.users.commands import get_current_active_user
+from whoami_back.api.v2.uploads import base_url, commands
+from whoami_back.api.v2.uploads.models import (
+    FinalizeUploadModel,
+    StreamUploadResponse,
+    UploadIntentModel,
+    UploadIntentResponse,
+    UploadTarget,
+)
+
+router = APIRouter(prefix=base_url, tags=["uploads"])
+
+
+@router.post("", response_model=UploadIntentResponse)
+async def create_upload_intent(
+    upload_intent_data: UploadIntentModel,
+    *,
+    user: Dict = Depends(get_current_active_user),
+):
+    """
+    Return a presigned POST with which the client uploads an image straight to S3.
+    Besides the returned fields, the form carries the Content-Type of the image
+    and its base64 SHA-256 digest as x-amz-checksum-sha256. Once the upload
+    succeeds, call /finalize with the returned key to attach the
+    image to the post, profile or board.
+    """
+    return await commands.create_upload_intent(
+        user["id"], upload_intent_data.target, post_id=upload_intent_data.post_id
+    )
+
+
+@router.post("/finalize")
+async def finalize_upload(
+    finalize_upload_data: FinalizeUploadModel,
+    *,
+    user: Dict = Depends(get_current_active_user),
+):
+    try:
+        uri = await commands.finalize_upload(
+            user["id"],
+            finalize_upload_data.target,
+            finalize_upload_data.key,
+            post_id=finalize_upload_data.post_id,
+            background_image_fitting_mode=(
+                finalize_upload_data.background_image_fitting_mode
+            ),
+        )
+    except CheckViolationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return {"uri": uri}
+
+
+@router.put("/{target}", response_model=StreamUploadResponse)
+async def stream_upload(
+    target: UploadTarget,
+    request: Request,
+    *,
+    post_id: Optional[str] = None,
+    background_image_fitting_mode: Optional[BoardBackgroundImageFittingMode] = None,
+    user: Dict = Depends(get_current_active_user),
+):
+    """
+    Upload the image in the raw request body, with its type as Content-Type, and
+    attach it to the post, profile or board. The body is streamed to storage as it
+    arrives instead of being buffered first.
+    """
+    content_length = request.headers.get("content-length")
+
+    try:
+        return await commands.stream_upload(
+            user["id"],
+            target,
+            request.stream(),
+            content_type=request.headers.get("content-type"),
+            content_length=int(content_length) if content_length else None,
+            post_id=post_id,
+            background_image_fitting_mode=background_image_fitting_mode,
+        )
+    except CheckViolationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+def add_router(app):
+    app.include_router(router)
@@ -46,7 +46,7 @@ async def authenticate_user(login_credential: Dict):
                 detail="Account locked due to too many failed login attempts",
             )
 
-        if not users_commands_v1.verify_password(
+        if not await users_commands_v1.verify_password(
             login_credential["password"], user["password"]
         ):
             new_failed_attempt_count = (
@@ -68,7 +68,7 @@ async def authenticate_user(login_credential: Dict):
                 detail="User signed up with password",
             )
 
-        new_auth_attributes = users_commands_v1.validate_access_token(
+        new_auth_attributes = await users_commands_v1.validate_access_token(
             login_credential["service_user_id"],
             login_credential["email"],
             login_credential["access_token"],
@@ -95,12 +95,20 @@ WHERE
     return user
 
 
-async def reactivate_user(user_id: str) -> None:
+async def reactivate_user(user_id: str) -> int:
+    """
+    Return the user's new token_version
+    """
     query = """
 UPDATE \"user\"
 SET
     active = TRUE,
+    token_version = token_version + 1,
     updated_at = NOW()
 WHERE id = :user_id
+RETURNING token_version
     """
-    await database.execute(query=query, values={"user_id": user_id})
+    token_version = await database.execute(query=query, values={"user_id": user_id})
+    users_commands_v1.invalidate_principal(user_id)
+
+    return token_version
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+from fastapi import APIRouter, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import ORJSONResponse
 
 from whoami_back.api.v1.users import commands as users_commands_v1
 from whoami_back.api.v1.users.models import UserSignUpModel
-from whoami_back.api.v2.posts.resources.default_posts import get_default_posts
+from whoami_back.api.v2.posts.resources.default_posts import (
+    default_posts_statement,
+    default_posts_values,
+)
 from whoami_back.api.v2.users import base_url, commands
 from whoami_back.api.v2.users.models import UserLoginModel
 from whoami_back.utils.config import LOGIN_JWT_EXPIRES_IN_HOURS
-from whoami_back.utils.db import database, to_csv, to_ref_csv
+from whoami_back.utils.db import database
 
 router = APIRouter(prefix=f"{base_url}", tags=["users_v2"])
 
@@ -41,11 +44,12 @@ async def user_login(login_credential: UserLoginModel):
         else:
             raise
 
-    access_token = await users_commands_v1.create_access_token(
-        user["id"], LOGIN_JWT_EXPIRES_IN_HOURS
-    )
-
     if not user["confirmed"]:
+        access_token = await users_commands_v1.create_access_token(
+            user["id"],
+            LOGIN_JWT_EXPIRES_IN_HOURS,
+            claims=users_commands_v1.get_login_claims(user),
+        )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -57,40 +61,41 @@ async def user_login(login_credential: UserLoginModel):
     # Reactivate the user if he/she has been deactivated
     if not user["active"]:
         user["active"] = True
-        await commands.reactivate_user(user["id"])
+        user["token_version"] = await commands.reactivate_user(user["id"])
+
+    access_token = await users_commands_v1.create_access_token(
+        user["id"],
+        LOGIN_JWT_EXPIRES_IN_HOURS,
+        claims=users_commands_v1.get_login_claims(user),
+    )
 
     return {"access_token": access_token}
 
 
 @router.post("/signup")
-async def user_signup(
-    signup_data: UserSignUpModel, background_tasks: BackgroundTasks
-) -> None:
+async def user_signup(signup_data: UserSignUpModel) -> None:
     """
     Sign up a new user.
     If signing up using an email & a password, send a confirmation email.
     """
     signup_data_dict = jsonable_encoder(signup_data)
-    user_id = await users_commands_v1.create_user(signup_data_dict)
-
-    if signup_data.password:
-        await users_commands_v1.send_confirmation_email(
-            signup_data.email, user_id, background_tasks
+    async with database.transaction():
+        # The user, the board and the 3 default posts are created in one statement
+        user_id = await users_commands_v1.create_user(
+            signup_data_dict,
+            default_posts_statement=default_posts_statement,
+            default_posts_values=default_posts_values,
         )
 
-    # Create 3 default posts
-    for create_post_data in get_default_posts():
-        create_post_data["user_id"] = user_id
-        insert_statement = to_csv(create_post_data.keys())
-        value_statement = to_ref_csv(create_post_data.keys())
-        query = f"""
-INSERT INTO post ({insert_statement})
-VALUES ({value_statement})
-        """
-        await database.execute(query=query, values=create_post_data)
+        if signup_data.password:
+            await users_commands_v1.send_confirmation_email(
+                signup_data.email, user_id
+            )
 
     access_token = await users_commands_v1.create_access_token(
-        user_id, LOGIN_JWT_EXPIRES_IN_HOURS
+        user_id,
+        LOGIN_JWT_EXPIRES_IN_HOURS,
+        claims=users_commands_v1.get_login_claims(signup_data_dict),
     )
     return {"access_token": access_token}
 
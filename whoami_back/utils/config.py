@@ -39,13 +39,62 @@ PASSWORD_RESET_JWT_EXPIRES_IN_HOURS = config(
     "PASSWORD_RESET_JWT_EXPIRES_IN_HOURS", cast=int, default=24
 )
 
+# Bearer token /metrics is served to. Unset or empty, it is not served at all.
+METRICS_TOKEN = config("METRICS_TOKEN", cast=Secret, default=None)
+
+# Assets. Prepended to asset paths, e.g. a CDN in front of the API server.
+ASSETS_HOST = config("ASSETS_HOST", default="")
+
+# Principal cache
+PRINCIPAL_CACHE_MAX_SIZE = config(
+    "PRINCIPAL_CACHE_MAX_SIZE", cast=int, default=10000
+)
+PRINCIPAL_CACHE_TTL_IN_SECONDS = config(
+    "PRINCIPAL_CACHE_TTL_IN_SECONDS", cast=float, default=30
+)
+TOKEN_VERSION_CACHE_MAX_SIZE = config(
+    "TOKEN_VERSION_CACHE_MAX_SIZE", cast=int, default=100000
+)
+TOKEN_VERSION_CACHE_TTL_IN_SECONDS = config(
+    "TOKEN_VERSION_CACHE_TTL_IN_SECONDS", cast=float, default=60
+)
+ACCESS_TOKEN_CACHE_MAX_SIZE = config(
+    "ACCESS_TOKEN_CACHE_MAX_SIZE", cast=int, default=100000
+)
+ACCESS_TOKEN_CACHE_TTL_IN_SECONDS = config(
+    "ACCESS_TOKEN_CACHE_TTL_IN_SECONDS", cast=float, default=300
+)
+
+# Password hashing
+PASSWORD_HASHER_MAX_WORKERS = config(
+    "PASSWORD_HASHER_MAX_WORKERS", cast=int, default=2
+)
+PASSWORD_HASHER_MAX_QUEUE_SIZE = config(
+    "PASSWORD_HASHER_MAX_QUEUE_SIZE", cast=int, default=32
+)
+
 # Google
 GOOGLE_CLIENT_ID = config("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = config(
+    "GOOGLE_CERTS_URL", default="https://www.googleapis.com/oauth2/v1/certs"
+)
 
 # Sendgrid
 SENDGRID_API_KEY = config("SENDGRID_API_KEY")
+SENDGRID_API_HOST = config("SENDGRID_API_HOST", default="https://api.sendgrid.com")
 ADMIN_EMAIL = config("ADMIN_EMAIL")
 
+# Email outbox
+EMAIL_DISPATCHER_BATCH_SIZE = config(
+    "EMAIL_DISPATCHER_BATCH_SIZE", cast=int, default=100
+)
+EMAIL_DISPATCHER_POLL_INTERVAL_IN_SECONDS = config(
+    "EMAIL_DISPATCHER_POLL_INTERVAL_IN_SECONDS", cast=float, default=1
+)
+EMAIL_DISPATCHER_MAX_ATTEMPTS = config(
+    "EMAIL_DISPATCHER_MAX_ATTEMPTS", cast=int, default=8
+)
+
 # Frontend
 FE_HOSTS = config("FE_HOSTS").split(",")
 
@@ -63,5 +112,83 @@ BOARD_IMAGES_S3_BUCKET = config(
     "BOARD_IMAGES_S3_BUCKET", default="whoami-board-images"
 )
 
+# Object storage
+# "s3", or "local" to keep objects on disk under STORAGE_LOCAL_ROOT
+STORAGE_BACKEND = config("STORAGE_BACKEND", default="s3")
+STORAGE_LOCAL_ROOT = config("STORAGE_LOCAL_ROOT", default="/tmp/whoami-storage")
+STORAGE_LOCAL_LATENCY_IN_SECONDS = config(
+    "STORAGE_LOCAL_LATENCY_IN_SECONDS", cast=float, default=0
+)
+STORAGE_MAX_CONCURRENCY = config("STORAGE_MAX_CONCURRENCY", cast=int, default=32)
+
+# Image derivatives
+IMAGE_DERIVATIVES_MAX_WORKERS = config(
+    "IMAGE_DERIVATIVES_MAX_WORKERS", cast=int, default=2
+)
+IMAGE_DERIVATIVES_MAX_PENDING = config(
+    "IMAGE_DERIVATIVES_MAX_PENDING", cast=int, default=100
+)
+
+# Storage garbage collection
+STORAGE_GC_BATCH_SIZE = config("STORAGE_GC_BATCH_SIZE", cast=int, default=100)
+STORAGE_GC_POLL_INTERVAL_IN_SECONDS = config(
+    "STORAGE_GC_POLL_INTERVAL_IN_SECONDS", cast=float, default=30
+)
+STORAGE_GC_MAX_ATTEMPTS = config("STORAGE_GC_MAX_ATTEMPTS", cast=int, default=8)
+
+# Post layout write-behind. Off by default; when on, layouts sent with
+# buffered=true are written every POST_LAYOUT_FLUSH_INTERVAL_IN_MS, which is also
+# how much of them a crashed worker can lose.
+POST_LAYOUT_WRITE_BEHIND = config(
+    "POST_LAYOUT_WRITE_BEHIND", cast=bool, default=False
+)
+POST_LAYOUT_FLUSH_INTERVAL_IN_MS = config(
+    "POST_LAYOUT_FLUSH_INTERVAL_IN_MS", cast=int, default=500
+)
+POST_LAYOUT_BUFFER_MAX_POSTS = config(
+    "POST_LAYOUT_BUFFER_MAX_POSTS", cast=int, default=10000
+)
+# On while the database is at revision f4a9c2e6d871, where post still has the
+# geometry it copied to post_layout, so that both are written until the next
+# revision drops it from post
+POST_LAYOUT_DUAL_WRITE = config("POST_LAYOUT_DUAL_WRITE", cast=bool, default=False)
+
+# Fetching from third party hosts
+FETCH_TIMEOUT_IN_SECONDS = config("FETCH_TIMEOUT_IN_SECONDS", cast=float, default=10)
+FETCH_MAX_CONNECTIONS = config("FETCH_MAX_CONNECTIONS", cast=int, default=100)
+FETCH_MAX_CONNECTIONS_PER_HOST = config(
+    "FETCH_MAX_CONNECTIONS_PER_HOST", cast=int, default=8
+)
+
+# Link post thumbnails
+THUMBNAIL_FETCH_MAX_SIZE_IN_BYTES = config(
+    "THUMBNAIL_FETCH_MAX_SIZE_IN_BYTES", cast=int, default=5 * 1024 * 1024
+)
+THUMBNAIL_CACHE_MAX_SIZE = config(
+    "THUMBNAIL_CACHE_MAX_SIZE", cast=int, default=10000
+)
+THUMBNAIL_CACHE_TTL_IN_SECONDS = config(
+    "THUMBNAIL_CACHE_TTL_IN_SECONDS", cast=float, default=86400
+)
+
+# Link previews
+LINK_PREVIEW_TTL_IN_SECONDS = config(
+    "LINK_PREVIEW_TTL_IN_SECONDS", cast=float, default=86400
+)
+LINK_PREVIEW_FAILURE_TTL_IN_SECONDS = config(
+    "LINK_PREVIEW_FAILURE_TTL_IN_SECONDS", cast=float, default=600
+)
+SITE_FAVICON_TTL_IN_SECONDS = config(
+    "SITE_FAVICON_TTL_IN_SECONDS", cast=float, default=604800
+)
+
+# Direct uploads
+UPLOAD_MAX_SIZE_IN_BYTES = config(
+    "UPLOAD_MAX_SIZE_IN_BYTES", cast=int, default=10 * 1024 * 1024
+)
+UPLOAD_INTENT_EXPIRES_IN_SECONDS = config(
+    "UPLOAD_INTENT_EXPIRES_IN_SECONDS", cast=int, default=600
+)
+
 # Task queue
 TASK_QUEUE_HOST = config("TASK_QUEUE_HOST", default="http://localhost:8001")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Sequence
 
 from databases import Database
 
@@ -28,6 +28,17 @@ def to_ref_csv(columns) -> str:
     return ", ".join([f":{column}" for column in columns])
 
 
+def to_multi_row_values(columns, rows: Sequence[Dict]) -> Dict:
+    """
+    (["key1"], [{"key1": 1}, {}]) -> {"key1_0": 1, "key1_1": None}
+    """
+    return {
+        f"{column}_{i}": row.get(column)
+        for i, row in enumerate(rows)
+        for column in columns
+    }
+
+
 def to_set_statement(columns, *, update_update_at: bool = True) -> str:
     """
     ["key1", "key2", "key3"] -> "key1 = :key1, key2 = :key2, key3 = :key3"
@@ -0,0 +1,237 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sendgrid.helpers.mail import Mail
+
+from whoami_back.utils.db import database
+
+
+async def enqueue_email(
+    to_email: str, template_id: str, template_data: Optional[Dict] = None
+) -> None:
+    """
+    Queue an email for EmailDispatcher. Call this in the same transaction as the
+    change that triggers the email so that either both or neither are committed.
+    """
+    query = """
+INSERT INTO email_outbox (to_email, template_id, template_data)
+VALUES (:to_email, :template_id, :template_data)
+    """
+    values = {
+        "to_email": to_email,
+        "template_id": template_id,
+        "template_data": json.dumps(template_data) if template_data else None,
+    }
+    await database.execute(query=query, values=values)
+
+
+class EmailDispatcher:
+    """
+    Drains the email_outbox table in batches and sends the emails through the
+    SendGrid v3 API.
+
+    Emails are claimed with FOR UPDATE SKIP LOCKED, so every worker process can run
+    a dispatcher. A claimed email is leased for lease_seconds. If the process dies
+    before recording the outcome, the email is sent again once the lease runs out.
+    Failed sends are retried with exponential backoff up to max_attempts times.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        api_host: str,
+        from_email: str,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_attempts: int = 8,
+        base_backoff: float = 2.0,
+        max_backoff: float = 3600.0,
+        lease_seconds: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.api_host = api_host
+        self.from_email = from_email
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so that it belongs to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_host,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(max_connections=self.batch_size),
+                timeout=10,
+                transport=self._transport,
+            )
+
+        return self._client
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                dispatched_count = await self.dispatch_batch()
+            except Exception as e:
+                print(f"Failed to dispatch emails. Error: {str(e)}")
+                dispatched_count = 0
+
+            # Keep going without a pause while there is a backlog
+            if dispatched_count < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def dispatch_batch(self) -> int:
+        """
+        Send one batch of due emails and return how many were attempted.
+        """
+        query = """
+UPDATE email_outbox
+SET
+    attempt_count = attempt_count + 1,
+    next_attempt_at = NOW() + make_interval(secs => :lease_seconds)
+WHERE id IN (
+    SELECT id
+    FROM email_outbox
+    WHERE sent_at IS NULL AND failed_at IS NULL AND next_attempt_at <= NOW()
+    ORDER BY next_attempt_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, to_email, template_id, template_data, attempt_count
+        """
+        values = {"lease_seconds": self.lease_seconds, "batch_size": self.batch_size}
+        emails = await database.fetch_all(query=query, values=values)
+
+        if not emails:
+            return 0
+
+        results = await asyncio.gather(*[self._send(email) for email in emails])
+        sent_ids = []
+        failures = []
+
+        for email, error in zip(emails, results):
+            if error is None:
+                sent_ids.append(str(email["id"]))
+            else:
+                failures.append((str(email["id"]), *error))
+
+        await self._mark_sent(sent_ids)
+        await self._mark_failed(failures)
+
+        return len(emails)
+
+    async def _send(self, email) -> Optional[Tuple[str, bool]]:
+        """
+        Return None on success. Otherwise, return the error and whether the failure
+        is permanent.
+        """
+        message = Mail(from_email=self.from_email, to_emails=email["to_email"])
+        message.template_id = email["template_id"]
+
+        if email["template_data"]:
+            message.dynamic_template_data = json.loads(email["template_data"])
+
+        try:
+            response = await self._get_client().post(
+                "/v3/mail/send", json=message.get()
+            )
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {str(e)}", False
+
+        if 200 <= response.status_code < 300:
+            return None
+
+        # SendGrid rejects malformed requests with 4xx. Sending them again will not
+        # help, except for rate limiting.
+        permanent = response.status_code < 500 and response.status_code != 429
+
+        return f"{response.status_code}: {response.text[:500]}", permanent
+
+    async def _mark_sent(self, email_ids: List[str]) -> None:
+        if not email_ids:
+            return
+
+        query = """
+UPDATE email_outbox
+SET sent_at = NOW(), last_error = NULL
+WHERE id = ANY(CAST(:email_ids AS UUID[]))
+        """
+        await database.execute(query=query, values={"email_ids": email_ids})
+        self.sent += len(email_ids)
+
+    async def _mark_failed(self, failures: List[Tuple[str, str, bool]]) -> None:
+        if not failures:
+            return
+
+        email_ids, errors, permanent = zip(*failures)
+        query = """
+UPDATE email_outbox
+SET
+    last_error = failure.error,
+    failed_at = CASE
+        WHEN failure.permanent OR attempt_count >= :max_attempts THEN NOW()
+    END,
+    next_attempt_at = NOW() + make_interval(
+        secs => LEAST(:max_backoff, :base_backoff * POWER(2, attempt_count - 1))
+        * (0.5 + random())
+    )
+FROM unnest(
+    CAST(:email_ids AS UUID[]),
+    CAST(:errors AS TEXT[]),
+    CAST(:permanent AS BOOLEAN[])
+) AS failure (id, error, permanent)
+WHERE email_outbox.id = failure.id
+RETURNING failed_at IS NOT NULL AS failed
+        """
+        values = {
+            "email_ids": list(email_ids),
+            "errors": list(errors),
+            "permanent": list(permanent),
+            "max_attempts": self.max_attempts,
+            "base_backoff": self.base_backoff,
+            "max_backoff": self.max_backoff,
+        }
+        rows = await database.fetch_all(query=query, values=values)
+        failed_count = sum(1 for row in rows if row["failed"])
+        self.failed += failed_count
+        self.retried += len(rows) - failed_count
+
+    def stats(self) -> Dict:
+        return {
+            "batch_size": self.batch_size,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
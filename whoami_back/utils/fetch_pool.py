@@ -0,0 +1,267 @@
+import asyncio
+import ipaddress
+import socket
+from ssl import SSLContext
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpcore
+import httpx
+
+# httpx 0.18 connects through httpcore 0.13, whose backends are not exported. Both
+# are pinned in pyproject.toml, see test_public_host_backend_installed.
+from httpcore._backends.asyncio import AsyncioBackend, SocketStream
+
+from whoami_back.utils.singleflight import SingleFlight
+
+MAX_REDIRECTS = 5
+
+
+class FetchError(Exception):
+    pass
+
+
+async def resolve_public_host(hostname: str, port: int) -> List[str]:
+    """
+    Return the addresses of the host. Raise FetchError if it does not resolve or
+    any of them is a loopback, private or link-local address.
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        addresses = await loop.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise FetchError(f"Could not resolve {hostname}: {str(e)}")
+
+    ips = [address[0] for *_, address in addresses]
+
+    for ip in ips:
+        if not ipaddress.ip_address(ip).is_global:
+            raise FetchError(f"{hostname} is not a public host")
+
+    return ips
+
+
+class PublicHostBackend(AsyncioBackend):
+    """
+    Connects to the addresses that resolve_public_host checked, rather than
+    resolving the host again. Otherwise the host could resolve to a public address
+    for the check and to an internal one for the connection (DNS rebinding). TLS
+    still sends the hostname as SNI and verifies the certificate against it.
+    """
+
+    async def open_tcp_stream(
+        self,
+        hostname: bytes,
+        port: int,
+        ssl_context: Optional[SSLContext],
+        timeout: Dict,
+        *,
+        local_address: Optional[str],
+    ) -> SocketStream:
+        host = hostname.decode("ascii")
+        local_addr = None if local_address is None else (local_address, 0)
+        error: Exception = httpcore.ConnectError(f"Could not connect to {host}")
+
+        for ip in await resolve_public_host(host, port):
+            try:
+                stream_reader, stream_writer = await asyncio.wait_for(
+                    asyncio.open_connection(
+                        ip,
+                        port,
+                        ssl=ssl_context,
+                        server_hostname=host if ssl_context else None,
+                        local_addr=local_addr,
+                    ),
+                    timeout.get("connect"),
+                )
+            except asyncio.TimeoutError as e:
+                error = httpcore.ConnectTimeout(str(e))
+            except OSError as e:
+                error = httpcore.ConnectError(str(e))
+            else:
+                return SocketStream(
+                    stream_reader=stream_reader, stream_writer=stream_writer
+                )
+
+        raise error
+
+
+class FetchPool:
+    """
+    Downloads resources from third party hosts, such as link thumbnails and
+    pages, through one pooled HTTP client.
+
+    At most max_connections_per_host downloads run against the same host at once,
+    and a download is abandoned after timeout seconds. Concurrent requests for the
+    same URL share one download.
+
+    Unless block_private_networks is False, hosts that resolve to loopback,
+    private or link-local addresses are refused, including after redirects, so
+    that users cannot make the server request internal services. Connections are
+    then made to the checked addresses, see PublicHostBackend.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float,
+        max_connections: int,
+        max_connections_per_host: int,
+        block_private_networks: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.block_private_networks = block_private_networks
+        self.fetched = 0
+        self.failed = 0
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # Host -> semaphore and the number of downloads holding or waiting for it
+        self._host_slots: Dict[str, list] = {}
+        self._downloads = SingleFlight()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so that it belongs to the running event loop
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections)
+            transport = self._transport
+
+            if transport is None and self.block_private_networks:
+                transport = httpx.AsyncHTTPTransport(limits=limits)
+                # Takes no backend instance in httpx 0.18, so its pool is given one
+                transport._pool._backend = PublicHostBackend()
+
+            self._client = httpx.AsyncClient(
+                limits=limits,
+                timeout=self.timeout,
+                headers={"User-Agent": "whoami-link-preview/1.0"},
+                transport=transport,
+            )
+
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(
+        self, url: str, *, max_size: int, content_types: Tuple[str, ...] = ()
+    ) -> Tuple[bytes, str, str]:
+        """
+        Return the body, content type and final URL after redirects. Only content
+        types starting with one of content_types are accepted, if given.
+
+        Raise FetchError if the resource cannot be downloaded, is not of an
+        accepted type or exceeds max_size bytes.
+        """
+        return await self._downloads.do(
+            (url, max_size, content_types),
+            lambda: self._download(url, max_size, content_types),
+        )
+
+    async def _download(
+        self, url: str, max_size: int, content_types: Tuple[str, ...]
+    ) -> Tuple[bytes, str, str]:
+        try:
+            result = await asyncio.wait_for(
+                self._follow(url, max_size, content_types), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.failed += 1
+            raise FetchError(f"Timed out fetching {url}")
+        except (httpx.HTTPError, FetchError) as e:
+            self.failed += 1
+            raise FetchError(f"Failed to fetch {url}. Error: {str(e)}")
+
+        self.fetched += 1
+
+        return result
+
+    async def _follow(
+        self, url: str, max_size: int, content_types: Tuple[str, ...]
+    ) -> Tuple[bytes, str, str]:
+        # Redirects are followed here so that every hop is checked
+        for _ in range(MAX_REDIRECTS + 1):
+            await self._check_url(url)
+            host = urlsplit(url).hostname
+            slot = self._host_slots.setdefault(
+                host, [asyncio.Semaphore(self.max_connections_per_host), 0]
+            )
+            slot[1] += 1
+
+            try:
+                async with slot[0]:
+                    location, result = await self._get(url, max_size, content_types)
+            finally:
+                slot[1] -= 1
+
+                if not slot[1]:
+                    del self._host_slots[host]
+
+            if location is None:
+                return (*result, url)
+
+            url = urljoin(url, location)
+
+        raise FetchError("Too many redirects")
+
+    async def _check_url(self, url: str) -> None:
+        parts = urlsplit(url)
+
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(f"Invalid URL: {url}")
+
+        # Refused before waiting for a slot of the host. PublicHostBackend checks
+        # again for the connection itself.
+        if self.block_private_networks:
+            default_port = 443 if parts.scheme == "https" else 80
+            await resolve_public_host(parts.hostname, parts.port or default_port)
+
+    async def _get(
+        self, url: str, max_size: int, content_types: Tuple[str, ...]
+    ) -> Tuple[Optional[str], Tuple[bytes, str]]:
+        request = self._get_client().stream("GET", url, allow_redirects=False)
+
+        async with request as response:
+            if httpx.codes.is_redirect(response.status_code):
+                if not response.headers.get("location"):
+                    raise FetchError("Redirected without a Location")
+
+                return response.headers["location"], (b"", "")
+
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+
+            if content_types and not content_type.startswith(content_types):
+                raise FetchError(f"Unexpected content type: {content_type}")
+
+            try:
+                content_length = int(response.headers.get("content-length", 0))
+            except ValueError:
+                raise FetchError("Invalid Content-Length")
+
+            if content_length > max_size:
+                raise FetchError(f"The response exceeds {max_size} bytes")
+
+            body = bytearray()
+
+            async for chunk in response.aiter_bytes():
+                body += chunk
+
+                if len(body) > max_size:
+                    raise FetchError(f"The response exceeds {max_size} bytes")
+
+        return None, (bytes(body), content_type)
+
+    def stats(self) -> Dict:
+        return {
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "shared": self._downloads.shared,
+            "in_flight": len(self._downloads),
+            "hosts": len(self._host_slots),
+        }
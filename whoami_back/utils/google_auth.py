@@ -0,0 +1,119 @@
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+
+import httpx
+from google.auth import jwt as google_jwt
+from jose import JWTError
+from jose import jwt as jose_jwt
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def _get_max_age(cache_control: Optional[str], default: int) -> int:
+    match = _MAX_AGE_PATTERN.search(cache_control or "")
+
+    return int(match.group(1)) if match else default
+
+
+class GoogleIdTokenVerifier:
+    """
+    Verifies Google ID tokens locally against an in-process copy of Google's
+    signing certs.
+
+    The certs are kept for as long as the Cache-Control max-age of the certs
+    response says. Once expired, the cached certs are still used while a
+    background task fetches new ones, so only the very first verification in a
+    process waits for the network.
+    """
+
+    def __init__(
+        self,
+        *,
+        certs_url: str,
+        audience: str,
+        default_max_age: int = 300,
+        min_refresh_interval: int = 30,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.certs_url = certs_url
+        self.audience = audience
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.fetch_count = 0
+        self._transport = transport
+        self._certs: Optional[Dict[str, str]] = None
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Created lazily so that it belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        return self._lock
+
+    async def _fetch_certs(self) -> None:
+        async with httpx.AsyncClient(transport=self._transport) as client:
+            response = await client.get(self.certs_url, timeout=10)
+            response.raise_for_status()
+
+        self.fetch_count += 1
+        self._certs = response.json()
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + _get_max_age(
+            response.headers.get("cache-control"), self.default_max_age
+        )
+
+    async def _refresh_certs(self) -> None:
+        async with self._get_lock():
+            if self._certs is None or self._expires_at <= time.monotonic():
+                await self._fetch_certs()
+
+    def _refresh_certs_in_background(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh_certs())
+
+    async def get_certs(self) -> Dict[str, str]:
+        if self._certs is None:
+            await self._refresh_certs()
+        elif self._expires_at <= time.monotonic():
+            # Keep serving the stale certs. Google publishes new keys well before
+            # it starts signing with them.
+            self._refresh_certs_in_background()
+
+        return self._certs
+
+    async def _refresh_certs_for_unknown_key(self) -> None:
+        async with self._get_lock():
+            # Bounded so that tokens with made up key ids cannot make us hammer
+            # Google
+            if time.monotonic() - self._fetched_at >= self.min_refresh_interval:
+                await self._fetch_certs()
+
+    async def verify(self, id_token: str) -> Dict:
+        """
+        Return the ID token's payload. Raise ValueError if the token is not valid.
+        """
+        certs = await self.get_certs()
+
+        try:
+            key_id = jose_jwt.get_unverified_header(id_token).get("kid")
+        except JWTError as e:
+            raise ValueError(str(e))
+
+        if key_id not in certs:
+            # The token may be signed with a key newer than our certs
+            await self._refresh_certs_for_unknown_key()
+            certs = self._certs
+
+        payload = google_jwt.decode(id_token, certs=certs, audience=self.audience)
+
+        if payload.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {payload.get('iss')}")
+
+        return payload
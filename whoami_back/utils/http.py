@@ -0,0 +1,13 @@
+from whoami_back.utils.config import (
+    FETCH_MAX_CONNECTIONS,
+    FETCH_MAX_CONNECTIONS_PER_HOST,
+    FETCH_TIMEOUT_IN_SECONDS,
+)
+from whoami_back.utils.fetch_pool import FetchPool
+
+# Initialize shared objects
+fetch_pool = FetchPool(
+    timeout=FETCH_TIMEOUT_IN_SECONDS,
+    max_connections=FETCH_MAX_CONNECTIONS,
+    max_connections_per_host=FETCH_MAX_CONNECTIONS_PER_HOST,
+)
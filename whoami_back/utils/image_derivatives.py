@@ -0,0 +1,281 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+from whoami_back.utils.db import database
+from whoami_back.utils.storage import ObjectStorage, get_s3_object_uri
+
+# Every derivative is stored as {derivatives_uri}/{name}.webp and, for browsers
+# without WebP support, {derivatives_uri}/{name}.jpg
+AVATAR_DERIVATIVES = (("avatar_64", 64), ("avatar_128", 128))
+IMAGE_DERIVATIVES = (("tile_480", 480), ("full_1600", 1600))
+
+# Target -> table, id column, source URI column, derivatives URI column, sizes,
+# whether the derivatives are square crops and the column holding the id of the
+# board the image is shown on, if any
+DERIVATIVE_TARGETS = {
+    "profile_image": (
+        '"user"',
+        "id",
+        "profile_image_s3_uri",
+        "profile_image_derivatives_uri",
+        AVATAR_DERIVATIVES,
+        True,
+        None,
+    ),
+    "profile_background": (
+        '"user"',
+        "id",
+        "profile_background_s3_uri",
+        "profile_background_derivatives_uri",
+        IMAGE_DERIVATIVES,
+        False,
+        None,
+    ),
+    "post_image": (
+        "post",
+        "id",
+        "thumbnail_image_uri",
+        "thumbnail_image_derivatives_uri",
+        IMAGE_DERIVATIVES,
+        False,
+        "user_id",
+    ),
+    "board_background": (
+        "board",
+        "user_id",
+        "background_image_s3_uri",
+        "background_image_derivatives_uri",
+        IMAGE_DERIVATIVES,
+        False,
+        "user_id",
+    ),
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+
+def _render(
+    image_bytes: bytes, sizes: Tuple[Tuple[str, int], ...], square: bool
+) -> List[Tuple[str, bytes, str]]:
+    """
+    Return (file name, body, content type) of every derivative. Runs in a pool
+    process.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    largest_size = max(size for _, size in sizes)
+
+    # Lets JPEG decode straight to a smaller scale, which is much cheaper
+    image.draft("RGB", (largest_size, largest_size))
+
+    # Apply the EXIF orientation before the metadata is dropped. The saved files
+    # carry no EXIF, so location and camera data never leave the original.
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+    else:
+        image = image.convert("RGB")
+
+    derivatives = []
+
+    for name, size in sizes:
+        if square:
+            resized = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            # Never upscales
+            resized.thumbnail((size, size), Image.LANCZOS)
+
+        webp = io.BytesIO()
+        resized.save(webp, "WEBP", quality=WEBP_QUALITY, method=4)
+        derivatives.append((f"{name}.webp", webp.getvalue(), "image/webp"))
+
+        if resized.mode == "RGBA":
+            background = Image.new("RGB", resized.size, (255, 255, 255))
+            background.paste(resized, mask=resized.getchannel("A"))
+            resized = background
+
+        jpeg = io.BytesIO()
+        resized.save(
+            jpeg, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+        )
+        derivatives.append((f"{name}.jpg", jpeg.getvalue(), "image/jpeg"))
+
+    return derivatives
+
+
+def get_derivatives_key(source_key: str) -> str:
+    return f"derivatives/{source_key}"
+
+
+def get_all_derivative_keys(source_key: str) -> List[str]:
+    """
+    Return the keys of every derivative an image may have, whichever its target.
+    """
+    derivatives_key = get_derivatives_key(source_key)
+
+    return [
+        f"{derivatives_key}/{name}.{extension}"
+        for name, _ in (*AVATAR_DERIVATIVES, *IMAGE_DERIVATIVES)
+        for extension in ("webp", "jpg")
+    ]
+
+
+class ImageDerivativePipeline:
+    """
+    Generates resized WebP and JPEG copies of uploaded images in a process pool,
+    after the request that uploaded the image has returned.
+
+    At most max_pending images are waiting or being processed. Images scheduled
+    beyond that are dropped and keep being served as uploaded.
+    """
+
+    def __init__(
+        self, *, storage: ObjectStorage, max_workers: int, max_pending: int
+    ):
+        self.storage = storage
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so that every gunicorn worker gets its own pool after the
+        # fork
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        return self._executor
+
+    def schedule(self, target: str, owner_id: str, bucket: str, key: str) -> None:
+        """
+        Generate the derivatives of the object in the background and point the
+        owner's row at them. owner_id is the id of the post or the user.
+        """
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        task = asyncio.ensure_future(self._generate(target, owner_id, bucket, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _generate(self, target: str, owner_id: str, bucket: str, key: str):
+        (
+            table,
+            id_column,
+            source_column,
+            derivatives_column,
+            sizes,
+            square,
+            board_column,
+        ) = DERIVATIVE_TARGETS[target]
+        started_at = time.perf_counter()
+
+        try:
+            derivatives_key = get_derivatives_key(key)
+            largest_name = sizes[-1][0]
+
+            # Deduplicated images are shared, and so are their derivatives
+            if not await self.storage.get_size(
+                bucket, f"{derivatives_key}/{largest_name}.jpg"
+            ):
+                await self._render_and_upload(bucket, key, sizes, square)
+
+            # Skipped if the image was replaced in the meantime
+            query = f"""
+UPDATE {table}
+SET {derivatives_column} = :derivatives_uri
+WHERE {id_column} = :owner_id AND {source_column} = :source_uri
+            """
+
+            if board_column:
+                # The board now returns the derivatives, so its ETag changes
+                query = f"""
+WITH updated AS (
+    {query.strip()}
+    RETURNING {board_column}
+)
+UPDATE board
+SET version = version + 1
+WHERE user_id IN (SELECT {board_column} FROM updated)
+                """
+            values = {
+                "derivatives_uri": get_s3_object_uri(bucket, derivatives_key),
+                "owner_id": owner_id,
+                "source_uri": get_s3_object_uri(bucket, key),
+            }
+            await database.execute(query=query, values=values)
+        except Exception as e:
+            self.failed += 1
+            print(f"Failed to generate image derivatives of {key}. Error: {str(e)}")
+        else:
+            self.completed += 1
+            self.total_latency += time.perf_counter() - started_at
+
+    async def _render_and_upload(
+        self,
+        bucket: str,
+        key: str,
+        sizes: Tuple[Tuple[str, int], ...],
+        square: bool,
+    ) -> None:
+        image_bytes = await self.storage.get(bucket, key)
+        loop = asyncio.get_running_loop()
+        derivatives = await loop.run_in_executor(
+            self._get_executor(), _render, image_bytes, sizes, square
+        )
+        derivatives_key = get_derivatives_key(key)
+        await asyncio.gather(
+            *[
+                self.storage.put(
+                    bucket,
+                    f"{derivatives_key}/{file_name}",
+                    body,
+                    content_type=content_type,
+                )
+                for file_name, body, content_type in derivatives
+            ]
+        )
+
+    async def join(self) -> None:
+        """
+        Wait until every scheduled image is processed.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        average_latency = (
+            self.total_latency / self.completed if self.completed else 0
+        )
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "average_latency_ms": average_latency * 1000,
+        }
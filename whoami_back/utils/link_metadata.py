@@ -0,0 +1,115 @@
+from html.parser import HTMLParser
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only track where a link was shared and never change the
+# page
+TRACKING_PARAMETERS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "si"}
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    Return the URL with the parts that do not change the page normalized or
+    dropped, or None if it is not an http(s) URL.
+    """
+    parts = urlsplit(url.strip())
+
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return None
+
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname.lower()
+
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{parts.port}"
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.startswith("utm_") and name not in TRACKING_PARAMETERS
+    )
+
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+
+class _HeadParser(HTMLParser):
+    """
+    Collects the title, meta tags and links of the head of an HTML page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.links: Dict[str, str] = {}
+        self.title = ""
+        self.done = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+
+        if tag == "meta":
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+
+            # The first value wins, like the crawlers that read them
+            if name and attrs.get("content"):
+                self.meta.setdefault(name, attrs["content"].strip())
+        elif tag == "link":
+            rel = attrs.get("rel", "").lower()
+            link_type = attrs.get("type", "").lower()
+
+            if attrs.get("href"):
+                if rel == "alternate" and link_type == "application/json+oembed":
+                    self.links.setdefault("oembed", attrs["href"])
+                elif rel in ("icon", "shortcut icon"):
+                    self.links.setdefault("icon", attrs["href"])
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def parse_link_metadata(html: str, url: str) -> Dict[str, Optional[str]]:
+    """
+    Return the title, description, thumbnail image, favicon and oEmbed endpoint of
+    the page from its OpenGraph and Twitter card tags, falling back to the plain
+    HTML ones. Relative URLs are resolved against url.
+    """
+    parser = _HeadParser()
+
+    # Only the head is needed, so stop feeding once it ends
+    for i in range(0, len(html), 8192):
+        parser.feed(html[i : i + 8192])
+
+        if parser.done:
+            break
+
+    meta = parser.meta
+
+    def first(*names: str) -> Optional[str]:
+        return next((meta[name] for name in names if meta.get(name)), None)
+
+    thumbnail_image_uri = first(
+        "og:image:secure_url", "og:image", "og:image:url", "twitter:image"
+    )
+    oembed_uri = parser.links.get("oembed")
+
+    return {
+        "title": first("og:title", "twitter:title") or parser.title.strip() or None,
+        "description": first("og:description", "twitter:description", "description"),
+        "thumbnail_image_uri": (
+            urljoin(url, thumbnail_image_uri) if thumbnail_image_uri else None
+        ),
+        "favicon_uri": urljoin(url, parser.links.get("icon", "/favicon.ico")),
+        "oembed_uri": urljoin(url, oembed_uri) if oembed_uri else None,
+    }
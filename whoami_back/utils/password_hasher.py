@@ -0,0 +1,96 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from passlib.context import CryptContext
+
+# Lives in every pool process. Only the module level functions below touch it.
+_password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return _password_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _password_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasherSaturated(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so that hashing never blocks the event loop.
+
+    At most max_workers calls run at once and at most max_queue_size more wait
+    for a free worker. Anything beyond that is rejected right away with
+    PasswordHasherSaturated instead of piling up behind the pool.
+    """
+
+    def __init__(self, *, max_workers: int, max_queue_size: int):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so that every gunicorn worker gets its own pool after the
+        # fork
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_queue_size:
+            self.rejected += 1
+            raise PasswordHasherSaturated(
+                f"{self._in_flight} password hashing calls are already in flight"
+            )
+
+        self._in_flight += 1
+        started_at = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            latency = time.perf_counter() - started_at
+            self.completed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        average_latency = (
+            self.total_latency / self.completed if self.completed else 0
+        )
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "average_latency_ms": average_latency * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+        }
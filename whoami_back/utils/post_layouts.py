@@ -0,0 +1,427 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from whoami_back.utils.config import POST_LAYOUT_DUAL_WRITE
+from whoami_back.utils.db import database, to_csv, to_ref_csv, to_set_statement
+
+# Columns of a post kept in its post_layout row, apart from the rest of the post
+LAYOUT_COLUMNS = ("x", "y", "width", "height", "scale")
+
+# Joins the post p with its post_layout l
+POST_LAYOUT_JOIN_STATEMENT = "JOIN post_layout l ON l.post_id = p.id"
+
+
+def to_post_column(column: str) -> str:
+    """
+    "id" -> "p.id", "x" -> "l.x", for a post p joined with its post_layout l
+    """
+    return f"l.{column}" if column in LAYOUT_COLUMNS else f"p.{column}"
+
+
+def to_post_columns_csv(columns: Iterable[str]) -> str:
+    """
+    ["id", "x"] -> "p.id, l.x", for a post p joined with its post_layout l
+    """
+    return to_csv(to_post_column(column) for column in columns)
+
+
+def split_layout(post_data: Dict) -> Tuple[Dict, Dict]:
+    """
+    Split the columns of a post into those of post and those of post_layout.
+    """
+    layout = {
+        column: value
+        for column, value in post_data.items()
+        if column in LAYOUT_COLUMNS
+    }
+    post_data = {
+        column: value
+        for column, value in post_data.items()
+        if column not in LAYOUT_COLUMNS
+    }
+
+    return post_data, layout
+
+
+def to_insert_post_statement(
+    post_columns: Iterable[str], returning_columns: Iterable[str]
+) -> str:
+    """
+    Return a statement inserting a post and its post_layout. It binds the post
+    columns, which include the id and user_id, and the LAYOUT_COLUMNS by name and
+    returns returning_columns of the new post.
+    """
+    post_columns = list(post_columns)
+
+    if POST_LAYOUT_DUAL_WRITE:
+        post_columns += LAYOUT_COLUMNS
+
+    return f"""
+WITH new_post AS (
+    INSERT INTO post ({to_csv(post_columns)})
+    VALUES ({to_ref_csv(post_columns)})
+    RETURNING *
+),
+new_post_layout AS (
+    INSERT INTO post_layout (post_id, user_id, {to_csv(LAYOUT_COLUMNS)})
+    VALUES (:id, :user_id, {to_ref_csv(LAYOUT_COLUMNS)})
+    RETURNING *
+)
+SELECT {to_post_columns_csv(returning_columns)}
+FROM new_post p
+JOIN new_post_layout l ON l.post_id = p.id
+    """
+
+
+def to_update_post_statement(
+    post_columns: Iterable[str],
+    returning_columns: Iterable[str],
+    *,
+    previous_columns: Iterable[str] = (),
+) -> str:
+    """
+    Return a statement updating the post columns of the user's post, bound by name
+    along with :user_id and :post_id, and returning returning_columns of the post.
+    Given no post columns, e.g. when only the geometry changed, the post is only
+    read.
+
+    previous_columns are also returned as previous_{column}, with the values they
+    had right before this update.
+    """
+    post_columns = list(post_columns)
+    previous_columns = list(previous_columns)
+    returning_statement = to_post_columns_csv(returning_columns)
+
+    if not post_columns:
+        return f"""
+SELECT {returning_statement}
+FROM post p
+{POST_LAYOUT_JOIN_STATEMENT}
+WHERE p.user_id = :user_id AND p.id = :post_id
+        """
+
+    if not previous_columns:
+        return f"""
+UPDATE post p
+SET {to_set_statement(post_columns)}
+FROM post_layout l
+WHERE l.post_id = p.id AND p.user_id = :user_id AND p.id = :post_id
+RETURNING {returning_statement}
+        """
+
+    previous_statement = to_csv(
+        f"previous.{column} AS previous_{column}" for column in previous_columns
+    )
+
+    # Locked first, since a plain self-join would still read the values from
+    # before an update that committed while this one waited for the row
+    return f"""
+UPDATE post p
+SET {to_set_statement(post_columns)}
+FROM
+    post_layout l,
+    (
+        SELECT id, {to_csv(previous_columns)}
+        FROM post
+        WHERE user_id = :user_id AND id = :post_id
+        FOR UPDATE
+    ) previous
+WHERE l.post_id = p.id AND previous.id = p.id
+RETURNING {returning_statement}, {previous_statement}
+    """
+
+
+async def update_post_layout(user_id: str, post_id: str, layout: Dict) -> None:
+    """
+    Write the given LAYOUT_COLUMNS of the user's post. The post row itself is left
+    alone, so that neither it nor its updated_at change, unless
+    POST_LAYOUT_DUAL_WRITE is on.
+    """
+    set_statement = ", ".join(f"{column} = :{column}" for column in layout)
+    query = f"""
+UPDATE post_layout
+SET {set_statement}, updated_at = :updated_at
+WHERE post_id = :post_id AND user_id = :user_id
+    """
+    values = {
+        **layout,
+        "user_id": user_id,
+        "post_id": post_id,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    await database.execute(query=query, values=values)
+
+    if POST_LAYOUT_DUAL_WRITE:
+        query = f"""
+UPDATE post
+SET {set_statement}, layout_updated_at = :updated_at
+WHERE id = :post_id AND user_id = :user_id
+        """
+        await database.execute(query=query, values=values)
+
+
+async def write_post_layouts(layouts: List[Dict]) -> List[Dict]:
+    """
+    Write the post_layout of every post in layouts in a single statement and bump the
+    versions of the boards they are on. Each layout has the post id, the user_id
+    of its owner, the LAYOUT_COLUMNS and updated_at, when it was received.
+
+    A layout older than the one the post already has is skipped, so that updates
+    written late, e.g. by another worker's PostLayoutBuffer, never move a post
+    back. Returns the id and geometry of the posts written.
+    """
+    if not layouts:
+        return []
+
+    dual_write_statement = ""
+
+    if POST_LAYOUT_DUAL_WRITE:
+        dual_write_statement = """
+dual_written_post AS (
+    UPDATE post
+    SET
+        x = updated_post_layout.x,
+        y = updated_post_layout.y,
+        width = updated_post_layout.width,
+        height = updated_post_layout.height,
+        scale = updated_post_layout.scale,
+        layout_updated_at = updated_post_layout.updated_at
+    FROM updated_post_layout
+    WHERE post.id = updated_post_layout.post_id
+),
+        """
+
+    query = f"""
+WITH updated_post_layout AS (
+    UPDATE post_layout
+    SET
+        x = layout.x,
+        y = layout.y,
+        width = layout.width,
+        height = layout.height,
+        scale = layout.scale,
+        updated_at = layout.updated_at
+    FROM unnest(
+        CAST(:post_ids AS UUID[]),
+        CAST(:user_ids AS UUID[]),
+        CAST(:xs AS INTEGER[]),
+        CAST(:ys AS INTEGER[]),
+        CAST(:widths AS INTEGER[]),
+        CAST(:heights AS INTEGER[]),
+        CAST(:scales AS DOUBLE PRECISION[]),
+        CAST(:updated_ats AS TIMESTAMPTZ[])
+    ) AS layout (post_id, user_id, x, y, width, height, scale, updated_at)
+    WHERE post_layout.post_id = layout.post_id
+        AND post_layout.user_id = layout.user_id
+        AND post_layout.updated_at <= layout.updated_at
+    RETURNING post_layout.*
+),
+{dual_write_statement}
+bumped_board AS (
+    UPDATE board
+    SET version = version + 1
+    WHERE user_id IN (SELECT user_id FROM updated_post_layout)
+)
+SELECT post_id AS id, x, y, width, height, scale
+FROM updated_post_layout
+    """
+    values = {
+        "post_ids": [str(layout["id"]) for layout in layouts],
+        "user_ids": [layout["user_id"] for layout in layouts],
+        "xs": [layout["x"] for layout in layouts],
+        "ys": [layout["y"] for layout in layouts],
+        "widths": [layout["width"] for layout in layouts],
+        "heights": [layout["height"] for layout in layouts],
+        "scales": [layout["scale"] for layout in layouts],
+        "updated_ats": [layout["updated_at"] for layout in layouts],
+    }
+
+    return jsonable_encoder(await database.fetch_all(query=query, values=values))
+
+
+class PostLayoutBuffer:
+    """
+    Write-behind buffer for post geometry. Keeps the latest layout of each post in
+    memory and writes them all with write_post_layouts every flush_interval
+    seconds, so a drag that moves a tile many times a second costs one write.
+
+    Layouts still in the buffer are lost if the process dies, i.e. at most the
+    last flush_interval seconds of moves. So are the layouts of a user whose write
+    fails, instead of being retried with every flush. Once max_pending posts are
+    waiting, the update that adds more waits for a flush. Every worker process has
+    its own buffer, so only the author's requests to the same worker read the
+    buffered layouts back.
+    """
+
+    def __init__(self, *, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # User id -> post id -> layout
+        self._pending: Dict[str, Dict[str, Dict]] = {}
+        self._pending_count = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.buffered = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Created lazily so that it belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        return self._lock
+
+    async def put(self, user_id: str, layouts: List[Dict]) -> None:
+        """
+        Buffer the layouts of the user's posts, replacing any waiting ones.
+        """
+        user_id = str(user_id)
+        updated_at = datetime.now(timezone.utc)
+        user_layouts = self._pending.setdefault(user_id, {})
+
+        for layout in layouts:
+            post_id = str(layout["id"])
+
+            if post_id not in user_layouts:
+                self._pending_count += 1
+
+            user_layouts[post_id] = {
+                **{column: layout[column] for column in LAYOUT_COLUMNS},
+                "id": post_id,
+                "user_id": user_id,
+                "updated_at": updated_at,
+            }
+
+        self.buffered += len(layouts)
+
+        if self._pending_count >= self.max_pending:
+            await self.flush()
+
+    def discard(self, user_id: str, post_ids: List[str]) -> None:
+        """
+        Drop the waiting layouts of the posts, e.g. once newer ones were written.
+        """
+        user_id = str(user_id)
+        user_layouts = self._pending.get(user_id, {})
+
+        for post_id in post_ids:
+            if user_layouts.pop(str(post_id), None) is not None:
+                self._pending_count -= 1
+
+        if not user_layouts:
+            self._pending.pop(user_id, None)
+
+    def has_pending(self, user_id: str) -> bool:
+        return bool(self._pending.get(str(user_id)))
+
+    def apply(self, user_id: str, posts: List[Dict]) -> None:
+        """
+        Overlay the waiting layouts on the user's posts read from the database, so
+        that the author reads their own writes.
+        """
+        user_layouts = self._pending.get(str(user_id))
+
+        if not user_layouts:
+            return
+
+        for post in posts:
+            layout = user_layouts.get(post.get("id"))
+
+            if layout:
+                post.update(
+                    {
+                        column: layout[column]
+                        for column in LAYOUT_COLUMNS
+                        if column in post
+                    }
+                )
+
+    async def flush(self) -> int:
+        """
+        Write every waiting layout and return how many posts were written.
+        """
+        async with self._get_lock():
+            pending, self._pending = self._pending, {}
+            pending_count, self._pending_count = self._pending_count, 0
+            layouts = [
+                layout
+                for user_layouts in pending.values()
+                for layout in user_layouts.values()
+            ]
+
+            if not layouts:
+                return 0
+
+            try:
+                posts = await write_post_layouts(layouts)
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to flush post layouts. Error: {str(e)}")
+                # One bad layout fails the whole statement, so every user's are
+                # written on their own and only the failing ones are dropped
+                posts = []
+
+                for user_id, user_layouts in pending.items():
+                    try:
+                        posts += await write_post_layouts(
+                            list(user_layouts.values())
+                        )
+                    except Exception as e:
+                        self.dropped += len(user_layouts)
+                        print(
+                            f"Dropped {len(user_layouts)} post layouts of {user_id}."
+                            f" Error: {str(e)}"
+                        )
+
+            self.flushes += 1
+            self.written += len(posts)
+
+            return pending_count
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+        # What is still waiting is written before the process exits
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Failed to flush post layouts. Error: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to flush post layouts. Error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "flush_interval": self.flush_interval,
+            "max_pending": self.max_pending,
+            "pending": self._pending_count,
+            "buffered": self.buffered,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
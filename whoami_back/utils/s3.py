@@ -1,14 +1,48 @@
-import boto3
-
-from whoami_back.utils.config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
-
-# Initialize shared object
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+from whoami_back.utils.config import (
+    AWS_ACCESS_KEY_ID,
+    AWS_SECRET_ACCESS_KEY,
+    IMAGE_DERIVATIVES_MAX_PENDING,
+    IMAGE_DERIVATIVES_MAX_WORKERS,
+    STORAGE_BACKEND,
+    STORAGE_GC_BATCH_SIZE,
+    STORAGE_GC_MAX_ATTEMPTS,
+    STORAGE_GC_POLL_INTERVAL_IN_SECONDS,
+    STORAGE_LOCAL_LATENCY_IN_SECONDS,
+    STORAGE_LOCAL_ROOT,
+    STORAGE_MAX_CONCURRENCY,
+)
+from whoami_back.utils.image_derivatives import ImageDerivativePipeline
+from whoami_back.utils.storage import (  # noqa: F401
+    LocalBackend,
+    ObjectStorage,
+    S3Backend,
+    get_s3_object_uri,
 )
+from whoami_back.utils.storage_gc import StorageGarbageCollector
 
+# Initialize shared objects
+if STORAGE_BACKEND == "local":
+    storage_backend = LocalBackend(
+        root=STORAGE_LOCAL_ROOT, latency=STORAGE_LOCAL_LATENCY_IN_SECONDS
+    )
+else:
+    storage_backend = S3Backend(
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        max_pool_connections=STORAGE_MAX_CONCURRENCY,
+    )
 
-def get_s3_object_uri(bucket: str, object_key: str):
-    return f"https://{bucket}.s3.amazonaws.com/{object_key}"
+storage = ObjectStorage(
+    backend=storage_backend, max_concurrency=STORAGE_MAX_CONCURRENCY
+)
+image_derivatives = ImageDerivativePipeline(
+    storage=storage,
+    max_workers=IMAGE_DERIVATIVES_MAX_WORKERS,
+    max_pending=IMAGE_DERIVATIVES_MAX_PENDING,
+)
+storage_gc = StorageGarbageCollector(
+    storage=storage,
+    batch_size=STORAGE_GC_BATCH_SIZE,
+    poll_interval=STORAGE_GC_POLL_INTERVAL_IN_SECONDS,
+    max_attempts=STORAGE_GC_MAX_ATTEMPTS,
+)
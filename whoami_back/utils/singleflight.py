@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers asking for a key that is
+    already in flight wait for that call and share its result or exception.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+
+        # A caller that is cancelled does not cancel the call for the others
+        return await asyncio.shield(call)
+
+    def __len__(self) -> int:
+        return len(self._calls)
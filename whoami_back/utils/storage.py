@@ -0,0 +1,519 @@
+import asyncio
+import base64
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, AsyncIterable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# S3 requires every part of a multipart upload but the last to be at least 5MB
+MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
+
+class ObjectTooLargeError(ValueError):
+    pass
+
+
+def get_s3_object_uri(bucket: str, object_key: str):
+    return f"https://{bucket}.s3.amazonaws.com/{object_key}"
+
+
+class S3Backend:
+    """
+    Stores objects in S3. The client is thread safe and keeps up to
+    max_pool_connections connections open.
+    """
+
+    def __init__(
+        self,
+        *,
+        aws_access_key_id: str,
+        aws_secret_access_key: str,
+        max_pool_connections: int,
+    ):
+        self._client = boto3.client(
+            "s3",
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            config=Config(max_pool_connections=max_pool_connections),
+        )
+
+    def upload(self, bucket: str, key: str, fileobj: IO) -> None:
+        self._client.upload_fileobj(
+            fileobj, bucket, key, ExtraArgs={"ACL": "public-read"}
+        )
+
+    def put(
+        self, bucket: str, key: str, body: bytes, content_type: Optional[str] = None
+    ) -> None:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        self._client.put_object(
+            Bucket=bucket, Key=key, Body=body, ACL="public-read", **extra_args
+        )
+
+    def get(self, bucket: str, key: str) -> bytes:
+        return self._client.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    def create_multipart_upload(
+        self, bucket: str, key: str, content_type: Optional[str] = None
+    ) -> str:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        response = self._client.create_multipart_upload(
+            Bucket=bucket, Key=key, ACL="public-read", **extra_args
+        )
+
+        return response["UploadId"]
+
+    def upload_part(
+        self, bucket: str, key: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        response = self._client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+
+        return response["ETag"]
+
+    def complete_multipart_upload(
+        self, bucket: str, key: str, upload_id: str, etags: List[str]
+    ) -> None:
+        self._client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"ETag": etag, "PartNumber": part_number}
+                    for part_number, etag in enumerate(etags, start=1)
+                ]
+            },
+        )
+
+    def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        self._client.abort_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id
+        )
+
+    def delete(self, bucket: str, key: str) -> None:
+        self._client.delete_object(Bucket=bucket, Key=key)
+
+    def delete_many(self, bucket: str, keys: List[str]) -> Dict[str, str]:
+        response = self._client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+
+        return {
+            error["Key"]: f"{error['Code']}: {error['Message']}"
+            for error in response.get("Errors", [])
+        }
+
+    def get_size(self, bucket: str, key: str) -> Optional[int]:
+        try:
+            response = self._client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+
+            raise
+
+        return response["ContentLength"]
+
+    def get_sha256(self, bucket: str, key: str) -> Optional[str]:
+        try:
+            response = self._client.head_object(
+                Bucket=bucket, Key=key, ChecksumMode="ENABLED"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+
+            raise
+
+        checksum = response.get("ChecksumSHA256")
+
+        # Multipart uploads carry a checksum of the part checksums instead
+        if not checksum or "-" in checksum:
+            return None
+
+        return base64.b64decode(checksum).hex()
+
+    def create_upload_intent(
+        self, bucket: str, key: str, *, max_size: int, expires_in: int
+    ) -> Dict:
+        # Signed locally, no request is made. The client adds the base64 SHA-256
+        # digest of the file as x-amz-checksum-sha256, which S3 verifies and keeps
+        # with the object.
+        return self._client.generate_presigned_post(
+            bucket,
+            key,
+            Fields={"acl": "public-read", "x-amz-checksum-algorithm": "SHA256"},
+            Conditions=[
+                {"acl": "public-read"},
+                {"x-amz-checksum-algorithm": "SHA256"},
+                ["starts-with", "$x-amz-checksum-sha256", ""],
+                ["content-length-range", 1, max_size],
+                ["starts-with", "$Content-Type", "image/"],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+
+class LocalBackend:
+    """
+    Stores objects as files under root, one directory per bucket. Used to run and
+    benchmark the API without AWS. latency is added to every call to stand in for
+    the S3 round trip.
+    """
+
+    def __init__(self, *, root: str, latency: float = 0):
+        self.root = os.path.abspath(root)
+        self.latency = latency
+
+    def _get_path(self, bucket: str, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, bucket, key))
+
+        if not path.startswith(os.path.join(self.root, bucket) + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+
+        return path
+
+    def _open(self, bucket: str, key: str) -> IO:
+        time.sleep(self.latency)
+        path = self._get_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        return open(path, "wb")
+
+    def upload(self, bucket: str, key: str, fileobj: IO) -> None:
+        with self._open(bucket, key) as f:
+            shutil.copyfileobj(fileobj, f)
+
+    def put(
+        self, bucket: str, key: str, body: bytes, content_type: Optional[str] = None
+    ) -> None:
+        with self._open(bucket, key) as f:
+            f.write(body)
+
+    def get(self, bucket: str, key: str) -> bytes:
+        time.sleep(self.latency)
+
+        with open(self._get_path(bucket, key), "rb") as f:
+            return f.read()
+
+    def create_multipart_upload(
+        self, bucket: str, key: str, content_type: Optional[str] = None
+    ) -> str:
+        upload_id = uuid4().hex
+        # Parts are appended to a hidden file that replaces the object on completion
+        self._open(bucket, f"{key}.{upload_id}.upload").close()
+
+        return upload_id
+
+    def upload_part(
+        self, bucket: str, key: str, upload_id: str, part_number: int, body: bytes
+    ) -> str:
+        time.sleep(self.latency)
+
+        with open(self._get_path(bucket, f"{key}.{upload_id}.upload"), "ab") as f:
+            f.write(body)
+
+        return str(part_number)
+
+    def complete_multipart_upload(
+        self, bucket: str, key: str, upload_id: str, etags: List[str]
+    ) -> None:
+        time.sleep(self.latency)
+        os.replace(
+            self._get_path(bucket, f"{key}.{upload_id}.upload"),
+            self._get_path(bucket, key),
+        )
+
+    def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        time.sleep(self.latency)
+
+        try:
+            os.remove(self._get_path(bucket, f"{key}.{upload_id}.upload"))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, bucket: str, key: str) -> None:
+        time.sleep(self.latency)
+
+        try:
+            os.remove(self._get_path(bucket, key))
+        except FileNotFoundError:
+            # Same as S3, deleting a missing object is not an error
+            pass
+
+    def delete_many(self, bucket: str, keys: List[str]) -> Dict[str, str]:
+        # One round trip for the whole batch, like S3
+        time.sleep(self.latency)
+        errors = {}
+
+        for key in keys:
+            try:
+                os.remove(self._get_path(bucket, key))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                errors[key] = str(e)
+
+        return errors
+
+    def get_size(self, bucket: str, key: str) -> Optional[int]:
+        time.sleep(self.latency)
+
+        try:
+            return os.path.getsize(self._get_path(bucket, key))
+        except FileNotFoundError:
+            return None
+
+    def get_sha256(self, bucket: str, key: str) -> Optional[str]:
+        # Stands in for the checksum S3 keeps with the object
+        time.sleep(self.latency)
+        digest = hashlib.sha256()
+
+        try:
+            with open(self._get_path(bucket, key), "rb") as f:
+                for chunk in iter(lambda: f.read(MULTIPART_PART_SIZE), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            return None
+
+        return digest.hexdigest()
+
+    def create_upload_intent(
+        self, bucket: str, key: str, *, max_size: int, expires_in: int
+    ) -> Dict:
+        # There is no upload endpoint. Local clients write the file themselves.
+        return {
+            "url": f"file://{os.path.join(self.root, bucket)}",
+            "fields": {"key": key},
+        }
+
+
+class ObjectStorage:
+    """
+    Runs the blocking calls of a storage backend in a thread pool so that uploads
+    and deletes never block the event loop.
+
+    At most max_concurrency calls run at once. The rest wait for a free thread.
+    """
+
+    def __init__(self, *, backend, max_concurrency: int):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self._metrics = {
+            operation: {"completed": 0, "total_latency": 0.0, "max_latency": 0.0}
+            for operation in (
+                "upload",
+                "download",
+                "delete",
+                "get_size",
+                "get_sha256",
+            )
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="storage"
+            )
+
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        self._in_flight += 1
+        started_at = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            latency = time.perf_counter() - started_at
+            metrics = self._metrics[operation]
+            metrics["completed"] += 1
+            metrics["total_latency"] += latency
+            metrics["max_latency"] = max(metrics["max_latency"], latency)
+
+    async def upload(self, bucket: str, key: str, fileobj: IO) -> None:
+        """
+        Upload a file object as a public object.
+        """
+        await self._run("upload", self.backend.upload, bucket, key, fileobj)
+
+    async def put(
+        self,
+        bucket: str,
+        key: str,
+        body: bytes,
+        *,
+        content_type: Optional[str] = None,
+    ) -> None:
+        """
+        Upload bytes as a public object.
+        """
+        await self._run("upload", self.backend.put, bucket, key, body, content_type)
+
+    async def get(self, bucket: str, key: str) -> bytes:
+        return await self._run("download", self.backend.get, bucket, key)
+
+    async def upload_stream(
+        self,
+        bucket: str,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        *,
+        max_size: int,
+        content_type: Optional[str] = None,
+        part_size: int = MULTIPART_PART_SIZE,
+    ) -> Tuple[int, str]:
+        """
+        Upload chunks as a public object while they are still arriving, through a
+        multipart upload. At most two parts are held in memory: the one being
+        uploaded and the one being received. Return the size and the SHA-256 hex
+        digest of the object.
+
+        Raise ObjectTooLargeError as soon as more than max_size bytes arrive. The
+        multipart upload is aborted on any error, so nothing is stored.
+        """
+        upload_id = await self._run(
+            "upload", self.backend.create_multipart_upload, bucket, key, content_type
+        )
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        etags = []
+        uploading_part: Optional[asyncio.Future] = None
+
+        async def upload_part(body: bytes) -> None:
+            nonlocal uploading_part
+
+            # Receive the next part while this one is uploaded
+            if uploading_part is not None:
+                etags.append(await uploading_part)
+
+            uploading_part = asyncio.ensure_future(
+                self._run(
+                    "upload",
+                    self.backend.upload_part,
+                    bucket,
+                    key,
+                    upload_id,
+                    len(etags) + 1,
+                    body,
+                )
+            )
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+
+                if size > max_size:
+                    raise ObjectTooLargeError(f"The object exceeds {max_size} bytes")
+
+                digest.update(chunk)
+                buffer += chunk
+
+                if len(buffer) >= part_size:
+                    await upload_part(bytes(buffer))
+                    buffer = bytearray()
+
+            # S3 requires at least one part, even if it is empty
+            if buffer or uploading_part is None:
+                await upload_part(bytes(buffer))
+
+            etags.append(await uploading_part)
+            await self._run(
+                "upload",
+                self.backend.complete_multipart_upload,
+                bucket,
+                key,
+                upload_id,
+                etags,
+            )
+        except BaseException:
+            # The part's thread cannot be interrupted, so let it finish first
+            if uploading_part is not None:
+                await asyncio.gather(uploading_part, return_exceptions=True)
+
+            await self._run(
+                "delete", self.backend.abort_multipart_upload, bucket, key, upload_id
+            )
+            raise
+
+        return size, digest.hexdigest()
+
+    async def delete(self, bucket: str, key: str) -> None:
+        await self._run("delete", self.backend.delete, bucket, key)
+
+    async def delete_many(self, bucket: str, keys: List[str]) -> Dict[str, str]:
+        """
+        Delete up to 1000 objects in one request. Return the error of every key
+        that could not be deleted.
+        """
+        return await self._run("delete", self.backend.delete_many, bucket, keys)
+
+    async def get_size(self, bucket: str, key: str) -> Optional[int]:
+        """
+        Return the size of the object in bytes, or None if it does not exist.
+        """
+        return await self._run("get_size", self.backend.get_size, bucket, key)
+
+    async def get_sha256(self, bucket: str, key: str) -> Optional[str]:
+        """
+        Return the hex SHA-256 digest the backend verified when the object was
+        uploaded, without downloading it. None if the object does not exist or was
+        uploaded without one.
+        """
+        return await self._run("get_sha256", self.backend.get_sha256, bucket, key)
+
+    def create_upload_intent(
+        self, bucket: str, key: str, *, max_size: int, expires_in: int
+    ) -> Dict:
+        """
+        Return the url and form fields with which a client uploads one public
+        image of at most max_size bytes straight to the backend.
+        """
+        return self.backend.create_upload_intent(
+            bucket, key, max_size=max_size, expires_in=expires_in
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        stats = {
+            "backend": type(self.backend).__name__,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_concurrency),
+        }
+
+        for operation, metrics in self._metrics.items():
+            completed = metrics["completed"]
+            average_latency = (
+                metrics["total_latency"] / completed if completed else 0
+            )
+            stats[operation] = {
+                "completed": completed,
+                "average_latency_ms": average_latency * 1000,
+                "max_latency_ms": metrics["max_latency"] * 1000,
+            }
+
+        return stats
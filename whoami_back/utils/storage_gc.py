@@ -0,0 +1,262 @@
+import asyncio
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from whoami_back.utils.config import (
+    BOARD_IMAGES_S3_BUCKET,
+    POST_IMAGES_S3_BUCKET,
+    POST_THUMBNAIL_IMAGES_S3_BUCKET,
+    PROFILE_IMAGES_S3_BUCKET,
+)
+from whoami_back.utils.db import database
+from whoami_back.utils.image_derivatives import get_all_derivative_keys
+from whoami_back.utils.storage import ObjectStorage
+
+# S3 accepts at most 1000 keys per DeleteObjects request
+MAX_KEYS_PER_REQUEST = 1000
+
+MANAGED_BUCKETS = (
+    PROFILE_IMAGES_S3_BUCKET,
+    POST_THUMBNAIL_IMAGES_S3_BUCKET,
+    POST_IMAGES_S3_BUCKET,
+    BOARD_IMAGES_S3_BUCKET,
+)
+
+OBJECT_URI_PATTERN = re.compile(r"^https://([^./]+)\.s3\.amazonaws\.com/(.+)$")
+
+
+def parse_object_uri(uri: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Return the bucket and key of an object we uploaded, or None for anything else
+    such as external thumbnails and the shared default post images.
+    """
+    match = OBJECT_URI_PATTERN.match(uri or "")
+
+    if match is None:
+        return None
+
+    bucket, key = match.groups()
+
+    if bucket not in MANAGED_BUCKETS or key.startswith("default-post-images/"):
+        return None
+
+    return bucket, key
+
+
+async def enqueue_object_deletion(objects: List[Tuple[str, str]]) -> None:
+    """
+    Queue (bucket, key) objects for StorageGarbageCollector. Objects that may be
+    shared go through stored_objects.release_object_uris instead.
+    """
+    if not objects:
+        return
+
+    buckets, keys = zip(*objects)
+    query = """
+INSERT INTO storage_gc (bucket, key)
+SELECT * FROM unnest(CAST(:buckets AS TEXT[]), CAST(:keys AS TEXT[]))
+    """
+    await database.execute(
+        query=query, values={"buckets": list(buckets), "keys": list(keys)}
+    )
+
+
+class StorageGarbageCollector:
+    """
+    Drains the storage_gc table in batches, deleting every queued object and its
+    image derivatives with DeleteObjects requests of up to 1000 keys.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED and leased for lease_seconds, the
+    same way as EmailDispatcher. Deleted rows are removed from the table. Failed
+    deletes are retried with exponential backoff up to max_attempts times.
+    """
+
+    def __init__(
+        self,
+        *,
+        storage: ObjectStorage,
+        batch_size: int = 100,
+        poll_interval: float = 30.0,
+        max_attempts: int = 8,
+        base_backoff: float = 10.0,
+        max_backoff: float = 3600.0,
+        lease_seconds: float = 300.0,
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.deleted = 0
+        self.retried = 0
+        self.failed = 0
+        self.requests = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                collected_count = await self.collect_batch()
+            except Exception as e:
+                print(f"Failed to collect storage garbage. Error: {str(e)}")
+                collected_count = 0
+
+            # Keep going without a pause while there is a backlog
+            if collected_count < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def collect_batch(self) -> int:
+        """
+        Delete the objects of one batch of due rows and return how many rows were
+        attempted.
+        """
+        query = """
+UPDATE storage_gc
+SET
+    attempt_count = attempt_count + 1,
+    next_attempt_at = NOW() + make_interval(secs => :lease_seconds)
+WHERE id IN (
+    SELECT id
+    FROM storage_gc
+    WHERE failed_at IS NULL AND next_attempt_at <= NOW()
+    ORDER BY next_attempt_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, bucket, key
+        """
+        values = {"lease_seconds": self.lease_seconds, "batch_size": self.batch_size}
+        rows = await database.fetch_all(query=query, values=values)
+
+        if not rows:
+            return 0
+
+        # Bucket -> key -> ids of the rows that queued it
+        pending = defaultdict(lambda: defaultdict(list))
+
+        for row in rows:
+            pending[row["bucket"]][row["key"]].append(str(row["id"]))
+
+        results = await asyncio.gather(
+            *[self._delete(bucket, keys) for bucket, keys in pending.items()]
+        )
+        deleted_ids = []
+        failures = []
+
+        for errors, (bucket, keys) in zip(results, pending.items()):
+            for key, row_ids in keys.items():
+                error = errors.get(key)
+
+                if error is None:
+                    deleted_ids.extend(row_ids)
+                else:
+                    failures.extend((row_id, error) for row_id in row_ids)
+
+        await self._mark_deleted(deleted_ids)
+        await self._mark_failed(failures)
+
+        return len(rows)
+
+    async def _delete(
+        self, bucket: str, keys: Dict[str, List[str]]
+    ) -> Dict[str, str]:
+        """
+        Delete the objects and their derivatives. Return the error of every queued
+        key whose object or derivatives could not be deleted.
+        """
+        # Derivative key -> queued key
+        queued_keys = {}
+
+        for key in keys:
+            queued_keys[key] = key
+
+            for derivative_key in get_all_derivative_keys(key):
+                queued_keys[derivative_key] = key
+
+        object_keys = list(queued_keys)
+        batches = [
+            object_keys[i : i + MAX_KEYS_PER_REQUEST]
+            for i in range(0, len(object_keys), MAX_KEYS_PER_REQUEST)
+        ]
+        results = await asyncio.gather(
+            *[self.storage.delete_many(bucket, batch) for batch in batches],
+            return_exceptions=True,
+        )
+        self.requests += len(batches)
+        errors = {}
+
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                result = {
+                    key: f"{type(result).__name__}: {str(result)}" for key in batch
+                }
+
+            for object_key, error in result.items():
+                errors.setdefault(queued_keys[object_key], error)
+
+        return errors
+
+    async def _mark_deleted(self, row_ids: List[str]) -> None:
+        if not row_ids:
+            return
+
+        query = "DELETE FROM storage_gc WHERE id = ANY(CAST(:row_ids AS UUID[]))"
+        await database.execute(query=query, values={"row_ids": row_ids})
+        self.deleted += len(row_ids)
+
+    async def _mark_failed(self, failures: List[Tuple[str, str]]) -> None:
+        if not failures:
+            return
+
+        row_ids, errors = zip(*failures)
+        query = """
+UPDATE storage_gc
+SET
+    last_error = failure.error,
+    failed_at = CASE WHEN attempt_count >= :max_attempts THEN NOW() END,
+    next_attempt_at = NOW() + make_interval(
+        secs => LEAST(:max_backoff, :base_backoff * POWER(2, attempt_count - 1))
+        * (0.5 + random())
+    )
+FROM unnest(CAST(:row_ids AS UUID[]), CAST(:errors AS TEXT[])) AS failure (id, error)
+WHERE storage_gc.id = failure.id
+RETURNING failed_at IS NOT NULL AS failed
+        """
+        values = {
+            "row_ids": list(row_ids),
+            "errors": list(errors),
+            "max_attempts": self.max_attempts,
+            "base_backoff": self.base_backoff,
+            "max_backoff": self.max_backoff,
+        }
+        rows = await database.fetch_all(query=query, values=values)
+        failed_count = sum(1 for row in rows if row["failed"])
+        self.failed += failed_count
+        self.retried += len(rows) - failed_count
+
+    def stats(self) -> Dict:
+        return {
+            "batch_size": self.batch_size,
+            "deleted": self.deleted,
+            "retried": self.retried,
+            "failed": self.failed,
+            "requests": self.requests,
+        }
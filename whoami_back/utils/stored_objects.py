@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+from typing import IO, List, Optional, Tuple
+
+from whoami_back.utils.db import database
+from whoami_back.utils.s3 import storage
+from whoami_back.utils.storage_gc import enqueue_object_deletion, parse_object_uri
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(fileobj: IO) -> Tuple[str, int]:
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+
+    fileobj.seek(0)
+
+    return digest.hexdigest(), size
+
+
+async def acquire_object(bucket: str, sha256: str) -> Optional[str]:
+    """
+    Add a reference to the stored object with the content hash and return its key,
+    or None if there is none.
+    """
+    query = """
+UPDATE stored_object
+SET reference_count = reference_count + 1
+WHERE bucket = :bucket AND sha256 = :sha256
+RETURNING key
+    """
+
+    return await database.execute(
+        query=query, values={"bucket": bucket, "sha256": sha256}
+    )
+
+
+async def is_object_known(bucket: str, key: str) -> bool:
+    """
+    Whether the object was registered or queued for deletion already, in which
+    case its key must not be registered again.
+    """
+    query = """
+SELECT
+    EXISTS (SELECT 1 FROM stored_object WHERE bucket = :bucket AND key = :key)
+    OR EXISTS (SELECT 1 FROM storage_gc WHERE bucket = :bucket AND key = :key)
+    """
+
+    return await database.execute(query=query, values={"bucket": bucket, "key": key})
+
+
+async def register_object(bucket: str, key: str, sha256: str, size: int) -> str:
+    """
+    Record an uploaded object with one reference and return the key to refer to.
+    If an object with the same content is already stored, that one gets the
+    reference instead, and the uploaded one is queued for deletion.
+    """
+    query = """
+INSERT INTO stored_object (bucket, key, sha256, size)
+VALUES (:bucket, :key, :sha256, :size)
+ON CONFLICT (bucket, sha256) DO UPDATE
+SET reference_count = stored_object.reference_count + 1
+RETURNING key
+    """
+    values = {"bucket": bucket, "key": key, "sha256": sha256, "size": size}
+    stored_key = await database.execute(query=query, values=values)
+
+    if stored_key != key:
+        await enqueue_object_deletion([(bucket, key)])
+
+    return stored_key
+
+
+async def upload_deduplicated(bucket: str, key: str, fileobj: IO) -> str:
+    """
+    Upload the file as a public object unless the same content is already stored,
+    and return the key to refer to. Every key returned holds one reference, which
+    is given back with release_object_uris.
+    """
+    loop = asyncio.get_running_loop()
+    sha256, size = await loop.run_in_executor(None, _hash_file, fileobj)
+    stored_key = await acquire_object(bucket, sha256)
+
+    if stored_key:
+        return stored_key
+
+    await storage.upload(bucket, key, fileobj)
+
+    return await register_object(bucket, key, sha256, size)
+
+
+async def release_object_uris(uris: List[Optional[str]]) -> None:
+    """
+    Give back one reference per URI, as stored in the database. Objects left
+    without references are queued for deletion. Call this in the same transaction
+    as the change that stops referring to them.
+
+    URIs of objects we did not upload are ignored. Pass a URI once per row even if
+    several columns of the row hold it.
+    """
+    objects = [parse_object_uri(uri) for uri in uris]
+    objects = [stored_object for stored_object in objects if stored_object]
+
+    if not objects:
+        return
+
+    buckets, keys = zip(*objects)
+    values = {"buckets": list(buckets), "keys": list(keys)}
+
+    async with database.transaction():
+        # Objects without a row were uploaded before deduplication and have
+        # exactly one reference
+        query = """
+WITH released AS (
+    SELECT bucket, key, COUNT(*) AS count
+    FROM unnest(CAST(:buckets AS TEXT[]), CAST(:keys AS TEXT[])) AS o (bucket, key)
+    GROUP BY bucket, key
+), decremented AS (
+    UPDATE stored_object
+    SET reference_count = stored_object.reference_count - released.count
+    FROM released
+    WHERE stored_object.bucket = released.bucket
+        AND stored_object.key = released.key
+    RETURNING stored_object.bucket, stored_object.key
+)
+INSERT INTO storage_gc (bucket, key)
+SELECT bucket, key FROM released
+EXCEPT
+SELECT bucket, key FROM decremented
+        """
+        await database.execute(query=query, values=values)
+
+        query = """
+WITH unreferenced AS (
+    DELETE FROM stored_object
+    WHERE reference_count <= 0
+        AND (bucket, key) IN (
+            SELECT * FROM unnest(CAST(:buckets AS TEXT[]), CAST(:keys AS TEXT[]))
+        )
+    RETURNING bucket, key
+)
+INSERT INTO storage_gc (bucket, key)
+SELECT bucket, key FROM unreferenced
+        """
+        await database.execute(query=query, values=values)
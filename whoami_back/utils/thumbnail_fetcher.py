@@ -0,0 +1,56 @@
+import hashlib
+from typing import Dict
+
+from whoami_back.utils.cache import TTLCache
+from whoami_back.utils.fetch_pool import FetchPool
+from whoami_back.utils.s3 import storage
+from whoami_back.utils.stored_objects import acquire_object, register_object
+
+
+class ThumbnailFetcher:
+    """
+    Downloads the thumbnail images of link posts through a FetchPool and stores
+    them. Thumbnails over max_size bytes are refused.
+
+    Stored thumbnails are remembered by URL, so the same thumbnail linked by many
+    users is downloaded and stored once per worker. The cache holds the content
+    hash, and the object itself is shared through stored_object.
+    """
+
+    def __init__(self, *, fetch_pool: FetchPool, max_size: int, cache: TTLCache):
+        self.fetch_pool = fetch_pool
+        self.max_size = max_size
+        self.cache = cache
+
+    async def fetch_and_store(self, url: str, bucket: str, key: str) -> str:
+        """
+        Store the image at url as a public object, unless it is already stored, and
+        return the key to refer to. The key holds one reference, which is given
+        back with release_object_uris.
+
+        Raise FetchError if the image cannot be downloaded.
+        """
+        sha256 = self.cache.get(url)
+
+        if sha256:
+            stored_key = await acquire_object(bucket, sha256)
+
+            if stored_key:
+                return stored_key
+
+        body, content_type, _ = await self.fetch_pool.get(
+            url, max_size=self.max_size, content_types=("image/",)
+        )
+        sha256 = hashlib.sha256(body).hexdigest()
+        stored_key = await acquire_object(bucket, sha256)
+
+        if not stored_key:
+            await storage.put(bucket, key, body, content_type=content_type)
+            stored_key = await register_object(bucket, key, sha256, len(body))
+
+        self.cache.set(url, sha256)
+
+        return stored_key
+
+    def stats(self) -> Dict:
+        return {"cache": self.cache.stats()}